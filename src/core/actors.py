@@ -0,0 +1,109 @@
+"""Per-room command queues: the commands of a room run one at a time."""
+import asyncio
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Optional
+
+Command = Callable[[], Awaitable[Any]]
+
+
+class RoomActor:
+    """Run the commands of a room in arrival order, one at a time.
+
+    Commands are queued and consumed by a single worker task, so two
+    sockets of the same room never interleave their game commands while
+    different rooms keep running in parallel. The worker exits when the
+    queue is empty (calling on_idle) and the next command starts another.
+    """
+
+    def __init__(
+        self,
+        room_id: int,
+        on_idle: Optional[Callable[["RoomActor"], None]] = None,
+    ):
+        self.room_id = room_id
+        self.on_idle = on_idle
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.worker: Optional[asyncio.Task] = None
+        self.current: Optional[asyncio.Future] = None
+
+    @property
+    def depth(self) -> int:
+        """Commands waiting to run."""
+        return self.queue.qsize()
+
+    async def submit(self, command: Command) -> Any:
+        """Queue a command and wait for its result (or its exception)."""
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((command, future))
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self._work())
+        return await future
+
+    async def _work(self) -> None:
+        while not self.queue.empty():
+            command, future = self.queue.get_nowait()
+            self.current = future
+            try:
+                result = await command()
+            except Exception as error:
+                if not future.cancelled():
+                    future.set_exception(error)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
+            finally:
+                self.current = None
+                self.queue.task_done()
+        if self.on_idle is not None:
+            self.on_idle(self)
+
+    def stop(self) -> None:
+        """Stop the worker. The commands still waiting fail with ValueError."""
+        if self.worker is not None:
+            self.worker.cancel()
+        pending = [self.current] if self.current is not None else []
+        while not self.queue.empty():
+            pending.append(self.queue.get_nowait()[1])
+        for future in pending:
+            if not future.done():
+                future.set_exception(
+                    ValueError(f"Room with id {self.room_id} is closed")
+                )
+
+
+class RoomActors:
+    """Actors of the rooms with commands (running or waiting)."""
+
+    def __init__(self):
+        self.actors: Dict[int, RoomActor] = {}
+
+    def get(self, room_id: int) -> RoomActor:
+        """Get the actor of a room, creating it if needed."""
+        if room_id not in self.actors:
+            self.actors[room_id] = RoomActor(room_id, self._forget)
+        return self.actors[room_id]
+
+    def _forget(self, actor: RoomActor) -> None:
+        if self.actors.get(actor.room_id) is actor:
+            del self.actors[actor.room_id]
+
+    async def submit(self, room_id: int, command: Command) -> Any:
+        """Run a command in the queue of a room."""
+        return await self.get(room_id).submit(command)
+
+    def stop(self, room_id: int) -> None:
+        """Stop the actor of a room (when the room or its game is
+        deleted)."""
+        actor = self.actors.pop(room_id, None)
+        if actor is not None:
+            actor.stop()
+
+    def queue_depths(self) -> Dict[int, int]:
+        """Commands waiting to run in each room."""
+        return {id: actor.depth for id, actor in self.actors.items()}
+
+
+room_actors = RoomActors()
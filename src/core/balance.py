@@ -0,0 +1,151 @@
+"""Monte Carlo runs of simulated games to study the balance of the cards.
+
+The games are spread over a process pool. The seed of every game only
+depends on the base seed and the index of the game, and a game only
+draws from its own seed, so a run gives the same results whatever the
+quantity of workers (only the order in which they come may change).
+The tasks and the results are streamed, so a run of millions of games
+never holds them all in memory.
+"""
+import csv
+import json
+import multiprocessing
+import random
+from collections import Counter
+from typing import Dict
+from typing import IO
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from core.game_logic.card_creation import card_names
+from core.game_logic.rules import EXCHANGE
+from core.simulation import GameResult
+from core.simulation import MAX_TURNS
+from core.simulation import play_game
+
+# Games sent to a worker at once
+CHUNK_SIZE = 64
+
+WINNERS = ("Humans", "The Thing")
+
+
+def game_seed(seed: int, index: int) -> int:
+    """Seed of a game of a run, drawn from the pair (base seed, index) so
+    runs with different base seeds don't share games."""
+    return random.Random(f"{seed}:{index}").getrandbits(62)
+
+
+def game_seeds(
+    quantities: Iterable[int], games: int, seed: int
+) -> Iterator[Tuple[int, int]]:
+    """(quantity of players, seed) of every game of a run, generated as
+    they are needed."""
+    index = 0
+    for quantity in quantities:
+        for _ in range(games):
+            yield quantity, game_seed(seed, index)
+            index += 1
+
+
+def _play(task: Tuple[int, int, int]) -> GameResult:
+    quantity, seed, max_turns = task
+    return play_game(quantity, seed, max_turns=max_turns)
+
+
+def run_games(
+    tasks: Iterable[Tuple[int, int]],
+    workers: Optional[int] = None,
+    max_turns: int = MAX_TURNS,
+) -> Iterator[GameResult]:
+    """Play the games in a pool of processes, yielding each result as soon
+    as it's ready (not in order).
+
+    With a single worker the games are played in this process, in order.
+    """
+    plays = ((quantity, seed, max_turns) for quantity, seed in tasks)
+    if workers == 1:
+        yield from map(_play, plays)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap_unordered(_play, plays, chunksize=CHUNK_SIZE)
+
+
+class Stats:
+    """Results of the games with a quantity of players.
+
+    The games stopped after MAX_TURNS (without winners) are only counted
+    as stalled: the rates and means are over the finished games.
+    """
+
+    def __init__(self):
+        self.games = 0
+        self.stalled = 0
+        self.winners: Counter = Counter()
+        self.turns = 0
+        self.rejected = 0
+        self.played: Counter = Counter()
+
+    def add(self, result: GameResult) -> None:
+        if result.winners not in WINNERS:
+            self.stalled += 1
+            return
+        self.games += 1
+        self.winners[result.winners] += 1
+        self.turns += result.turns
+        self.rejected += result.rejected
+        self.played.update(result.played)
+
+    def row(self, quantity: int) -> Dict[str, object]:
+        """Row of the CSV summary (rates and means per finished game)."""
+        row: Dict[str, object] = {
+            "players": quantity,
+            "games": self.games,
+            "stalled": self.stalled,
+        }
+        # Every game may have stalled
+        games = self.games or 1
+        for winners in WINNERS:
+            row[winners] = self.winners[winners]
+        for winners in WINNERS:
+            row[f"{winners} rate"] = round(self.winners[winners] / games, 4)
+        row["mean turns"] = round(self.turns / games, 2)
+        row["mean rejected"] = round(self.rejected / games, 2)
+        for idtype in played_idtypes():
+            row[card_name(idtype)] = round(self.played[idtype] / games, 4)
+        return row
+
+
+def played_idtypes() -> List[int]:
+    """Idtypes whose usage is reported (The Thing and Infected aren't
+    played)."""
+    return list(range(3, EXCHANGE + 1))
+
+
+def card_name(idtype: int) -> str:
+    return "Exchange" if idtype == EXCHANGE else card_names[idtype][0]
+
+
+def aggregate(
+    results: Iterable[GameResult], ndjson: Optional[IO[str]] = None
+) -> Dict[int, Stats]:
+    """Aggregate the results by quantity of players, writing each one as
+    a line of NDJSON if a file is given."""
+    stats: Dict[int, Stats] = {}
+    for result in results:
+        stats.setdefault(result.quantity_players, Stats()).add(result)
+        if ndjson is not None:
+            ndjson.write(json.dumps(result._asdict()) + "\n")
+    return stats
+
+
+def write_csv(stats: Dict[int, Stats], file: IO[str]) -> None:
+    """Write a row of rates and means per quantity of players."""
+    rows = [stats[quantity].row(quantity) for quantity in sorted(stats)]
+    if not rows:
+        return
+    writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
@@ -1,22 +1,214 @@
+import asyncio
+import json
+from collections import deque
+from enum import Enum
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Deque
 from typing import Dict
 from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
 
+from core.views import view_tracker
 from fastapi import WebSocket
 
+# Seconds to wait for a socket to take a message before dropping it
+SEND_TIMEOUT = 5
+
+# Messages waiting to be sent to a socket before the policy kicks in
+OUTBOX_SIZE = 64
+
+# Updates of the game: the queued ones can be dropped and replaced by the
+# full game_info (see ConnectionManager.enqueue)
+STALE_TYPES = ("game_info", "game_delta")
+
+# Last messages of a room kept to replay them to who reconnects
+REPLAY_SIZE = 128
+
+
+class SlowConsumerPolicy(str, Enum):
+    """What to do when the outbox of a socket is full."""
+
+    drop_stale = "drop_stale"  # Drop the queued game updates
+    disconnect = "disconnect"  # Drop the socket
+
+
+def encode(message: Any) -> str:
+    """Encode a message the same way WebSocket.send_json does."""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def batch_frame(texts: List[str]) -> str:
+    """Join encoded messages in a single frame (a JSON array)."""
+    return "[" + ",".join(texts) + "]"
+
+
+def message_type(message: Any) -> Optional[str]:
+    """Type of a message, used to find the stale snapshots."""
+    if isinstance(message, dict):
+        return message.get("type")
+    return None
+
+
+class ReplayBuffer:
+    """Last messages sent in a room, numbered in order.
+
+    Every message gets the next sequence number ("seq"), so a client that
+    reconnects tells the last one it got and receives only what it missed.
+    """
+
+    def __init__(self, size: int = REPLAY_SIZE):
+        self.messages: Deque[
+            Tuple[int, Optional[int], Optional[str], str]
+        ] = deque(maxlen=size)
+        self.last_seq = 0
+
+    def add(self, user_id: Optional[int], message: Any) -> str:
+        """Number a message for a user (None: everybody) and encode it."""
+        self.last_seq += 1
+        if isinstance(message, dict):
+            message = {**message, "seq": self.last_seq}
+        text = encode(message)
+        self.messages.append(
+            (self.last_seq, user_id, message_type(message), text)
+        )
+        return text
+
+    def since(
+        self, seq: int, user_id: int
+    ) -> Optional[List[Tuple[Optional[str], str]]]:
+        """Messages of a user after a sequence number, None if some of
+        them aren't kept anymore (or the number is unknown)."""
+        if seq > self.last_seq:
+            return None
+        first = self.messages[0][0] if self.messages else self.last_seq + 1
+        if first > seq + 1:
+            return None
+        return [
+            (kind, text)
+            for number, recipient, kind, text in self.messages
+            if number > seq and recipient in (None, user_id)
+        ]
+
+
+class Outbox:
+    """Bounded queue of encoded messages of a socket.
+
+    A writer task of its own sends them in order, so whoever queues a
+    message never waits for the client to read it.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        room_id: int,
+        on_failure: Callable[["Outbox"], Awaitable[Any]],
+        size: int = OUTBOX_SIZE,
+    ):
+        self.websocket = websocket
+        self.room_id = room_id
+        self.on_failure = on_failure
+        self.size = size
+        self.pending: Deque[Tuple[Optional[str], str]] = deque()
+        self.ready = asyncio.Event()
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.writer = asyncio.create_task(self._write())
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def put(self, kind: Optional[str], text: str) -> bool:
+        """Queue a message. Return False if the outbox is full."""
+        if len(self.pending) >= self.size:
+            return False
+        self.pending.append((kind, text))
+        self.idle.clear()
+        self.ready.set()
+        return True
+
+    def drop_stale(self) -> int:
+        """Drop the queued game updates, return how many were dropped."""
+        kept = deque(m for m in self.pending if m[0] not in STALE_TYPES)
+        dropped = len(self.pending) - len(kept)
+        self.pending = kept
+        return dropped
+
+    async def _write(self) -> None:
+        while True:
+            if not self.pending:
+                self.idle.set()
+                self.ready.clear()
+                await self.ready.wait()
+                continue
+            _, text = self.pending.popleft()
+            try:
+                await asyncio.wait_for(
+                    self.websocket.send_text(text), SEND_TIMEOUT
+                )
+            except Exception:
+                self.pending.clear()
+                self.idle.set()
+                await self.on_failure(self)
+                return
+
+    async def drain(self) -> None:
+        """Wait until every queued message is sent."""
+        await self.idle.wait()
+
+    def close(self) -> None:
+        """Stop the writer, forgetting the queued messages."""
+        self.pending.clear()
+        self.idle.set()
+        if self.writer is not asyncio.current_task():
+            self.writer.cancel()
+
 
 class ConnectionManager:
     """Manage active connections to the websocket server"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        policy: SlowConsumerPolicy = SlowConsumerPolicy.drop_stale,
+        outbox_size: int = OUTBOX_SIZE,
+    ):
         """Initialize the connection manager"""
         # Track active connections and the rooms they are in
         self.active_connections: Dict[int, List[WebSocket]] = {}
         self.user_rooms: Dict[int, int] = {}
         self.user_sockets: Dict[int, WebSocket] = {}
 
+        # Outgoing messages of each socket
+        self.outboxes: Dict[WebSocket, Outbox] = {}
+        self.policy = SlowConsumerPolicy(policy)
+        self.outbox_size = outbox_size
+        self.closing: Set[asyncio.Task] = set()
+
+        # Recent messages of each room
+        self.replays: Dict[int, ReplayBuffer] = {}
+
+        # Sockets that get the messages of an event in a single frame
+        self.batching: set[WebSocket] = set()
+
     # ===================== CONNECTION METHODS =====================
 
-    async def connect(self, websocket: WebSocket, room_id: int, user_id: int):
+    async def connect(
+        self,
+        websocket: WebSocket,
+        room_id: int,
+        user_id: int,
+        last_seq: Optional[int] = None,
+        batch: bool = False,
+    ) -> bool:
+        """Connect a socket. If it's a reconnection (last_seq given), send
+        the messages it missed and return if they could all be sent.
+
+        With batch, the messages of an event (see send_many) come in a
+        single frame: a JSON array with them in order.
+        """
         # Check if the user is already in a room
         # if user_id in self.user_rooms:
         #    await websocket.close()
@@ -25,30 +217,60 @@ class ConnectionManager:
         if room_id not in self.active_connections:
             self.active_connections[room_id] = []
         self.active_connections[room_id].append(websocket)
+        self.outboxes[websocket] = Outbox(
+            websocket, room_id, self._on_failure, self.outbox_size
+        )
 
         # Associate the user with the current room
         self.user_rooms[user_id] = room_id
 
         # Associate the user with the current socket
         self.user_sockets[user_id] = websocket
+        if batch:
+            self.batching.add(websocket)
+
+        if last_seq is None:
+            return False
+        missed = self.replay(room_id).since(last_seq, user_id)
+        if missed is None:
+            return False
+        if batch and len(missed) > 1:
+            await self.enqueue(
+                websocket, batch_frame([text for _, text in missed])
+            )
+        else:
+            for kind, text in missed:
+                await self.enqueue(websocket, text, kind)
+        return True
 
     async def disconnect(
         self, websocket: WebSocket, room_id: int, user_id: int
     ):
-        if room_id in self.active_connections:
-            self.active_connections[room_id].remove(websocket)
-        # Delete the user-room association
-        if user_id in self.user_rooms:
-            del self.user_rooms[user_id]
+        self._forget(websocket, room_id, user_id)
+        await self._close(websocket)
 
-        # Delete the user-socket association
-        if user_id in self.user_sockets:
+    def _forget(
+        self, websocket: WebSocket, room_id: int, user_id: Optional[int]
+    ):
+        connections = self.active_connections.get(room_id, [])
+        if websocket in connections:
+            connections.remove(websocket)
+        # Delete the user's associations, unless they already belong to
+        # a newer socket (a reconnection before this one was closed)
+        if user_id is not None and self.user_sockets.get(user_id) is websocket:
             del self.user_sockets[user_id]
+            self.user_rooms.pop(user_id, None)
+
+        outbox = self.outboxes.pop(websocket, None)
+        if outbox is not None:
+            outbox.close()
+        self.batching.discard(websocket)
 
+    async def _close(self, websocket: WebSocket):
         if websocket:
             try:
-                await websocket.close()
-            except RuntimeError:
+                await asyncio.wait_for(websocket.close(), SEND_TIMEOUT)
+            except (RuntimeError, asyncio.TimeoutError):
                 pass
 
     async def disconnect_all(self, room_id: int):
@@ -69,19 +291,137 @@ class ConnectionManager:
 
         if room_id in self.active_connections:
             for connection in self.active_connections[room_id]:
+                outbox = self.outboxes.pop(connection, None)
+                if outbox is not None:
+                    outbox.close()
+                self.batching.discard(connection)
                 await connection.close()
             del self.active_connections[room_id]
+        self.replays.pop(room_id, None)
 
     # ===================== SEND METHODS =====================
 
+    def get_user_id(self, websocket: WebSocket) -> Optional[int]:
+        for user_id, user_socket in self.user_sockets.items():
+            if user_socket is websocket:
+                return user_id
+        return None
+
+    async def drop(self, websocket: WebSocket, room_id: int):
+        """Disconnect a socket that can't take messages anymore.
+
+        It leaves the room at once; closing it runs in the background so
+        whoever dropped it doesn't wait for the client.
+        """
+        self._forget(websocket, room_id, self.get_user_id(websocket))
+        task = asyncio.create_task(self._close(websocket))
+        self.closing.add(task)
+        task.add_done_callback(self.closing.discard)
+
+    async def _on_failure(self, outbox: Outbox):
+        await self.drop(outbox.websocket, outbox.room_id)
+
+    async def enqueue(
+        self, websocket: WebSocket, text: str, kind: Optional[str] = None
+    ):
+        """Queue an encoded message, applying the policy if the outbox
+        of the socket is full."""
+        outbox = self.outboxes.get(websocket)
+        if outbox is None:
+            return
+        if outbox.put(kind, text):
+            return
+        if (
+            self.policy == SlowConsumerPolicy.drop_stale
+            and outbox.drop_stale()
+        ):
+            # Make room dropping the queued updates. The deltas that follow
+            # would miss their base, so the next update of the player is
+            # the full game_info (a delta coming now is dropped too)
+            user_id = self.get_user_id(websocket)
+            if user_id is not None:
+                view_tracker.reset(outbox.room_id, user_id)
+            if kind == "game_delta" or outbox.put(kind, text):
+                return
+        await self.drop(websocket, outbox.room_id)
+
+    def replay(self, room_id: int) -> ReplayBuffer:
+        """Get the recent messages of a room, creating them if needed."""
+        if room_id not in self.replays:
+            self.replays[room_id] = ReplayBuffer()
+        return self.replays[room_id]
+
+    def forget_room(self, room_id: int):
+        """Forget the recent messages of a room (when its game ends)."""
+        self.replays.pop(room_id, None)
+
+    async def drain(self, room_id: int):
+        """Wait until the queued messages of a room are sent."""
+        await asyncio.gather(
+            *(
+                self.outboxes[connection].drain()
+                for connection in self.active_connections.get(room_id, [])
+                if connection in self.outboxes
+            )
+        )
+
     async def send_to(self, websocket: WebSocket, message: str):
-        await websocket.send_json(message)
+        await self.enqueue(websocket, encode(message), message_type(message))
 
-    async def send_to_user_id(self, user_id: int, message: str):
-        if user_id in self.user_sockets:
-            await self.user_sockets[user_id].send_json(message)
+    async def send_to_user_id(
+        self, user_id: int, message: str, room_id: Optional[int] = None
+    ):
+        room_id = (
+            room_id if room_id is not None else self.user_rooms.get(user_id)
+        )
+        if room_id is not None:
+            # Kept even if the user isn't connected, to replay it later
+            text = self.replay(room_id).add(user_id, message)
+            if user_id in self.user_sockets:
+                await self.enqueue(
+                    self.user_sockets[user_id], text, message_type(message)
+                )
 
     async def broadcast(self, room_id: int, msg: str):
         if room_id in self.active_connections:
-            for connection in self.active_connections[room_id]:
-                await connection.send_json(msg)
+            # Encoded once for the whole room and queued for everybody; the
+            # writer of each socket sends it, so a slow client doesn't delay
+            # the others
+            text = self.replay(room_id).add(None, msg)
+            kind = message_type(msg)
+            for connection in list(self.active_connections[room_id]):
+                await self.enqueue(connection, text, kind)
+
+    async def send_many(
+        self, room_id: int, messages: List[Tuple[Optional[int], Any]]
+    ):
+        """Send the messages of an event, in order, each one to a user
+        (None: everybody in the room).
+
+        Every message is numbered and encoded once. Sockets connected with
+        batch get theirs in a single frame, the rest one frame each.
+        """
+        replay = self.replay(room_id)
+        batches: Dict[WebSocket, List[Tuple[Optional[str], str]]] = {}
+        for user_id, message in messages:
+            text = replay.add(user_id, message)
+            kind = message_type(message)
+            if user_id is None:
+                targets = list(self.active_connections.get(room_id, []))
+            elif user_id in self.user_sockets:
+                targets = [self.user_sockets[user_id]]
+            else:
+                targets = []
+            for websocket in targets:
+                if websocket in self.batching:
+                    batches.setdefault(websocket, []).append((kind, text))
+                else:
+                    await self.enqueue(websocket, text, kind)
+
+        for websocket, batch in batches.items():
+            if len(batch) == 1:
+                await self.enqueue(websocket, batch[0][1], batch[0][0])
+            else:
+                await self.enqueue(
+                    websocket, batch_frame([text for _, text in batch])
+                )
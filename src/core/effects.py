@@ -1,27 +1,18 @@
-import random
 from typing import Optional
 
-import core.game_logic.game_utility as gu
-from core.game_logic.card import relate_card_with_player
-from core.game_logic.card import unrelate_card_with_player
-from models.game import Card
-from models.game import Game
-from models.game import Player
-from pony.orm import commit
-from pony.orm import db_session
-from schemas.card import CardOut
+from core.engine.store import open_game
+from core.engine.store import open_player_game
 from schemas.socket import GameMessage
 
 
-@db_session
 def sospecha_effect(game_id: int, target_id: int, user_id: int):
-    target_hand = list(Player.get(id=target_id).hand)
-    random_card = CardOut.from_card(random.choice(target_hand))
-    response = show_one_card_effect(game_id, user_id, random_card.id)
+    with open_game(game_id) as game:
+        target_hand = game.get_player(target_id).hand
+        random_card = game.rng.choice(target_hand)
+        response = show_one_card_effect(game_id, user_id, random_card)
     return response
 
 
-@db_session
 def show_one_card_effect(
     game_id,
     player_id: int,
@@ -39,7 +30,6 @@ def show_one_card_effect(
     return response
 
 
-@db_session
 def show_hand_effect(
     game_id: int, player_id: int, target_id: Optional[int] = None
 ):
@@ -54,208 +44,169 @@ def show_hand_effect(
     return response
 
 
-@db_session
 def vigila_tus_espaldas_effect(game_id: int):
-    game = Game.get(id=game_id)
-    game.round_left_direction = not game.round_left_direction
-    commit()
+    with open_game(game_id) as game:
+        game.round_left_direction = not game.round_left_direction
 
 
-@db_session
 def position_change_effect(game_id: int, target_id: int, user_id: int):
-    (Player[target_id].round_position, Player[user_id].round_position,) = (
-        Player[user_id].round_position,
-        Player[target_id].round_position,
-    )
+    with open_game(game_id) as game:
+        target = game.get_player(target_id)
+        user = game.get_player(user_id)
+        (target.round_position, user.round_position,) = (
+            user.round_position,
+            target.round_position,
+        )
 
-    Game[game_id].current_position = Player[user_id].round_position
-    commit()
+        game.current_position = user.round_position
 
 
-@db_session
 def exchange_effect(
     target_id: int,
     user_id: int,
     target_chosen_card: int,
     user_chosen_card: int,
 ):
-    target = Player.get(id=target_id)
-    user = Player.get(id=user_id)
-    target_card = Card.get(id=target_chosen_card)
-    user_card = Card.get(id=user_chosen_card)
-
-    unrelate_card_with_player(target_card.id, target.id)
-    unrelate_card_with_player(user_card.id, user.id)
-    relate_card_with_player(target_card.id, user.id)
-    relate_card_with_player(user_card.id, target.id)
-
-    user_is_the_thing = (user_card.idtype == 2) and (user.role == "The Thing")
-    target_is_the_thing = (target_card.idtype == 2) and (
-        target.role == "The Thing"
-    )
+    with open_player_game(user_id) as game:
+        target = game.get_player(target_id)
+        user = game.get_player(user_id)
+
+        game.give_card(target_chosen_card, target.id, user.id)
+        game.give_card(user_chosen_card, user.id, target.id)
+
+        user_is_the_thing = (game.get_idtype(user_chosen_card) == 2) and (
+            user.role == "The Thing"
+        )
+        target_is_the_thing = (game.get_idtype(target_chosen_card) == 2) and (
+            target.role == "The Thing"
+        )
 
-    if user_is_the_thing:
-        target.role = "Infected"
-        commit()
+        if user_is_the_thing:
+            target.role = "Infected"
 
-    if target_is_the_thing:
-        user.role = "Infected"
-        commit()
+        if target_is_the_thing:
+            user.role = "Infected"
 
 
-@db_session
 def seduccion_effect(game_id: int):
-    game = Game.get(id=game_id)
-    game.current_phase = "Exchange"
-    commit()
+    with open_game(game_id) as game:
+        game.current_phase = "Exchange"
 
 
-@db_session
 def flamethower_effect(target_id: int):
-    target_player = Player.get(id=target_id)
-    target_player.alive = False
-    commit()
+    with open_player_game(target_id) as game:
+        game.get_player(target_id).alive = False
 
 
-@db_session
 def locked_door_effect(game_id: int, target_id: int, attacker_id: int):
-    game = Game.get(id=game_id)
-    players = list(game.players)
-    target_position = Player.get(id=target_id).round_position - 1
-    attacker_position = Player.get(id=attacker_id).round_position - 1
-    if target_position == (attacker_position + 1) % len(players):
-        game.locked_doors[target_position] = 1
-    elif target_position == (attacker_position - 1) % len(players):
-        game.locked_doors[attacker_position] = 1
-    # elif target and attacker not are adjacent
-    elif target_position > attacker_position:
-        # set all the doors between them to 1
-        for i in range(attacker_position, target_position):
-            game.locked_doors[i] = 1
-    elif target_position < attacker_position:
-        # set all the doors between them to 1
-        for i in range(target_position, attacker_position):
-            game.locked_doors[i] = 1
-    commit()
-
-
-@db_session
+    with open_game(game_id) as game:
+        doors = game.locked_doors
+        target_position = game.get_player(target_id).round_position - 1
+        attacker_position = game.get_player(attacker_id).round_position - 1
+        if target_position == (attacker_position + 1) % len(doors):
+            doors.lock(target_position)
+        elif target_position == (attacker_position - 1) % len(doors):
+            doors.lock(attacker_position)
+        # elif target and attacker not are adjacent
+        elif target_position > attacker_position:
+            # lock all the doors between them
+            doors.lock_range(attacker_position, target_position)
+        elif target_position < attacker_position:
+            # lock all the doors between them
+            doors.lock_range(target_position, attacker_position)
+
+
 def axe_effect(game_id: int, target_id: int, attacker_id: int):
-    game = Game.get(id=game_id)
-    target_position = Player.get(id=target_id).round_position - 1
-    attacker_position = Player.get(id=attacker_id).round_position - 1
-    print(target_position, attacker_position)
-    # set all the doors between them to 0
-    if target_position > attacker_position:
-        for i in range(attacker_position, target_position):
-            game.locked_doors[i] = 0
-    elif target_position < attacker_position:
-        for i in range(target_position, attacker_position):
-            game.locked_doors[i] = 0
-    commit()
-
-
-@db_session
+    with open_game(game_id) as game:
+        target_position = game.get_player(target_id).round_position - 1
+        attacker_position = game.get_player(attacker_id).round_position - 1
+        # unlock all the doors between them
+        if target_position > attacker_position:
+            game.locked_doors.unlock_range(attacker_position, target_position)
+        elif target_position < attacker_position:
+            game.locked_doors.unlock_range(target_position, attacker_position)
+
+
 def quarantine_effect(target_id: int):
-    player = Player.get(id=target_id)
-    player.quarantine = 2
-    commit()
+    with open_player_game(target_id) as game:
+        game.get_player(target_id).quarantine = 2
 
 
-@db_session
 def test_cuatro_effect(game_id: int):
-    game = Game.get(id=game_id)
-    for p in list(game.players):
-        for i in list(p.hand):
-            if i.idtype == 19 and p.alive:
-                game.current_phase = "Discard"
-                commit()
-                gu.discard(game_id, 19, p.id)
-                game.current_phase = "Draw"
-                gu.draw_no_panic(game_id, p.id)
-        commit()
-
-
-@db_session
+    with open_game(game_id) as game:
+        # Only the players holding the card, all in the same event
+        game.replace_all(19)
+
+
 def cuerdas_podridas_effect(game_id: int):
-    game = Game.get(id=game_id)
-    for p in list(game.players):
-        for i in list(p.hand):
-            if i.idtype == 18 and p.alive:
-                game.current_phase = "Discard"
-                commit()
-                gu.discard(game_id, 18, p.id)
-                game.current_phase = "Draw"
-                gu.draw_no_panic(game_id, p.id)
-    commit()
-
-
-@db_session
+    with open_game(game_id) as game:
+        # Only the players holding the card, all in the same event
+        game.replace_all(18)
+
+
 def olvidadizo_effect(game_id: int, user_id: int):
-    game = Game.get(id=game_id)
-    player = Player.get(id=user_id)
+    with open_game(game_id) as game:
+        player = game.get_player(user_id)
 
-    possible_cards = []
+        possible_cards = []
 
-    is_infected = player.role == "Infected"
-    consider_infected = False
-    consider_olvidadizo = False
+        is_infected = player.role == "Infected"
+        consider_infected = False
+        consider_olvidadizo = False
 
-    for card in list(player.hand):
-        if card.idtype == 2 and is_infected and consider_infected is False:
-            consider_infected = True
-            continue
+        for card in list(player.hand):
+            idtype = game.get_idtype(card)
+            if idtype == 2 and is_infected and consider_infected is False:
+                consider_infected = True
+                continue
 
-        if card.idtype == 23 and consider_olvidadizo is False:
-            consider_olvidadizo = True
-            continue
+            if idtype == 23 and consider_olvidadizo is False:
+                consider_olvidadizo = True
+                continue
 
-        if card.idtype == 1:
-            continue
+            if idtype == 1:
+                continue
 
-        possible_cards.append(card)
+            possible_cards.append(card)
 
-    assert len(possible_cards) >= 3
+        assert len(possible_cards) >= 3
 
-    for i in range(3):
-        game.current_phase = "Discard"
-        commit()
-        gu.discard(game_id, possible_cards[i].idtype, user_id)
+        for i in range(3):
+            game.current_phase = "Discard"
+            game.discard(user_id, game.get_idtype(possible_cards[i]))
 
-    for i in range(3):
-        game.current_phase = "Draw"
-        gu.draw_no_panic(game_id, user_id)
-    commit()
+        for i in range(3):
+            game.current_phase = "Draw"
+            game.draw_no_panic(user_id)
 
 
-@db_session
 def cita_a_ciegas_effect(game_id: int, user_id: int):
-    game = Game.get(id=game_id)
-    game.current_phase = "Discard"
-    commit()
+    with open_game(game_id) as game:
+        game.current_phase = "Discard"
 
-    possible_cards = []
-    is_infected = Player.get(id=user_id).role == "Infected"
-    consider_infected = False
-    consider_cita_a_ciegas = False
+        possible_cards = []
+        player = game.get_player(user_id)
+        is_infected = player.role == "Infected"
+        consider_infected = False
+        consider_cita_a_ciegas = False
 
-    for card in list(Player.get(id=user_id).hand):
-        if card.idtype == 2 and is_infected and consider_infected is False:
-            consider_infected = True
-            continue
+        for card in list(player.hand):
+            idtype = game.get_idtype(card)
+            if idtype == 2 and is_infected and consider_infected is False:
+                consider_infected = True
+                continue
 
-        if card.idtype == 30 and consider_cita_a_ciegas is False:
-            consider_cita_a_ciegas = True
-            continue
+            if idtype == 30 and consider_cita_a_ciegas is False:
+                consider_cita_a_ciegas = True
+                continue
 
-        if card.idtype == 1:
-            continue
+            if idtype == 1:
+                continue
 
-        possible_cards.append(card)
+            possible_cards.append(card)
 
-    random_card = CardOut.from_card(random.choice(possible_cards))
+        random_card = game.rng.choice(possible_cards)
 
-    gu.discard(game_id, random_card.idtype, user_id)
-    game.current_phase = "Draw"
-    gu.draw_no_panic(game_id, user_id)
-    commit()
+        game.discard(user_id, game.get_idtype(random_card))
+        game.current_phase = "Draw"
+        game.draw_no_panic(user_id)
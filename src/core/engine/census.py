@@ -0,0 +1,36 @@
+"""Counters of the alive players of a game by role."""
+from typing import Dict
+
+
+class Census:
+    """Quantity of alive players of each role (Human, The Thing, Infected).
+
+    Kept up to date by PlayerState whenever the role or the alive flag of
+    a player changes, so checking the winners doesn't visit the players.
+    """
+
+    __slots__ = ("alive",)
+
+    def __init__(self):
+        self.alive: Dict[str, int] = {}
+
+    @classmethod
+    def build(cls, players) -> "Census":
+        """Count the alive players by role."""
+        census = cls()
+        for player in players:
+            census.add(player.role, player.alive)
+        return census
+
+    def add(self, role: str, alive: bool, quantity: int = 1) -> None:
+        """Count (or, with a negative quantity, discount) a player."""
+        if alive:
+            self.alive[role] = self.alive.get(role, 0) + quantity
+
+    def count(self, role: str) -> int:
+        """Quantity of alive players of a role."""
+        return self.alive.get(role, 0)
+
+    def total(self) -> int:
+        """Quantity of alive players."""
+        return sum(self.alive.values())
@@ -0,0 +1,145 @@
+"""Available deck kept as shuffled piles of cards."""
+import random
+from itertools import chain
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+
+def _never_panic(card: int) -> bool:
+    """Default classification: every card goes to the regular pile."""
+    return False
+
+
+class ShuffledDeck:
+    """Cards of an available deck in the order they will be drawn.
+
+    The deck is split in two shuffled piles, one with the panic cards and
+    another with the rest, and cards are drawn from the end of a pile. A
+    draw costs O(1) whatever the size of the deck, and so does a draw that
+    must skip the panic cards.
+    """
+
+    __slots__ = ("regular", "panic", "is_panic", "rng")
+
+    def __init__(
+        self,
+        cards: Optional[Iterable[int]] = None,
+        is_panic: Optional[Callable[[int], bool]] = None,
+        rng: Optional[random.Random] = None,
+    ):
+        self.is_panic = is_panic if is_panic is not None else _never_panic
+        # The random generator of the game (see GameState.rng), or one of
+        # its own
+        self.rng = rng if rng is not None else random.Random()
+        self.regular: List[int] = []
+        self.panic: List[int] = []
+        for card in cards if cards is not None else []:
+            self._pile(card).append(card)
+
+    @classmethod
+    def shuffled(
+        cls,
+        cards: Iterable[int],
+        is_panic: Optional[Callable[[int], bool]] = None,
+        rng: Optional[random.Random] = None,
+    ) -> "ShuffledDeck":
+        """Create a deck with the cards in random order."""
+        deck = cls(cards, is_panic, rng)
+        deck.rng.shuffle(deck.regular)
+        deck.rng.shuffle(deck.panic)
+        return deck
+
+    @classmethod
+    def from_order(
+        cls,
+        order: Iterable[int],
+        cards: Iterable[int],
+        is_panic: Optional[Callable[[int], bool]] = None,
+        rng: Optional[random.Random] = None,
+    ) -> "ShuffledDeck":
+        """Create a deck from a stored order and the cards it must have.
+
+        Cards of the order that aren't in the deck anymore are dropped and
+        cards missing from the order are inserted in random positions.
+        """
+        cards = set(cards)
+        seen = set()
+        deck = cls(is_panic=is_panic, rng=rng)
+        for card in order:
+            if card in cards and card not in seen:
+                deck._pile(card).append(card)
+                seen.add(card)
+        for card in sorted(cards - seen):
+            deck.insert(card)
+        return deck
+
+    def _pile(self, card: int) -> List[int]:
+        return self.panic if self.is_panic(card) else self.regular
+
+    def __len__(self) -> int:
+        return len(self.regular) + len(self.panic)
+
+    def __iter__(self) -> Iterator[int]:
+        return chain(self.regular, self.panic)
+
+    def __contains__(self, card: int) -> bool:
+        return card in self._pile(card)
+
+    def count_no_panic(self) -> int:
+        """Count the cards of the deck that aren't of panic type."""
+        return len(self.regular)
+
+    def copy(self) -> "ShuffledDeck":
+        """Return an independent copy of the deck."""
+        deck = ShuffledDeck(is_panic=self.is_panic, rng=self.rng)
+        deck.regular = list(self.regular)
+        deck.panic = list(self.panic)
+        return deck
+
+    def to_list(self) -> List[int]:
+        """Return the cards, each pile in draw order (last drawn first)."""
+        return self.regular + self.panic
+
+    def draw(self) -> int:
+        """Take the next card out of the deck."""
+        if len(self) == 0:
+            raise ValueError("The available deck is empty")
+        # Same odds as drawing from a single shuffled pile
+        if self.rng.randrange(len(self)) < len(self.panic):
+            return self.panic.pop()
+        return self.regular.pop()
+
+    def draw_no_panic(self) -> int:
+        """Take the next card that isn't of panic type out of the deck."""
+        if len(self.regular) == 0:
+            raise ValueError("The available deck has no cards without panic")
+        return self.regular.pop()
+
+    def take_all(self) -> List[int]:
+        """Take every card out of the deck."""
+        cards = self.to_list()
+        self.regular, self.panic = [], []
+        return cards
+
+    def insert(self, card: int) -> None:
+        """Put a card back in a random position of the deck."""
+        pile = self._pile(card)
+        pile.insert(self.rng.randint(0, len(pile)), card)
+
+    def remove(self, card: int) -> None:
+        """Take a specific card out of the deck."""
+        pile = self._pile(card)
+        if len(pile) > 0 and pile[-1] == card:
+            pile.pop()
+        else:
+            pile.remove(card)
+
+    def refill(self, cards: Iterable[int]) -> None:
+        """Add cards to the deck and shuffle it."""
+        for card in cards:
+            self._pile(card).append(card)
+        self.rng.shuffle(self.regular)
+        self.rng.shuffle(self.panic)
@@ -0,0 +1,104 @@
+"""Locked doors of a game as an int bitset."""
+from typing import Iterable
+from typing import Iterator
+from typing import List
+
+
+class Doors:
+    """Doors between the seats of a game (bit i set: door i locked).
+
+    There's a door at the left of every seat: door i is between the round
+    positions i and i + 1, and door 0 between the last position and the
+    first one. Locking a range of doors or asking if there's a locked door
+    between two seats are a couple of bit operations, and the whole set is
+    persisted as a single integer (Game.locked_doors).
+
+    It behaves like the former list of 0/1 (indexing, iteration, equality
+    with lists) for the code and the views that read it.
+    """
+
+    __slots__ = ("size", "mask")
+
+    def __init__(self, size: int, mask: int = 0):
+        self.size = size
+        self.mask = mask & self._full()
+
+    @classmethod
+    def from_list(cls, doors: Iterable[int]) -> "Doors":
+        """Create the doors from a list of 0/1 (1: locked)."""
+        doors = list(doors)
+        mask = 0
+        for i, locked in enumerate(doors):
+            if locked:
+                mask |= 1 << i
+        return cls(len(doors), mask)
+
+    def copy(self) -> "Doors":
+        return Doors(self.size, self.mask)
+
+    def _full(self) -> int:
+        return (1 << self.size) - 1
+
+    def _range(self, start: int, stop: int) -> int:
+        """Bits of the doors start..stop - 1 (wrapping if stop < start)."""
+        if stop < start:
+            return self._range(start, self.size) | self._range(0, stop)
+        return ((1 << (stop - start)) - 1) << start
+
+    # ===================== CHANGES =====================
+
+    def lock(self, door: int) -> None:
+        self.mask |= 1 << door
+
+    def unlock(self, door: int) -> None:
+        self.mask &= ~(1 << door)
+
+    def lock_range(self, start: int, stop: int) -> None:
+        """Lock the doors start..stop - 1."""
+        self.mask |= self._range(start, stop)
+
+    def unlock_range(self, start: int, stop: int) -> None:
+        """Unlock the doors start..stop - 1."""
+        self.mask &= ~self._range(start, stop)
+
+    # ===================== QUERIES =====================
+
+    def is_locked(self, door: int) -> bool:
+        return bool(self.mask >> door & 1)
+
+    def locked_between(self, first: int, last: int) -> bool:
+        """Check if a door is locked going from a round position to another
+        one in increasing positions (wrapping after the last)."""
+        return (
+            self.mask & self._range(first % self.size, last % self.size) != 0
+        )
+
+    # ===================== LIST BEHAVIOR =====================
+
+    def to_list(self) -> List[int]:
+        return [self.mask >> i & 1 for i in range(self.size)]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.to_list())
+
+    def __getitem__(self, door: int) -> int:
+        return int(self.is_locked(door % self.size))
+
+    def __setitem__(self, door: int, locked: int) -> None:
+        if locked:
+            self.lock(door % self.size)
+        else:
+            self.unlock(door % self.size)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Doors):
+            return self.size == other.size and self.mask == other.mask
+        if isinstance(other, list):
+            return self.to_list() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Doors({self.to_list()})"
@@ -0,0 +1,127 @@
+"""Hand of a player indexed by card idtype."""
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Set
+
+
+def _no_idtype(card: int) -> int:
+    """Default classification: every card under idtype 0."""
+    return 0
+
+
+class Hand:
+    """Cards in the hand of a player, in the order they arrived.
+
+    Besides the cards, the hand keeps an index of idtype -> card ids, so
+    checking for, counting or picking the cards of an idtype costs O(1)
+    instead of a scan of the whole hand.
+
+    A hand with an owner also keeps the inverted index of its game
+    (idtype -> ids of the players holding it) up to date.
+    """
+
+    __slots__ = ("cards", "by_idtype", "idtype_of", "owner", "holders")
+
+    def __init__(
+        self,
+        cards: Optional[Iterable[int]] = None,
+        idtype_of: Optional[Callable[[int], int]] = None,
+        owner: Optional[int] = None,
+        holders: Optional[Dict[int, Set[int]]] = None,
+    ):
+        self.idtype_of = idtype_of if idtype_of is not None else _no_idtype
+        self.owner = owner
+        self.holders = holders
+        self.cards: List[int] = []
+        self.by_idtype: Dict[int, List[int]] = {}
+        self.extend(cards if cards is not None else [])
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.cards)
+
+    def __contains__(self, card: int) -> bool:
+        return card in self.cards
+
+    def __getitem__(self, index: int) -> int:
+        return self.cards[index]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Hand):
+            return self.cards == other.cards
+        return self.cards == other
+
+    def __repr__(self) -> str:
+        return f"Hand({self.cards!r})"
+
+    def copy(self) -> "Hand":
+        """Return an independent copy of the hand (without the inverted
+        index, see attach)."""
+        hand = Hand(idtype_of=self.idtype_of, owner=self.owner)
+        hand.cards = list(self.cards)
+        hand.by_idtype = {
+            idtype: list(cards) for idtype, cards in self.by_idtype.items()
+        }
+        return hand
+
+    # ===================== CARDS =====================
+
+    def append(self, card: int) -> None:
+        """Add a card to the hand."""
+        self.cards.append(card)
+        idtype = self.idtype_of(card)
+        if idtype not in self.by_idtype:
+            self.by_idtype[idtype] = []
+            if self.holders is not None and self.owner is not None:
+                self.holders.setdefault(idtype, set()).add(self.owner)
+        self.by_idtype[idtype].append(card)
+
+    def extend(self, cards: Iterable[int]) -> None:
+        for card in cards:
+            self.append(card)
+
+    def remove(self, card: int) -> None:
+        """Take a card out of the hand (ValueError if it isn't there)."""
+        self.cards.remove(card)
+        idtype = self.idtype_of(card)
+        self.by_idtype[idtype].remove(card)
+        if not self.by_idtype[idtype]:
+            del self.by_idtype[idtype]
+            if self.holders is not None and self.owner is not None:
+                self.holders[idtype].discard(self.owner)
+
+    # ===================== IDTYPES =====================
+
+    def of_idtype(self, idtype: int) -> List[int]:
+        """Ids of the cards of an idtype, in the order they arrived."""
+        return list(self.by_idtype.get(idtype, ()))
+
+    def count_idtype(self, idtype: int) -> int:
+        """Count the cards of an idtype."""
+        return len(self.by_idtype.get(idtype, ()))
+
+    def has_idtype(self, idtype: int) -> bool:
+        return idtype in self.by_idtype
+
+    def classify(self, idtype_of: Callable[[int], int]) -> None:
+        """Index the cards by the idtypes of their game, if the hand was
+        made without them."""
+        if self.idtype_of is not _no_idtype:
+            return
+        self.idtype_of = idtype_of
+        self.by_idtype = {}
+        for card in self.cards:
+            self.by_idtype.setdefault(idtype_of(card), []).append(card)
+
+    def attach(self, owner: int, holders: Dict[int, Set[int]]) -> None:
+        """Keep the inverted index of a game with the idtypes of the hand."""
+        self.owner = owner
+        self.holders = holders
+        for idtype in self.by_idtype:
+            holders.setdefault(idtype, set()).add(owner)
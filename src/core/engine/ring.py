@@ -0,0 +1,120 @@
+"""Alive seats of a game as a doubly linked ring."""
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+
+class SeatRing:
+    """Seats (round positions 1..size) of a game, linking the alive ones.
+
+    Every alive seat knows the previous and the next alive seat, so the
+    next turn and the neighbors of a player cost O(1) whatever the
+    quantity of players. Deaths and position swaps update the links of
+    the seats they touch (see PlayerState).
+    """
+
+    __slots__ = ("size", "players", "next", "prev")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.players: Dict[int, Any] = {}  # Position -> PlayerState
+        # Links between alive positions (increasing positions, wrapping)
+        self.next: Dict[int, int] = {}
+        self.prev: Dict[int, int] = {}
+
+    @classmethod
+    def build(cls, players) -> "SeatRing":
+        """Create the ring of some players, linking the alive ones."""
+        ring = cls(len(players))
+        for player in players:
+            # With repeated positions the first player keeps the seat
+            ring.players.setdefault(player.round_position, player)
+        alive = sorted(
+            position
+            for position, player in ring.players.items()
+            if player.alive
+        )
+        for before, after in zip(alive, alive[1:] + alive[:1]):
+            ring.next[before] = after
+            ring.prev[after] = before
+        return ring
+
+    def _step(self, position: int, direction: int) -> int:
+        return (position - 1 + direction) % self.size + 1
+
+    def _is_alive(self, position: int) -> bool:
+        player = self.players.get(position)
+        return player is not None and player.alive
+
+    # ===================== LINKS =====================
+
+    def _link(self, position: int) -> None:
+        before = self._step(position, -1)
+        while before != position and before not in self.next:
+            before = self._step(before, -1)
+        if before == position:
+            # The only alive seat
+            self.next[position] = self.prev[position] = position
+            return
+        after = self.next[before]
+        self.next[before] = position
+        self.prev[position] = before
+        self.next[position] = after
+        self.prev[after] = position
+
+    def _unlink(self, position: int) -> None:
+        before = self.prev.pop(position)
+        after = self.next.pop(position)
+        if before != position:
+            self.next[before] = after
+            self.prev[after] = before
+
+    def refresh(self, position: int) -> None:
+        """Link or unlink a seat after its player changed."""
+        linked = position in self.next
+        if self._is_alive(position) and not linked:
+            self._link(position)
+        elif not self._is_alive(position) and linked:
+            self._unlink(position)
+
+    def move(self, player, old: Optional[int], new: int) -> None:
+        """Sit a player in another position."""
+        if old is not None and self.players.get(old) is player:
+            del self.players[old]
+            self.refresh(old)
+        self.players[new] = player
+        self.refresh(new)
+
+    # ===================== QUERIES =====================
+
+    def player_in(self, position: int):
+        """Player sitting in a position (None if there's nobody)."""
+        return self.players.get(position)
+
+    def following(self, position: int, left: bool = False) -> int:
+        """Next alive position in a direction (left: decreasing positions).
+
+        The position itself may be a dead seat.
+        """
+        links = self.prev if left else self.next
+        if position in links:
+            return links[position]
+        if not self.next:
+            raise ValueError("There are no alive players")
+        direction = -1 if left else 1
+        following = self._step(position, direction)
+        while following not in links:
+            following = self._step(following, direction)
+        return following
+
+    def neighbors(self, position: int) -> List[int]:
+        """Closest alive positions at each side (left first), if any."""
+        neighbors: List[int] = []
+        if not self.next:
+            return neighbors
+        for left in (True, False):
+            following = self.following(position, left)
+            if following != position:
+                neighbors.append(following)
+        return neighbors
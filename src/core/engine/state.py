@@ -0,0 +1,429 @@
+"""In-memory state of a game (players, hands, decks, turn and doors)."""
+import random
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+from typing import Union
+
+from core.engine.census import Census
+from core.engine.deck import ShuffledDeck
+from core.engine.doors import Doors
+from core.engine.hand import Hand
+from core.engine.ring import SeatRing
+
+
+def panic_checker(cards: Dict[int, Tuple[int, str]]) -> Callable[[int], bool]:
+    """Tell if a card of the game is of panic type."""
+
+    def is_panic(card: int) -> bool:
+        return cards[card][1] == "PANIC"
+
+    return is_panic
+
+
+def idtype_getter(cards: Dict[int, Tuple[int, str]]) -> Callable[[int], int]:
+    """Get the idtype of a card of the game."""
+
+    def idtype_of(card: int) -> int:
+        return cards[card][0]
+
+    return idtype_of
+
+
+def stream_seed(seed: int, step: int) -> str:
+    """Seed of the random stream step of a game."""
+    return f"{seed}:{step}"
+
+
+# ===================== PLAYER STATE =====================
+
+
+class PlayerState:
+    """In-memory state of a player."""
+
+    __slots__ = (
+        "id",
+        "name",
+        "_role",
+        "_round_position",
+        "_alive",
+        "quarantine",
+        "hand",
+        "seats",
+        "census",
+    )
+
+    def __init__(
+        self,
+        id: int,
+        name: str,
+        round_position: int,
+        role: str = "Human",
+        alive: bool = True,
+        quarantine: int = 0,
+        hand: Optional[Iterable[int]] = None,
+    ):
+        self.id = id
+        self.name = name
+        self._role = role  # Human, The Thing, Infected
+        # Ring and counters of the game the player is part of
+        self.seats: Optional[SeatRing] = None
+        self.census: Optional[Census] = None
+        self._round_position = round_position
+        self._alive = alive
+        self.quarantine = quarantine
+        # Indexed by idtype once the player is part of a GameState
+        self.hand: Hand = hand if isinstance(hand, Hand) else Hand(hand)
+
+    def copy(self) -> "PlayerState":
+        """Return an independent copy of the player state."""
+        return PlayerState(
+            id=self.id,
+            name=self.name,
+            round_position=self.round_position,
+            role=self.role,
+            alive=self.alive,
+            quarantine=self.quarantine,
+            hand=self.hand.copy(),
+        )
+
+    @property
+    def role(self) -> str:
+        return self._role
+
+    @role.setter
+    def role(self, role: str) -> None:
+        if self.census is not None:
+            self.census.add(self._role, self._alive, -1)
+            self.census.add(role, self._alive)
+        self._role = role
+
+    @property
+    def round_position(self) -> int:
+        return self._round_position
+
+    @round_position.setter
+    def round_position(self, position: int) -> None:
+        old, self._round_position = self._round_position, position
+        if self.seats is not None:
+            self.seats.move(self, old, position)
+
+    @property
+    def alive(self) -> bool:
+        return self._alive
+
+    @alive.setter
+    def alive(self, alive: bool) -> None:
+        if self.census is not None:
+            self.census.add(self._role, self._alive, -1)
+            self.census.add(self._role, alive)
+        self._alive = alive
+        if self.seats is not None:
+            self.seats.refresh(self._round_position)
+
+
+# ===================== GAME STATE =====================
+
+
+class GameState:
+    """In-memory state of a game.
+
+    Every game action reads and modifies this object instead of the
+    database. How it's loaded and persisted is handled by core.engine.store.
+    """
+
+    def __init__(
+        self,
+        id: int,
+        players: Optional[Dict[int, PlayerState]] = None,
+        cards: Optional[Dict[int, Tuple[int, str]]] = None,
+        available_deck: Optional[Iterable[int]] = None,
+        disposable_deck: Optional[List[int]] = None,
+        round_left_direction: bool = False,
+        status: str = "In progress",
+        current_phase: str = "Draw",
+        current_position: int = 1,
+        winners: str = "None",
+        locked_doors: Optional[Union[Doors, int, List[int]]] = None,
+        version: int = 0,
+        seed: int = 0,
+        rng_step: int = 0,
+        rng: Optional[random.Random] = None,
+    ):
+        self.id = id
+        self.players = players if players is not None else {}
+        # Card id -> (idtype, type) of every card used in the game
+        self.cards = cards if cards is not None else {}
+        # Idtype -> ids of the players with cards of it in hand
+        self.holders: Dict[int, Set[int]] = {}
+        idtype_of = idtype_getter(self.cards)
+        for player in self.players.values():
+            player.hand.classify(idtype_of)
+            player.hand.attach(player.id, self.holders)
+        # Alive seats, for the turns and the neighbors
+        self.seats = SeatRing.build(list(self.players.values()))
+        # Alive players by role, for the winners
+        self.census = Census.build(self.players.values())
+        for player in self.players.values():
+            player.seats = self.seats
+            player.census = self.census
+        # Every random decision of the game, from the stream rng_step of
+        # its seed (see reseed)
+        self.seed = seed
+        self.rng_step = rng_step
+        self.rng = (
+            rng
+            if rng is not None
+            else random.Random(stream_seed(seed, rng_step))
+        )
+        # Drawn from the end, see ShuffledDeck
+        self.available_deck = (
+            available_deck
+            if isinstance(available_deck, ShuffledDeck)
+            else ShuffledDeck(available_deck, panic_checker(self.cards))
+        )
+        self.available_deck.rng = self.rng
+        self.disposable_deck = (
+            disposable_deck if disposable_deck is not None else []
+        )
+        self.round_left_direction = round_left_direction
+        self.status = status
+        self.current_phase = current_phase  # Draw, Play, Discard, Exchange
+        self.current_position = current_position
+        self.winners = winners  # Humans, The Thing
+        # A list of 0/1 or a bitset (see Doors), one door per seat
+        if isinstance(locked_doors, Doors):
+            self.locked_doors = locked_doors
+        elif isinstance(locked_doors, int):
+            self.locked_doors = Doors(len(self.players), locked_doors)
+        elif locked_doors is not None:
+            self.locked_doors = Doors.from_list(locked_doors)
+        else:
+            self.locked_doors = Doors(len(self.players))
+        # A hosted game gets a new (greater) one for every event, 0: none
+        self.version = version
+
+    def copy(self) -> "GameState":
+        """Return an independent copy of the game state."""
+        return GameState(
+            id=self.id,
+            players={id: p.copy() for id, p in self.players.items()},
+            cards=self.cards,  # Never modified during the game
+            available_deck=self.available_deck.copy(),
+            disposable_deck=list(self.disposable_deck),
+            round_left_direction=self.round_left_direction,
+            status=self.status,
+            current_phase=self.current_phase,
+            current_position=self.current_position,
+            winners=self.winners,
+            locked_doors=self.locked_doors.copy(),
+            version=self.version,
+            seed=self.seed,
+            rng_step=self.rng_step,
+            rng=self._copy_rng(),
+        )
+
+    # ===================== RANDOMNESS =====================
+
+    def _copy_rng(self) -> random.Random:
+        # Seeded with a constant, taking entropy from the system is slow
+        rng = random.Random(0)
+        rng.setstate(self.rng.getstate())
+        return rng
+
+    def reseed(self) -> None:
+        """Start the next random stream of the game.
+
+        Every event of the game draws from its own stream (seed, step), so
+        replaying the same events from the same state repeats every random
+        decision, whether the game was hosted, reloaded or neither.
+        """
+        self.rng_step += 1
+        self.rng.seed(stream_seed(self.seed, self.rng_step))
+
+    # ===================== PLAYERS =====================
+
+    def exists_player(self, id_player: int) -> bool:
+        """Check if a player is part of the game."""
+        return id_player in self.players
+
+    def get_player(self, id_player: int) -> PlayerState:
+        """Get a player of the game."""
+        if id_player not in self.players:
+            raise ValueError(f"Player with id {id_player} doesn't exist")
+        return self.players[id_player]
+
+    def get_player_in_position(self, position: int) -> Optional[PlayerState]:
+        """Get the player sitting in a round position."""
+        return self.seats.player_in(position)
+
+    def next_position(self, position: int) -> int:
+        """Get the next alive position following the round direction."""
+        return self.seats.following(position, self.round_left_direction)
+
+    def alive_neighbors(self, id_player: int) -> List[int]:
+        """Get the ids of the alive neighbors of a player (left first)."""
+        position = self.get_player(id_player).round_position
+        return [
+            self.seats.player_in(neighbor).id
+            for neighbor in self.seats.neighbors(position)
+        ]
+
+    def door_locked_between(self, id_player: int, id_other: int) -> bool:
+        """Check if locked doors separate two alive neighbors.
+
+        The players are separated when every side by which they are
+        neighbors has a locked door (with two alive players, both sides).
+        """
+        if not self.locked_doors.mask:
+            return False
+        position = self.get_player(id_player).round_position
+        other = self.get_player(id_other).round_position
+        sides = []
+        if self.seats.following(position) == other:
+            sides.append((position, other))
+        if self.seats.following(position, left=True) == other:
+            sides.append((other, position))
+        return bool(sides) and all(
+            self.locked_doors.locked_between(first, last)
+            for first, last in sides
+        )
+
+    def count_alive(self, role: Optional[str] = None) -> int:
+        """Count the alive players (of a role, if given)."""
+        if role is None:
+            return self.census.total()
+        return self.census.count(role)
+
+    # ===================== CARDS =====================
+
+    def get_idtype(self, id_card: int) -> int:
+        """Get the idtype of a card of the game."""
+        if id_card not in self.cards:
+            raise ValueError(f"Card with id {id_card} doesn't exist")
+        return self.cards[id_card][0]
+
+    def get_card_type(self, id_card: int) -> str:
+        """Get the type (category) of a card of the game."""
+        if id_card not in self.cards:
+            raise ValueError(f"Card with id {id_card} doesn't exist")
+        return self.cards[id_card][1]
+
+    def get_cards_in_hand(self, id_player: int, idtype_card: int) -> List[int]:
+        """Get the ids of the cards of an idtype in the player's hand."""
+        return self.get_player(id_player).hand.of_idtype(idtype_card)
+
+    def count_in_hand(self, id_player: int, idtype_card: int) -> int:
+        """Count the cards of an idtype in the player's hand."""
+        return self.get_player(id_player).hand.count_idtype(idtype_card)
+
+    def holders_of(self, idtype_card: int) -> List[int]:
+        """Get the ids of the players with cards of an idtype in hand."""
+        return sorted(self.holders.get(idtype_card, ()))
+
+    def give_card(self, id_card: int, id_from: int, id_to: int) -> None:
+        """Move a card from the hand of a player to another's."""
+        from_player = self.get_player(id_from)
+        to_player = self.get_player(id_to)
+        if id_card not in from_player.hand:
+            raise ValueError(
+                f"Card with id {id_card} not related with player with id {id_from}"
+            )
+        from_player.hand.remove(id_card)
+        to_player.hand.append(id_card)
+
+    # ===================== DECKS =====================
+
+    def move_disposable_to_available_deck(self) -> None:
+        """
+        Move all cards from disposable deck to available deck
+        Pre: SZ(disposable_deck) > 0 and SZ(available_deck) = 0
+        """
+        if len(self.disposable_deck) > 0 and len(self.available_deck) == 0:
+            self.available_deck.refill(self.disposable_deck)
+            self.disposable_deck = []
+        else:
+            raise ValueError(
+                f"Disposable deck with id {self.id} is empty or available deck with id {self.id} is not empty"
+            )
+
+    def _draw_available_card(self) -> int:
+        """Take the next card out of the available deck."""
+        if len(self.available_deck) == 0:
+            self.move_disposable_to_available_deck()
+
+        return self.available_deck.draw()
+
+    def draw(self, id_player: int) -> int:
+        """Draw a card from the available deck."""
+        player = self.get_player(id_player)
+        if self.current_phase != "Draw":
+            raise ValueError(
+                f"Game with id {self.id} is not in the Draw phase"
+            )
+
+        card = self._draw_available_card()
+        player.hand.append(card)
+        return card
+
+    def draw_no_panic(self, id_player: int) -> int:
+        """Draw a card from the available deck. The card isn't of panic type."""
+        player = self.get_player(id_player)
+
+        if self.available_deck.count_no_panic() == 0:
+            # Only panic cards left: discard them and reshuffle
+            self.disposable_deck.extend(self.available_deck.take_all())
+            self.move_disposable_to_available_deck()
+
+        card = self.available_deck.draw_no_panic()
+        player.hand.append(card)
+        return card
+
+    def replace_all(
+        self, idtype_card: int, alive_only: bool = True
+    ) -> Dict[int, List[Tuple[int, int]]]:
+        """Every player with cards of an idtype discards them and draws a
+        card that isn't of panic type for each one.
+
+        Only the players holding the idtype are visited. Return the
+        (discarded, drawn) cards of each of them.
+        """
+        replaced: Dict[int, List[Tuple[int, int]]] = {}
+        for id_player in self.holders_of(idtype_card):
+            player = self.players[id_player]
+            if alive_only and not player.alive:
+                continue
+            replaced[id_player] = []
+            for card in player.hand.of_idtype(idtype_card):
+                player.hand.remove(card)
+                self.disposable_deck.append(card)
+                replaced[id_player].append(
+                    (card, self.draw_no_panic(id_player))
+                )
+        return replaced
+
+    def discard(self, id_player: int, idtype_card: int) -> int:
+        """Discard a card from player hand."""
+        if self.current_phase != "Discard":
+            raise ValueError(
+                f"Game with id {self.id} is not in the Discard phase"
+            )
+        player = self.get_player(id_player)
+        if len(player.hand) == 0:
+            raise ValueError(
+                f"Player with id {id_player} has no cards in hand"
+            )
+        cards = self.get_cards_in_hand(id_player, idtype_card)
+        if len(cards) == 0:
+            raise ValueError(
+                f"Player with id {id_player} has no card with idtype {idtype_card} in hand"
+            )
+
+        card = self.rng.choice(cards)
+        player.hand.remove(card)
+        self.disposable_deck.append(card)
+        return card
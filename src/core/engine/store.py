@@ -0,0 +1,513 @@
+"""Hosting of in-memory game states and their persistence in the database."""
+import asyncio
+import itertools
+import logging
+import random
+import threading
+from contextlib import contextmanager
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from core.engine.deck import ShuffledDeck
+from core.engine.state import GameState
+from core.engine.state import panic_checker
+from core.engine.state import PlayerState
+from core.engine.state import stream_seed
+from models.game import Card
+from models.game import Game
+from models.game import GameCard
+from models.game import Player
+from pony.orm import db_session
+
+# Seconds between two flushes of the hosted games to the database
+FLUSH_INTERVAL = 0.5
+
+logger = logging.getLogger(__name__)
+
+# ===================== DATABASE <-> STATE =====================
+
+
+def _load_shared_cards(
+    game: Game, cards: Dict[int, Tuple[int, str]], rng: random.Random
+):
+    """Read where the cards of a game are from the shared decks and hands."""
+
+    def card_ids(collection) -> List[int]:
+        ids = []
+        for card in collection:
+            cards[card.id] = (card.idtype, card.type)
+            ids.append(card.id)
+        ids.sort()
+        return ids
+
+    hands = {player.id: card_ids(player.hand) for player in game.players}
+
+    available_deck, disposable_deck = ShuffledDeck(), []
+    if game.deck is not None:
+        if game.deck.available_deck is not None:
+            available = game.deck.available_deck
+            available_deck = ShuffledDeck.from_order(
+                list(available.order) + list(available.panic_order),
+                card_ids(available.cards),
+                panic_checker(cards),
+                rng,
+            )
+        if game.deck.disposable_deck is not None:
+            disposable_deck = card_ids(game.deck.disposable_deck.cards)
+
+    return hands, available_deck, disposable_deck
+
+
+def _load_card_instances(
+    game: Game, cards: Dict[int, Tuple[int, str]], rng: random.Random
+):
+    """Read where the cards of a game are from its card instances."""
+    hands: Dict[int, List[int]] = {player.id: [] for player in game.players}
+    available: List[int] = []
+    disposable_deck: List[int] = []
+    instances = GameCard.select(lambda c: c.game == game).prefetch(Card)
+    for instance in sorted(instances, key=lambda c: c.order):
+        card = instance.card
+        cards[card.id] = (card.idtype, card.type)
+        if instance.location == "hand":
+            hands[instance.owner.id].append(card.id)
+        elif instance.location == "available":
+            available.append(card.id)
+        else:
+            disposable_deck.append(card.id)
+
+    available_deck = ShuffledDeck(available, panic_checker(cards), rng)
+    return hands, available_deck, disposable_deck
+
+
+def load_game_state(id_game: int) -> GameState:
+    """Build the in-memory state of a game from the database."""
+    with db_session:
+        game = Game.get(id=id_game)
+        if game is None:
+            raise ValueError(f"Game with id {id_game} doesn't exist")
+
+        cards: Dict[int, Tuple[int, str]] = {}
+        # Stream of the game where it was left (see GameState.reseed)
+        rng = random.Random(stream_seed(game.seed, game.rng_step))
+        if game.card_instances:
+            hands, available_deck, disposable_deck = _load_card_instances(
+                game, cards, rng
+            )
+        else:
+            hands, available_deck, disposable_deck = _load_shared_cards(
+                game, cards, rng
+            )
+
+        players = {}
+        for player in game.players:
+            players[player.id] = PlayerState(
+                id=player.id,
+                name=player.name,
+                round_position=player.round_position,
+                role=player.role,
+                alive=player.alive,
+                quarantine=player.quarantine,
+                hand=hands[player.id],
+            )
+
+        return GameState(
+            id=game.id,
+            players=players,
+            cards=cards,
+            available_deck=available_deck,
+            disposable_deck=disposable_deck,
+            round_left_direction=game.round_left_direction,
+            status=game.status,
+            current_phase=game.current_phase,
+            current_position=game.current_position,
+            winners=game.winners,
+            locked_doors=game.locked_doors,
+            seed=game.seed,
+            rng_step=game.rng_step,
+            rng=rng,
+        )
+
+
+def _sync_cards(collection, wanted: Iterable[int]) -> None:
+    """Make a card collection of the database hold exactly these cards."""
+    wanted = set(wanted)
+    current = {card.id for card in collection}
+    if current - wanted:
+        collection.remove([Card[id] for id in current - wanted])
+    if wanted - current:
+        collection.add([Card[id] for id in wanted - current])
+
+
+def _save_shared_cards(game: Game, state: GameState) -> None:
+    """Write where the cards are to the shared decks and hands."""
+    for player in game.players:
+        if player.id in state.players:
+            _sync_cards(player.hand, state.players[player.id].hand)
+
+    if game.deck is not None:
+        if game.deck.available_deck is not None:
+            available = game.deck.available_deck
+            _sync_cards(available.cards, state.available_deck)
+            deck = state.available_deck
+            if list(available.order) != deck.regular:
+                available.order = list(deck.regular)
+            if list(available.panic_order) != deck.panic:
+                available.panic_order = list(deck.panic)
+        if game.deck.disposable_deck is not None:
+            _sync_cards(game.deck.disposable_deck.cards, state.disposable_deck)
+
+
+def _card_locations(state: GameState) -> Dict[int, Tuple[str, int, int]]:
+    """Card id -> (location, owner id, order) of every card of a state."""
+    locations = {}
+    for player in state.players.values():
+        for order, card in enumerate(player.hand):
+            locations[card] = ("hand", player.id, order)
+    for order, card in enumerate(state.available_deck.to_list()):
+        locations[card] = ("available", None, order)
+    for order, card in enumerate(state.disposable_deck):
+        locations[card] = ("disposable", None, order)
+    return locations
+
+
+def _save_card_instances(game: Game, state: GameState) -> None:
+    """Write where the cards are to the card instances of the game.
+
+    Only the instances that moved are written, each one with an UPDATE.
+    """
+    locations = _card_locations(state)
+    for instance in GameCard.select(lambda c: c.game == game):
+        location, owner, order = locations[instance.card.id]
+        if instance.location != location:
+            instance.location = location
+        if (instance.owner.id if instance.owner else None) != owner:
+            instance.owner = Player[owner] if owner is not None else None
+        if instance.order != order:
+            instance.order = order
+
+
+def save_game_state(state: GameState) -> None:
+    """Write the in-memory state of a game to the database."""
+    with db_session:
+        game = Game.get(id=state.id)
+        if game is None:
+            # The game was deleted while its state was waiting to be saved
+            return
+
+        game.round_left_direction = state.round_left_direction
+        game.status = state.status
+        game.current_phase = state.current_phase
+        game.current_position = state.current_position
+        game.winners = state.winners
+        game.rng_step = state.rng_step
+        if game.locked_doors != state.locked_doors.mask:
+            game.locked_doors = state.locked_doors.mask
+
+        for player in game.players:
+            player_state = state.players.get(player.id)
+            if player_state is None:
+                continue
+            player.role = player_state.role
+            player.round_position = player_state.round_position
+            player.alive = player_state.alive
+            player.quarantine = player_state.quarantine
+
+        if game.card_instances:
+            _save_card_instances(game, state)
+        else:
+            _save_shared_cards(game, state)
+
+
+def use_card_instances(id_game: int) -> None:
+    """
+    Move the cards of a game from the shared decks and hands to card
+    instances of its own (GameCard). From then on moving a card is a single
+    UPDATE and the game doesn't touch the Card rows used by other games.
+    The functions of core.game_logic only work with the shared cards.
+    """
+    with db_session:
+        state = load_game_state(id_game)
+        game = Game.get(id=id_game)
+        if game.card_instances:
+            return
+
+        for id_card in state.cards:
+            GameCard(game=game, card=Card[id_card], location="available")
+
+        for player in game.players:
+            player.hand.clear()
+        if game.deck is not None:
+            if game.deck.available_deck is not None:
+                game.deck.available_deck.cards.clear()
+                game.deck.available_deck.order = []
+                game.deck.available_deck.panic_order = []
+            if game.deck.disposable_deck is not None:
+                game.deck.disposable_deck.cards.clear()
+
+        game.card_instances = True
+        save_game_state(state)
+
+
+def save_game_states(states: Iterable[GameState]) -> None:
+    """Write several game states to the database in one transaction."""
+    with db_session:
+        for state in states:
+            save_game_state(state)
+
+
+# ===================== HOSTED GAMES =====================
+
+
+# Versions of the hosted states, never reused (not even by failed events)
+_versions = itertools.count(1)
+
+
+class GameStore:
+    """Games hosted in memory by the server.
+
+    The state of a hosted game is the authoritative one: game actions only
+    modify it in memory and the store writes the modified games to the
+    database in batches (write-behind).
+    """
+
+    def __init__(self):
+        self.states: Dict[int, GameState] = {}
+        self.dirty: set[int] = set()
+        self.lock = threading.Lock()
+        # Events of a game are applied one at a time (see game_event)
+        self.event_locks: Dict[int, threading.RLock] = {}
+
+    def is_hosted(self, id_game: int) -> bool:
+        """Check if a game is hosted in memory."""
+        return id_game in self.states
+
+    def get(self, id_game: int) -> Optional[GameState]:
+        """Get the state of a hosted game (None if it isn't hosted)."""
+        return self.states.get(id_game)
+
+    def host(self, id_game: int) -> GameState:
+        """Host a game in memory, loading it from the database if needed."""
+        with self.lock:
+            if id_game not in self.states:
+                state = load_game_state(id_game)
+                state.version = next(_versions)
+                self.states[id_game] = state
+            return self.states[id_game]
+
+    def release(self, id_game: int) -> None:
+        """Stop hosting a game, discarding the changes not flushed."""
+        with self.lock:
+            self.states.pop(id_game, None)
+            self.dirty.discard(id_game)
+            self.event_locks.pop(id_game, None)
+
+    def event_lock(self, id_game: int) -> threading.RLock:
+        """Get the lock that serializes the events of a game."""
+        with self.lock:
+            return self.event_locks.setdefault(id_game, threading.RLock())
+
+    def find_player_game(self, id_player: int) -> Optional[int]:
+        """Get the id of the hosted game where a player is playing."""
+        for id_game, state in list(self.states.items()):
+            if id_player in state.players:
+                return id_game
+        return None
+
+    def commit(self, id_game: int, state: GameState) -> None:
+        """Replace the state of a hosted game with a modified copy of it."""
+        with self.lock:
+            # The game may have been released while the copy was modified
+            if id_game in self.states:
+                self.states[id_game] = state
+                self.dirty.add(id_game)
+
+    def mark_dirty(self, id_game: int) -> None:
+        """Mark a hosted game as modified since the last flush."""
+        with self.lock:
+            if id_game in self.states:
+                self.dirty.add(id_game)
+
+    def collect_dirty(self) -> List[GameState]:
+        """Take a copy of every modified game and mark them as clean."""
+        with self.lock:
+            states = [self.states[id].copy() for id in self.dirty]
+            self.dirty.clear()
+        return states
+
+    def save(self, states: List[GameState]) -> None:
+        """Write collected games to the database.
+
+        If the batch can't be written its games are marked as modified
+        again, so a later flush retries them.
+        """
+        try:
+            save_game_states(states)
+        except Exception:
+            for state in states:
+                self.mark_dirty(state.id)
+            raise
+
+    def flush(self) -> int:
+        """Write every modified game to the database right now."""
+        states = self.collect_dirty()
+        if states:
+            self.save(states)
+        return len(states)
+
+    async def _save_in_thread(self, states: List[GameState]) -> None:
+        try:
+            await asyncio.to_thread(self.save, states)
+        except Exception:
+            # The games are retried by the next flush
+            logger.exception("Failed to flush %d games", len(states))
+
+    async def flush_forever(self, interval: float = FLUSH_INTERVAL) -> None:
+        """Flush the modified games periodically, outside the event loop.
+
+        A failed flush is logged and retried on the next one. When the task
+        is cancelled it waits for the save in progress, so no older state
+        is written after the last flush.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            states = self.collect_dirty()
+            if not states:
+                continue
+            saving = asyncio.ensure_future(self._save_in_thread(states))
+            try:
+                await asyncio.shield(saving)
+            except asyncio.CancelledError:
+                await saving
+                raise
+
+
+game_store = GameStore()
+
+# ===================== OPEN GAMES =====================
+
+_local = threading.local()
+
+
+def _opened_states() -> Dict[int, GameState]:
+    """Games opened in the current thread (shared by nested calls)."""
+    if not hasattr(_local, "states"):
+        _local.states = {}
+    return _local.states
+
+
+@contextmanager
+def open_game(id_game: int) -> Iterator[GameState]:
+    """Open the state of a game to read or modify it.
+
+    Nested calls share the same state. A hosted game is modified in memory
+    and flushed later by the store; any other game is loaded from the
+    database and saved back when the outermost call finishes successfully.
+    """
+    opened = _opened_states()
+    if id_game in opened:
+        yield opened[id_game]
+        return
+
+    state = game_store.get(id_game)
+    if state is not None:
+        opened[id_game] = state
+        try:
+            yield state
+        finally:
+            del opened[id_game]
+            game_store.mark_dirty(id_game)
+        return
+
+    with db_session:
+        state = load_game_state(id_game)
+        opened[id_game] = state
+        try:
+            yield state
+        finally:
+            del opened[id_game]
+        save_game_state(state)
+
+
+@contextmanager
+def open_state(state: GameState) -> Iterator[GameState]:
+    """Open a game state that only lives in memory (headless games).
+
+    Meanwhile the game functions called in this thread (open_game,
+    open_player_game, game_event) use it, without the store or the
+    database.
+    """
+    opened = _opened_states()
+    if state.id in opened:
+        raise ValueError(f"Game with id {state.id} is already opened")
+    opened[state.id] = state
+    try:
+        yield state
+    finally:
+        del opened[state.id]
+
+
+@contextmanager
+def game_event(id_game: int) -> Iterator[GameState]:
+    """Apply one inbound event to a game as a single unit of work.
+
+    Every change of the event (including intermediate phases) is made in
+    memory and kept only if the whole event finishes without errors: a
+    hosted game is modified on a copy that replaces it at the end, any other
+    game is saved in one transaction. Nested calls join the current event
+    and the events of a hosted game never run at the same time.
+    """
+    opened = _opened_states()
+    if id_game in opened:
+        with open_game(id_game) as state:
+            yield state
+        return
+    if not game_store.is_hosted(id_game):
+        with open_game(id_game) as state:
+            state.reseed()
+            yield state
+        return
+
+    with game_store.event_lock(id_game):
+        hosted = game_store.get(id_game)
+        if hosted is None:
+            # Released while waiting for the lock
+            raise ValueError(f"Game with id {id_game} doesn't exist")
+
+        state = hosted.copy()
+        state.version = next(_versions)
+        state.reseed()
+        opened[id_game] = state
+        try:
+            yield state
+        finally:
+            del opened[id_game]
+        game_store.commit(id_game, state)
+
+
+def get_player_game_id(id_player: int) -> int:
+    """Get the id of the game where a player is playing."""
+    for state in _opened_states().values():
+        if id_player in state.players:
+            return state.id
+
+    id_game = game_store.find_player_game(id_player)
+    if id_game is not None:
+        return id_game
+
+    with db_session:
+        player = Player.get(id=id_player)
+        if player is None or player.game.is_empty():
+            raise ValueError(f"Player with id {id_player} doesn't exist")
+        return player.game.select().first().id
+
+
+@contextmanager
+def open_player_game(id_player: int) -> Iterator[GameState]:
+    """Open the state of the game where a player is playing."""
+    with open_game(get_player_game_id(id_player)) as state:
+        yield state
@@ -0,0 +1,209 @@
+"""Game events received by the websocket."""
+from typing import Any
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+
+from core.engine.store import game_event
+from core.engine.store import open_game
+from core.game import get_card_idtype
+from core.game import handle_cannot_exchange
+from core.game import handle_defense
+from core.game import handle_discard
+from core.game import handle_exchange
+from core.game import handle_exchange_defense
+from core.game import handle_not_target
+from core.game import handle_play
+from core.game import is_in_quarantine
+from core.game import try_defense
+from core.game_logic.rules import is_private_reveal
+from core.views import game_updates
+from core.views import view_tracker
+from schemas.socket import GameMessage
+
+# Events that are applied to the game state
+GAME_ACTIONS = [
+    "play",
+    "defense",
+    "exchange",
+    "cannot_exchange",
+    "exchange_defense",
+    "discard",
+    "game_status",
+]
+
+
+class Outgoing(NamedTuple):
+    """Message to send once an event is applied."""
+
+    message: Any
+    user_id: Optional[int] = None  # None: everybody in the room
+
+
+def game_info(room_id: int) -> List[Outgoing]:
+    """The update of every player: what changed in their view of the game
+    since the last one they got (the full game_info if there's none)."""
+    with open_game(room_id) as game:
+        return [
+            Outgoing(update, id) for id, update in game_updates(game).items()
+        ]
+
+
+def game_status(room_id: int, user_id: int) -> List[Outgoing]:
+    """The full game_info of a player (on connect, or after a gap)."""
+    with open_game(room_id) as game:
+        return [Outgoing(view_tracker.snapshot(game, user_id), user_id)]
+
+
+def handle_game_event(
+    room_id: int, user_id: int, data: dict
+) -> List[Outgoing]:
+    """Apply a game event and return the messages to send, in order.
+
+    The whole event is a single unit of work: if it fails, none of its
+    changes are kept.
+    """
+    try:
+        with game_event(room_id):
+            messages = _apply_game_event(room_id, user_id, data)
+
+            if is_in_quarantine(room_id, user_id):
+                card_dict = {
+                    "play": data.get("played_card", None),
+                    "discard": data.get("played_card", None),
+                    "defense": data.get("played_defense", None),
+                    "exchange": data.get("chosen_card", None),
+                    "exchange_defense": data.get("chosen_card", None),
+                    "cannot_exchange": None,
+                }
+                if data["type"] in card_dict and card_dict[data["type"]] != 0:
+                    messages.append(
+                        Outgoing(
+                            GameMessage.create(
+                                "quarantine",
+                                room_id,
+                                user_id,
+                                card_dict[data["type"]],
+                            )
+                        )
+                    )
+    except Exception:
+        # The players may have got part of the updates, start over from
+        # the full game_info
+        view_tracker.reset(room_id)
+        raise
+
+    return messages
+
+
+def _apply_game_event(
+    room_id: int, user_id: int, data: dict
+) -> List[Outgoing]:
+    messages = []
+    match data["type"]:
+        case "play":
+            response = handle_play(
+                room_id,
+                data["played_card"],
+                data["card_target"],
+            )
+            messages.append(Outgoing(response))
+
+            if data["card_target"] == user_id:
+                response, effect = handle_not_target(
+                    room_id,
+                    data["played_card"],
+                    user_id,
+                )
+
+                if effect is not None:
+                    messages.append(Outgoing(effect))
+
+                messages.extend(game_info(room_id))
+            else:
+                defense_response = try_defense(
+                    room_id,
+                    data["played_card"],
+                    data["card_target"],
+                )
+                messages.append(Outgoing(defense_response))
+
+        case "defense":
+            response, effect = handle_defense(
+                game_id=room_id,
+                card_type_id=data["played_defense"],
+                attacker_id=data["target_player"],
+                last_card_played_id=data["last_played_card"],
+                defense_player_id=user_id,
+            )
+
+            messages.append(Outgoing(response))
+            private_attack = is_private_reveal(
+                get_card_idtype(data["last_played_card"])
+            )
+            private_defense = is_private_reveal(
+                get_card_idtype(data["played_defense"])
+            )
+            no_defense = data["played_defense"] == 0
+            if effect is not None:
+                if private_attack and no_defense:
+                    messages.append(Outgoing(effect, data["target_player"]))
+                elif private_defense:
+                    messages.append(Outgoing(effect, user_id))
+                else:
+                    messages.append(Outgoing(effect))
+
+            messages.extend(game_info(room_id))
+
+        case "exchange":
+            exchange_res = handle_exchange(
+                user_id,
+                data["chosen_card"],
+                data["target_player"],
+            )
+            messages.append(Outgoing(exchange_res))
+
+        case "cannot_exchange":
+            draw_response, next_player_id = handle_cannot_exchange(room_id)
+
+            messages.append(Outgoing(draw_response, next_player_id))
+            messages.extend(game_info(room_id))
+
+        case "exchange_defense":
+            draw_response, next_player_id, effect = handle_exchange_defense(
+                game_id=room_id,
+                current_player_id=user_id,
+                exchange_requester=data["exchange_requester_id"],
+                last_chosen_card=data["last_chose"],
+                chosen_card=data["chosen_card"],
+                is_defense=data["is_defense"],
+            )
+
+            private_defense = is_private_reveal(
+                get_card_idtype(data["chosen_card"])
+            )
+            if effect is not None:
+                if private_defense and data["is_defense"]:
+                    messages.append(Outgoing(effect, user_id))
+                else:
+                    messages.append(Outgoing(effect))
+
+            messages.append(Outgoing(draw_response, next_player_id))
+            messages.append(Outgoing({"type": "exchange_end"}))
+            messages.extend(game_info(room_id))
+
+        case "discard":
+            handle_discard(room_id, data["played_card"], user_id)
+
+            res = {
+                "type": "discard",
+                "played_card": data["played_card"],
+            }
+            messages.append(Outgoing(res))
+            messages.extend(game_info(room_id))
+
+        case "game_status":
+            # Asked on connect or after a gap: only to whoever asked
+            messages.extend(game_status(room_id, user_id))
+
+    return messages
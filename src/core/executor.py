@@ -0,0 +1,31 @@
+"""Thread pool where the blocking game logic runs, outside the event loop."""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from typing import Callable
+
+from pony.orm import db_session
+
+# Threads running game commands (Pony and SQLite calls block)
+GAME_WORKERS = 8
+
+game_executor = ThreadPoolExecutor(
+    max_workers=GAME_WORKERS, thread_name_prefix="game"
+)
+
+
+def _run_in_session(func: Callable[..., Any], args, kwargs) -> Any:
+    with db_session:
+        return func(*args, **kwargs)
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run blocking game logic in the thread pool, inside a db_session.
+
+    The event loop keeps serving the other sockets while it runs.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        game_executor, functools.partial(_run_in_session, func, args, kwargs)
+    )
@@ -3,13 +3,15 @@ from typing import Optional
 
 import core.game_logic.game_utility as gu
 from core.connections import ConnectionManager
+from core.engine.store import open_game
+from core.engine.store import use_card_instances
+from core.game_logic.card_creation import get_card_info
 from core.game_logic.game_effects import play
-from core.game_logic.game_utility import draw_no_panic
 from core.game_logic.game_utility import get_defense_cards
+from core.game_logic.rules import can_defend
+from core.game_logic.rules import EXCHANGE
 from core.player import create_player
-from models.game import Card
 from models.game import Game
-from models.game import Player
 from models.room import Room
 from pony.orm import commit
 from pony.orm import db_session
@@ -20,25 +22,23 @@ from schemas.socket import GameMessage
 connection_manager = ConnectionManager()
 
 
-@db_session
 def get_card_idtype(card_id: int):
-    card = Card.get(id=card_id)
-    return card.idtype
+    return get_card_info(card_id).idtype
 
 
 @db_session
-def init_players(room_id: int, game: Game):
+def init_players(room_id: int, game: Game, rng: random.Random):
     room = Room.get(id=room_id)
     if room.in_game:
         raise PermissionError("Game is in progress (iP)")
 
     # To get random order of players
-    user_list = list(room.users)
-    random.shuffle(user_list)
+    user_list = sorted(room.users, key=lambda user: user.id)
+    rng.shuffle(user_list)
 
     # To get random order of positions
     round_position = list(range(1, len(user_list) + 1))
-    random.shuffle(round_position)
+    rng.shuffle(round_position)
 
     # Create players and deal cards
 
@@ -47,7 +47,7 @@ def init_players(room_id: int, game: Game):
         player = create_player(
             room_id, game, user_list[index].id, round_position[index]
         )
-        gu.get_initial_player_hand(room_id, player.id)
+        gu.get_initial_player_hand(room_id, player.id, rng)
         index += 1
 
     # Set the thing
@@ -59,38 +59,42 @@ def init_players(room_id: int, game: Game):
     # The first player to game must to have one extra card (role position 1)
     for player in game.players:
         if player.round_position == game.current_position:
-            gu.draw(room_id, player.id)
+            gu.draw(room_id, player.id, rng)
             break
 
     commit()
 
 
 @db_session
-def init_game(room_id: int):
+def init_game(
+    room_id: int, card_instances: bool = False, seed: Optional[int] = None
+):
     room = Room.get(id=room_id)
     if room.in_game:
         raise PermissionError("Game is in progress (iG)")
+    # Every random decision of the game comes from its seed
+    if seed is None:
+        seed = random.getrandbits(62)
+    rng = random.Random(seed)
     deck = gu.initialize_decks(
-        id_game=room_id, quantity_players=len(room.users)
+        id_game=room_id, quantity_players=len(room.users), rng=rng
     )
-    locked_doors = [0 for i in range(len(room.users))]
-    game = Game(id=room_id, deck=deck, locked_doors=locked_doors)
+    game = Game(id=room_id, deck=deck, seed=seed)
     commit()
-    init_players(room_id, game)
+    init_players(room_id, game, rng)
+    if card_instances:
+        use_card_instances(room_id)
 
 
-@db_session
 def play_card(
     game_id: int,
     card_idtype: int,
     current_player_id: int,
     target_player_id: Optional[int] = None,
 ):
-    try:
-        game = Game.get(id=game_id)
+    with open_game(game_id) as game:
         game.current_phase = "Play"
-        commit()
-        current_player = Player.get(id=current_player_id)
+        current_player = game.get_player(current_player_id)
         if target_player_id == 0:
             target_player_id = None
 
@@ -103,44 +107,15 @@ def play_card(
         )
 
         game.current_phase = "Discard"
-        commit()
-        gu.discard(
-            id_game=game_id,
-            idtype_card=card_idtype,
-            id_player=current_player.id,
-        )
-    except ValueError as e:
-        print("ERROR:", str(e))
+        game.discard(current_player.id, card_idtype)
 
     return effect
 
 
-@db_session
 def calculate_next_turn(game_id: int):
-    game = Game.get(id=game_id)
-    players = list(game.players)
-    current_player_position = game.current_position
-    # select as next player the next player alive in the round direction
-    next_player_position = current_player_position
-    while True:
-        if not game.round_left_direction:
-            next_player_position += 1
-            if next_player_position > len(players):
-                next_player_position = 1
-        else:
-            next_player_position -= 1
-            if next_player_position < 1:
-                next_player_position = len(players)
-        next_player = None  # Inicializa a None para evitar errores si no se encuentra el siguiente jugador
-        for player in players:
-            if player.round_position == next_player_position:
-                next_player = player
-                break
-        if next_player is not None and next_player.alive:
-            break
-
-    game.current_position = next_player_position
-    commit()
+    with open_game(game_id) as game:
+        # select as next player the next player alive in the round direction
+        game.current_position = game.next_position(game.current_position)
 
 
 def handle_play(
@@ -154,83 +129,58 @@ def handle_play(
     return response
 
 
-@db_session
 def try_defense(game_id: int, played_card: int, card_target: int):
-    with db_session:
-        res = GameMessage.create(
-            type="try_defense",
-            room_id=game_id,
-            target_id=card_target,
-            card_id=played_card,
-        )
+    res = GameMessage.create(
+        type="try_defense",
+        room_id=game_id,
+        target_id=card_target,
+        card_id=played_card,
+    )
     return res
 
 
-@db_session
 def check_winners(game_id: int):
-    game = Game.get(id=game_id)
-    players = list(game.players)
-    alive_players = list(filter(lambda p: p.alive, players))
-    infected_players = list(
-        filter(lambda p: p.role == "Infected", alive_players)
-    )
-    human_alive_players = list(
-        filter(lambda p: p.role == "Human", alive_players)
-    )
-    the_thing_player = list(filter(lambda p: p.role == "The Thing", players))[
-        0
-    ]
-    if (infected_players == len(alive_players) - 1) or len(
-        human_alive_players
-    ) == 0:
-        game.winners = "The Thing"
-        commit()
-        game.status = "Finished"
-        commit()
-    elif not the_thing_player.alive:
-        game.winners = "Humans"
-        commit()
-        game.status = "Finished"
-        commit()
+    with open_game(game_id) as game:
+        # No alive humans: the rest of the alive players are infected
+        if game.count_alive("Human") == 0:
+            game.winners = "The Thing"
+            game.status = "Finished"
+        elif game.count_alive("The Thing") == 0:
+            game.winners = "Humans"
+            game.status = "Finished"
 
 
-@db_session
 def not_defended_card(
     last_card_played_id: int,
     game_id: int,
     attacker_id: int,
     defense_player_id: int,
 ):
-    at = Card.get(id=last_card_played_id)
-    attack_card = CardOut.from_card(at)
-    try:
-        effect = play_card(game_id, at.idtype, attacker_id, defense_player_id)
-        response = {
-            "type": "defense",
-            "played_defense": 0,
-            "target_player": defense_player_id,
-            "last_played_card": attack_card.model_dump(
-                by_alias=True, exclude_unset=True
-            ),
-        }
-    except ValueError as e:
-        print("ERROR:", str(e))
+    with open_game(game_id) as game:
+        attack_card = CardOut.from_state(game, last_card_played_id)
+        effect = play_card(
+            game_id, attack_card.idtype, attacker_id, defense_player_id
+        )
+    response = {
+        "type": "defense",
+        "played_defense": 0,
+        "target_player": defense_player_id,
+        "last_played_card": attack_card.model_dump(
+            by_alias=True, exclude_unset=True
+        ),
+    }
 
     return response, effect
 
 
-@db_session
 def handle_not_target(
     game_id: int,
     card_id: int,
     current_player_id: int,
 ):
-    try:
-        response = None
-        effect = None
-        game = Game.get(id=game_id)
-        card = Card.get(id=card_id)
-        card_idtype = card.idtype
+    response = None
+    with open_game(game_id) as game:
+        card_idtype = game.get_idtype(card_id)
 
         effect = play(
             id_game=game_id,
@@ -241,17 +191,12 @@ def handle_not_target(
         )
 
         game.current_phase = "Discard"
-        commit()
-        gu.discard(game_id, card_idtype, current_player_id)
+        game.discard(current_player_id, card_idtype)
         game.current_phase = "Exchange"
-        commit()
-    except ValueError as e:
-        print("ERROR:", str(e))
 
     return response, effect
 
 
-@db_session
 def defended_card(
     game_id: int,
     attacker_id: int,
@@ -259,22 +204,15 @@ def defended_card(
     last_card_played_id: int,
     defense_card_id: int,
 ):
-    try:
-        at = Card.get(id=last_card_played_id)
-        de = Card.get(id=defense_card_id)
-        attack_card = CardOut.from_card(at)
-        defense_card = CardOut.from_card(de)
-        game = Game.get(id=game_id)
-    except ValueError as e:
-        print("ERROR:", str(e))
-
-    game.current_phase = "Discard"
-    commit()
-    gu.discard(game_id, at.idtype, attacker_id)
-    gu.discard(game_id, de.idtype, defense_player_id)
-    game.current_phase = "Draw"
-    commit()
-    draw_no_panic(game_id, defense_player_id)
+    with open_game(game_id) as game:
+        attack_card = CardOut.from_state(game, last_card_played_id)
+        defense_card = CardOut.from_state(game, defense_card_id)
+
+        game.current_phase = "Discard"
+        game.discard(attacker_id, attack_card.idtype)
+        game.discard(defense_player_id, defense_card.idtype)
+        game.current_phase = "Draw"
+        game.draw_no_panic(defense_player_id)
     response = {
         "type": "defense",
         "played_defense": defense_card.model_dump(
@@ -288,7 +226,6 @@ def defended_card(
     return response
 
 
-@db_session
 def handle_defense(
     game_id: int,
     card_type_id: int,
@@ -296,63 +233,50 @@ def handle_defense(
     last_card_played_id: int,
     defense_player_id: int,
 ):
-    try:
+    with open_game(game_id) as game:
         response = None
-        game = Game.get(id=game_id)
         effect = None
-    except ValueError as e:
-        print("ERROR:", str(e))
 
-    if card_type_id == 0:
-        try:
+        if card_type_id == 0:
             response, effect = not_defended_card(
-                last_card_played_id, game_id, attacker_id, defense_player_id
+                last_card_played_id,
+                game_id,
+                attacker_id,
+                defense_player_id,
             )
-
-        except ValueError as e:
-            print("ERROR:", str(e))
-    else:
-        attack_card = Card.get(id=last_card_played_id)
-        defense_card = Card.get(id=card_type_id)
-        if defense_card.idtype in get_defense_cards(attack_card.idtype):
-            try:
-
-                effect = play(
-                    id_game=game_id,
-                    attack_player_id=attacker_id,
-                    defense_player_id=defense_player_id,
-                    idtype_attack_card=attack_card.idtype,
-                    idtype_defense_card=defense_card.idtype,
-                )
-
-                response = defended_card(
-                    game_id,
-                    attacker_id,
-                    defense_player_id,
-                    last_card_played_id,
-                    card_type_id,
-                )
-
-            except ValueError as e:
-                print("ERROR:", str(e))
         else:
-            raise ValueError("Card cant be defended with that card")
-    try:
+            attack_idtype = game.get_idtype(last_card_played_id)
+            defense_idtype = game.get_idtype(card_type_id)
+            if not can_defend(attack_idtype, defense_idtype):
+                raise ValueError("Card cant be defended with that card")
+
+            effect = play(
+                id_game=game_id,
+                attack_player_id=attacker_id,
+                defense_player_id=defense_player_id,
+                idtype_attack_card=attack_idtype,
+                idtype_defense_card=defense_idtype,
+            )
+
+            response = defended_card(
+                game_id,
+                attacker_id,
+                defense_player_id,
+                last_card_played_id,
+                card_type_id,
+            )
+
         check_winners(game_id)
         game.current_phase = "Exchange"
-        commit()
-    except ValueError as e:
-        print("ERROR:", str(e))
 
     return response, effect
 
 
-@db_session
 def draw_card(game_id: int, player_id: int):
-    id3 = gu.draw(game_id, player_id)
-    card = Card.get(id=id3)
-    card_type = card.type
-    card = CardOut.from_card(card)
+    with open_game(game_id) as game:
+        new_card = game.draw(player_id)
+        card_type = game.get_card_type(new_card)
+        card = CardOut.from_state(game, new_card)
 
     draw_response = {
         "type": "draw",
@@ -363,12 +287,10 @@ def draw_card(game_id: int, player_id: int):
     return draw_response
 
 
-@db_session
 def handle_exchange(
     exchange_requester: int, chosen_card: int, target_player: int
 ):
-    card = Card.get(id=chosen_card)
-    card = CardOut.from_card(card)
+    card = CardOut.from_id(chosen_card)
     exchange_defense = get_defense_cards(32)
     exchange_response = {
         "type": "exchange_defense",
@@ -380,23 +302,18 @@ def handle_exchange(
     return exchange_response
 
 
-@db_session
 def exchange_defended(
     game_id: int,
     current_player_id: int,
     defense_card_id: int,
 ):
-    game = Game.get(id=game_id)
-    game.current_phase = "Discard"
-    defense_card = Card.get(id=defense_card_id)
-    commit()
-    gu.discard(game_id, defense_card.idtype, current_player_id)
-    game.current_phase = "Draw"
-    commit()
-    draw_no_panic(game_id, current_player_id)
+    with open_game(game_id) as game:
+        game.current_phase = "Discard"
+        game.discard(current_player_id, game.get_idtype(defense_card_id))
+        game.current_phase = "Draw"
+        game.draw_no_panic(current_player_id)
 
 
-@db_session
 def exchange_not_defended(
     game_id: int,
     current_player_id: int,
@@ -404,41 +321,29 @@ def exchange_not_defended(
     exchange_requester: int,
     chosen_card: int,
 ):
-    effect = None
-
-    try:
+    with open_game(game_id) as game:
         effect = play(
             id_game=game_id,
             attack_player_id=exchange_requester,
             defense_player_id=current_player_id,
             idtype_attack_card=32,
             idtype_defense_card=0,
-            card_chosen_by_attacker=Card.get(id=last_chosen_card).idtype,
-            card_chosen_by_defender=Card.get(id=chosen_card).idtype,
+            card_chosen_by_attacker=game.get_idtype(last_chosen_card),
+            card_chosen_by_defender=game.get_idtype(chosen_card),
         )
-    except ValueError as e:
-        print("ERROR:", str(e))
 
     return effect
 
 
-@db_session
 def handle_cannot_exchange(game_id: int):
-    calculate_next_turn(game_id)
-    game = Game.get(id=game_id)
-    game.current_phase = "Draw"
-    commit()
-    next_player = list(
-        filter(
-            lambda p: p.round_position == game.current_position,
-            list(game.players),
-        )
-    )[0]
-    draw_response = draw_card(game_id, next_player.id)
+    with open_game(game_id) as game:
+        calculate_next_turn(game_id)
+        game.current_phase = "Draw"
+        next_player = game.get_player_in_position(game.current_position)
+        draw_response = draw_card(game_id, next_player.id)
     return draw_response, next_player.id
 
 
-@db_session
 def handle_exchange_defense(
     game_id: int,
     current_player_id: int,
@@ -447,33 +352,23 @@ def handle_exchange_defense(
     chosen_card: int,
     is_defense: bool,
 ):
-    game = Game.get(id=game_id)
-    effect = None
-    if is_defense:
-        defense_card = Card.get(id=chosen_card)
-        if defense_card.idtype in get_defense_cards(32):
-            try:
-                defense_card = Card.get(id=chosen_card)
-
-                effect = play(
-                    id_game=game_id,
-                    attack_player_id=exchange_requester,
-                    defense_player_id=current_player_id,
-                    idtype_attack_card=32,
-                    idtype_defense_card=defense_card.idtype,
-                    card_chosen_by_attacker=Card.get(
-                        id=last_chosen_card
-                    ).idtype,
-                )
-
-                exchange_defended(game_id, current_player_id, chosen_card)
-
-            except ValueError as e:
-                print("ERROR:", str(e))
+    with open_game(game_id) as game:
+        if is_defense:
+            defense_idtype = game.get_idtype(chosen_card)
+            if not can_defend(EXCHANGE, defense_idtype):
+                raise ValueError("Exchange cant be defended with that card")
+
+            effect = play(
+                id_game=game_id,
+                attack_player_id=exchange_requester,
+                defense_player_id=current_player_id,
+                idtype_attack_card=32,
+                idtype_defense_card=defense_idtype,
+                card_chosen_by_attacker=game.get_idtype(last_chosen_card),
+            )
+
+            exchange_defended(game_id, current_player_id, chosen_card)
         else:
-            raise ValueError("Exchange cant be defended with that card")
-    else:
-        try:
             effect = exchange_not_defended(
                 game_id,
                 current_player_id,
@@ -481,34 +376,25 @@ def handle_exchange_defense(
                 exchange_requester,
                 chosen_card,
             )
-        except ValueError as e:
-            print("ERROR:", str(e))
-    calculate_next_turn(game_id)
-    player = Player.get(id=exchange_requester)
-    player.quarantine = player.quarantine - 1 if player.quarantine > 0 else 0
-    commit()
-    players = list(game.players)
-    next_player = list(
-        filter(lambda p: p.round_position == game.current_position, players)
-    )[0]
-    game.current_phase = "Draw"
-    commit()
-    try:
+        calculate_next_turn(game_id)
+        player = game.get_player(exchange_requester)
+        player.quarantine = (
+            player.quarantine - 1 if player.quarantine > 0 else 0
+        )
+        next_player = game.get_player_in_position(game.current_position)
+        game.current_phase = "Draw"
         draw_response = draw_card(game_id, next_player.id)
-    except ValueError as e:
-        print("ERROR:", str(e))
 
     return draw_response, next_player.id, effect
 
 
-@db_session
 def handle_discard(game_id: int, card_id: int, player_id: int):
-    try:
-        game = Game.get(id=game_id)
+    with open_game(game_id) as game:
         game.current_phase = "Discard"
-        commit()
-        gu.discard(game_id, card_id, player_id)
+        game.discard(player_id, card_id)
         game.current_phase = "Exchange"
-        commit()
-    except ValueError as e:
-        print("ERROR:", str(e))
+
+
+def is_in_quarantine(game_id: int, player_id: int) -> bool:
+    with open_game(game_id) as game:
+        return game.get_player(player_id).quarantine > 0
@@ -1,4 +1,7 @@
 """Card database related functions."""
+import random
+from typing import Optional
+
 from models.game import AvailableDeck
 from models.game import Card
 from models.game import DisposableDeck
@@ -37,9 +40,12 @@ def create_card(id: int, idtype: int, name: str, type: str) -> Card:
 
 
 def relate_card_with_available_deck(
-    id_card: int, id_available_deck: int
+    id_card: int,
+    id_available_deck: int,
+    rng: Optional[random.Random] = None,
 ) -> None:
     """Relate a card with an available deck"""
+    rng = rng if rng is not None else random.Random()
     with db_session:
         if not AvailableDeck.exists(id=id_available_deck):
             raise ValueError(
@@ -51,6 +57,12 @@ def relate_card_with_available_deck(
 
         if available_deck not in card.available_deck:
             card.available_deck.add(available_deck)
+            # Shuffle it into the draw order of its pile
+            if card.type == "PANIC":
+                order = available_deck.panic_order
+            else:
+                order = available_deck.order
+            order.insert(rng.randint(0, len(order)), id_card)
             commit()
         else:
             raise ValueError(
@@ -116,6 +128,14 @@ def unrelate_card_with_available_deck(
 
         if available_deck in card.available_deck:
             card.available_deck.remove(available_deck)
+            if card.type == "PANIC":
+                order = available_deck.panic_order
+            else:
+                order = available_deck.order
+            if len(order) > 0 and order[-1] == id_card:
+                order.pop()
+            elif id_card in order:
+                order.remove(id_card)
             commit()
         else:
             raise ValueError(
@@ -1,51 +1,65 @@
 """Card creation and relationship functions for Stay Away!'s cards."""
-from core.game_logic.card import create_card
-from core.game_logic.card import relate_card_with_available_deck
+import random
+from itertools import accumulate
+from types import MappingProxyType
+from typing import Dict
+from typing import List
+from typing import Mapping
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
 from core.game_logic.deck import get_available_deck
+from core.game_logic.deck import shuffle_available_deck
 from models.game import Card
+from pony.orm import commit
 from pony.orm import db_session
 
 # ===================== CARD DATA =====================
 
-# Card names + category
+# Card name, category, target and who sees its effect:
+# - Target: None (not played on a player), SELF, NEIGHBOR (an alive
+#   neighbor, not behind a locked door), ADJACENT (an alive neighbor, even
+#   behind a locked door) or ANYONE (any other alive player)
+# - PRIVATE if only one player sees what the effect shows, PUBLIC if not
 card_names = [
-    ["None", "None"],
-    ["The Thing", "INFECTION"],
-    ["Infected", "INFECTION"],
-    ["Flamethrower", "ACTION"],
-    ["Analysis", "ACTION"],
-    ["Axe", "ACTION"],
-    ["Suspicion", "ACTION"],
-    ["Determination", "ACTION"],
-    ["Whisky", "ACTION"],
-    ["Change of position", "ACTION"],
-    ["Watch your back", "ACTION"],
-    ["Seduction", "ACTION"],
-    ["You better run", "ACTION"],
-    ["I'm fine here", "DEFENSE"],
-    ["Terrifying", "DEFENSE"],
-    ["No, thanks", "DEFENSE"],
-    ["You failed", "DEFENSE"],
-    ["No Barbecues", "DEFENSE"],
-    ["Quarantine", "OBSTACLE"],
-    ["Locked Door", "OBSTACLE"],
-    ["Revelations", "PANIC"],
-    ["Rotten ropes", "PANIC"],
-    ["Get out of here", "PANIC"],
-    ["Forgetful", "PANIC"],
-    ["One, two...", "PANIC"],
-    ["Three, four...", "PANIC"],
-    ["Is the party here?", "PANIC"],
-    ["Let it stay between us", "PANIC"],
-    ["Turn and turn", "PANIC"],
-    ["Can't we be friends?", "PANIC"],
-    ["Blind date", "PANIC"],
-    ["Ups!", "PANIC"],
+    ["None", "None", "None", "PUBLIC"],
+    ["The Thing", "INFECTION", "None", "PUBLIC"],
+    ["Infected", "INFECTION", "None", "PUBLIC"],
+    ["Flamethrower", "ACTION", "NEIGHBOR", "PUBLIC"],
+    ["Analysis", "ACTION", "NEIGHBOR", "PRIVATE"],
+    ["Axe", "ACTION", "ADJACENT", "PUBLIC"],
+    ["Suspicion", "ACTION", "NEIGHBOR", "PRIVATE"],
+    ["Determination", "ACTION", "SELF", "PUBLIC"],
+    ["Whisky", "ACTION", "SELF", "PUBLIC"],
+    ["Change of position", "ACTION", "NEIGHBOR", "PUBLIC"],
+    ["Watch your back", "ACTION", "SELF", "PUBLIC"],
+    ["Seduction", "ACTION", "SELF", "PUBLIC"],
+    ["You better run", "ACTION", "ANYONE", "PUBLIC"],
+    ["I'm fine here", "DEFENSE", "None", "PUBLIC"],
+    ["Terrifying", "DEFENSE", "None", "PRIVATE"],
+    ["No, thanks", "DEFENSE", "None", "PUBLIC"],
+    ["You failed", "DEFENSE", "None", "PUBLIC"],
+    ["No Barbecues", "DEFENSE", "None", "PUBLIC"],
+    ["Quarantine", "OBSTACLE", "NEIGHBOR", "PUBLIC"],
+    ["Locked Door", "OBSTACLE", "NEIGHBOR", "PUBLIC"],
+    ["Revelations", "PANIC", "SELF", "PUBLIC"],
+    ["Rotten ropes", "PANIC", "SELF", "PUBLIC"],
+    ["Get out of here", "PANIC", "ANYONE", "PUBLIC"],
+    ["Forgetful", "PANIC", "SELF", "PUBLIC"],
+    ["One, two...", "PANIC", "SELF", "PUBLIC"],
+    ["Three, four...", "PANIC", "SELF", "PUBLIC"],
+    ["Is the party here?", "PANIC", "SELF", "PUBLIC"],
+    ["Let it stay between us", "PANIC", "SELF", "PRIVATE"],
+    ["Turn and turn", "PANIC", "SELF", "PUBLIC"],
+    ["Can't we be friends?", "PANIC", "SELF", "PUBLIC"],
+    ["Blind date", "PANIC", "SELF", "PUBLIC"],
+    ["Ups!", "PANIC", "SELF", "PRIVATE"],
 ]
 
 # Cards id that defends the card
 
-card_defense = [
+card_defense: List[List[int]] = [
     [],  # None 0 --> Fictional card
     [],  # The Thing 1
     [],  # Infected 2
@@ -117,52 +131,142 @@ quantity_cards = [
     [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0],  # Ups!
 ]
 
+# ===================== DECK TEMPLATES =====================
+
+MIN_PLAYERS = 4
+MAX_PLAYERS = 12
+
+
+class DeckTemplate(NamedTuple):
+    """Composition of the initial deck for a quantity of players."""
+
+    cards: Tuple[int, ...]  # Catalog card ids
+    quantity_by_idtype: Tuple[int, ...]
+    quantity_by_category: Mapping[str, int]
+
+
+# First catalog card id of each idtype (cards are created in idtype order)
+first_card_id = tuple(
+    accumulate((sum(quantity) for quantity in quantity_cards), initial=0)
+)
+
+
+def build_deck_template(quantity_players: int) -> DeckTemplate:
+    """Compute the composition of the initial deck from quantity_cards."""
+    cards: List[int] = []
+    quantity_by_idtype: List[int] = []
+    quantity_by_category: Dict[str, int] = {}
+    for i in range(len(card_names)):
+        quantity = sum(quantity_cards[i][: quantity_players + 1])
+        cards.extend(range(first_card_id[i], first_card_id[i] + quantity))
+        quantity_by_idtype.append(quantity)
+        category = card_names[i][1]
+        quantity_by_category[category] = (
+            quantity_by_category.get(category, 0) + quantity
+        )
+    return DeckTemplate(
+        cards=tuple(cards),
+        quantity_by_idtype=tuple(quantity_by_idtype),
+        quantity_by_category=MappingProxyType(quantity_by_category),
+    )
+
+
+# Precomputed initial decks for every valid quantity of players
+deck_templates: Mapping[int, DeckTemplate] = MappingProxyType(
+    {
+        quantity_players: build_deck_template(quantity_players)
+        for quantity_players in range(MIN_PLAYERS, MAX_PLAYERS + 1)
+    }
+)
+
+
+def get_deck_template(quantity_players: int) -> DeckTemplate:
+    """Get the composition of the initial deck for a quantity of players."""
+    if quantity_players in deck_templates:
+        return deck_templates[quantity_players]
+    return build_deck_template(quantity_players)
+
+
+# ===================== CARD CATALOG =====================
+
+
+class CardInfo(NamedTuple):
+    """What never changes of a card (the same for every game)."""
+
+    idtype: int
+    name: str
+    category: str  # INFECTION, ACTION, DEFENSE, OBSTACLE, PANIC
+    defenses: Tuple[int, ...]  # Idtypes of the cards that defend it
+
+
+# Catalog card id -> info of every card created by create_all_cards
+card_catalog: Mapping[int, CardInfo] = MappingProxyType(
+    {
+        id: CardInfo(
+            idtype=idtype,
+            name=card_names[idtype][0],
+            category=card_names[idtype][1],
+            defenses=tuple(card_defense[idtype]),
+        )
+        for idtype in range(len(card_names))
+        for id in range(first_card_id[idtype], first_card_id[idtype + 1])
+    }
+)
+
+
+def get_card_info(id_card: int) -> CardInfo:
+    """Get the info of a card of the catalog, without database access."""
+    if id_card not in card_catalog:
+        raise ValueError(f"Card with id {id_card} doesn't exist")
+    return card_catalog[id_card]
+
+
 # ===================== INITIAL CARD FUNCTIONS =====================
 
 # Create cards
 
 
 def create_all_cards() -> None:
-    """Create all cards in the database."""
+    """Create all cards in the database (in a single transaction)."""
     with db_session:
-        if len(Card.select()) > 0:
+        if Card.select().exists():
             raise ValueError("Cards already created")
 
-    counter = 0
-    for i in range(len(card_names)):
-        sum = 0
-        for j in range(len(quantity_cards[i])):
-            sum += quantity_cards[i][j]
-        while sum > 0:
-            create_card(counter, i, card_names[i][0], card_names[i][1])
-            sum -= 1
-            counter += 1
+        for id, card in card_catalog.items():
+            Card(
+                id=id,
+                idtype=card.idtype,
+                name=card.name,
+                type=card.category,
+            )
+        commit()
 
-    assert len(Card.select()) == 109
+        assert Card.select().count() == 109
 
 
 # Initialize available deck creating relationship with cards
 
 
-def init_available_deck(id_available_deck: int, quantity_players: int) -> None:
-    """Initialize an available deck creating relationship with cards."""
+def init_available_deck(
+    id_available_deck: int,
+    quantity_players: int,
+    rng: Optional[random.Random] = None,
+) -> None:
+    """
+    Initialize an available deck creating relationship with cards.
+    All the relationships are inserted at once, in a single transaction.
+    """
     with db_session:
-        if len(Card.select()) == 0:
+        if not Card.select().exists():
             create_all_cards()
 
-    available_deck = get_available_deck(id_available_deck)
-    if len(available_deck.cards) > 0:
-        raise ValueError(
-            f"Available deck with id {id_available_deck} already initialized"
-        )
-
-    for i in range(len(card_names)):
-        with db_session:
-            card_list = list(Card.select(idtype=i))
-
-        sum = 0
-        for j in range(quantity_players + 1):
-            sum += quantity_cards[i][j]
+        available_deck = get_available_deck(id_available_deck)
+        if not available_deck.cards.is_empty():
+            raise ValueError(
+                f"Available deck with id {id_available_deck} already initialized"
+            )
 
-        for j in range(sum):
-            relate_card_with_available_deck(card_list[j].id, id_available_deck)
+        ids = list(get_deck_template(quantity_players).cards)
+        available_deck.cards.add(Card.select(lambda c: c.id in ids)[:])
+        shuffle_available_deck(id_available_deck, rng)
+        commit()
@@ -1,4 +1,8 @@
 """Deck database related functions."""
+import random
+from typing import List
+from typing import Optional
+
 from core.game_logic.card import relate_card_with_available_deck
 from core.game_logic.card import unrelate_card_with_disposable_deck
 from models.game import AvailableDeck
@@ -95,40 +99,125 @@ def create_disposable_deck(id: int) -> DisposableDeck:
 # Get cards
 
 
-def get_random_card_from_available_deck(id_available_deck: int) -> Card:
+def _choose_card(cards, rng: Optional[random.Random]) -> Card:
+    """Choose one of some cards with the random generator of the game"""
+    rng = rng if rng is not None else random.Random()
+    return rng.choice(sorted(cards, key=lambda card: card.id))
+
+
+def get_random_card_from_available_deck(
+    id_available_deck: int, rng: Optional[random.Random] = None
+) -> Card:
     """Get a random card from an available deck"""
     with db_session:
         available_deck = get_available_deck(id_available_deck)
         if len(available_deck.cards) > 0:
-            return available_deck.cards.random(1)[0]
+            return _choose_card(available_deck.cards, rng)
         raise ValueError(
             f"Available deck with id {id_available_deck} is empty"
         )
 
 
+def _get_top_card(available_deck: AvailableDeck, order) -> Optional[Card]:
+    """Get the card on top of a pile, dropping the cards out of the deck"""
+    while len(order) > 0:
+        card = Card.get(id=order[-1])
+        if card is not None and available_deck in card.available_deck:
+            return card
+        # The card left the deck without updating the order
+        order.pop()
+    return None
+
+
+def shuffle_available_deck(
+    id_available_deck: int, rng: Optional[random.Random] = None
+) -> None:
+    """Shuffle again the draw order of an available deck"""
+    rng = rng if rng is not None else random.Random()
+    with db_session:
+        available_deck = get_available_deck(id_available_deck)
+        regular, panic = [], []
+        for card in available_deck.cards:
+            if card.type == "PANIC":
+                panic.append(card.id)
+            else:
+                regular.append(card.id)
+        rng.shuffle(regular)
+        rng.shuffle(panic)
+        available_deck.order = regular
+        available_deck.panic_order = panic
+
+
+def get_top_card_from_available_deck(
+    id_available_deck: int,
+    panic: bool = True,
+    rng: Optional[random.Random] = None,
+) -> Card:
+    """Get the next card to draw from an available deck
+
+    The panic cards are kept in their own pile, so skipping them
+    (panic=False) is just taking the top of the other pile.
+    """
+    with db_session:
+        available_deck = get_available_deck(id_available_deck)
+
+        def top_cards() -> List[Card]:
+            cards = [_get_top_card(available_deck, available_deck.order)]
+            if panic:
+                cards.append(
+                    _get_top_card(available_deck, available_deck.panic_order)
+                )
+            return [card for card in cards if card is not None]
+
+        cards = top_cards()
+        if len(cards) == 0 and not available_deck.cards.is_empty():
+            # Cards added without updating the order
+            shuffle_available_deck(id_available_deck, rng)
+            cards = top_cards()
+
+        if len(cards) == 0:
+            raise ValueError(
+                f"Available deck with id {id_available_deck} is empty"
+            )
+        if len(cards) == 1:
+            return cards[0]
+
+        # Same odds as drawing from a single shuffled pile
+        regular = len(available_deck.order)
+        total = regular + len(available_deck.panic_order)
+        rng = rng if rng is not None else random.Random()
+        return cards[0] if rng.randrange(total) < regular else cards[1]
+
+
 def get_specific_card_from_available_deck(
-    id_available_deck: int, idtype_card: int
+    id_available_deck: int,
+    idtype_card: int,
+    rng: Optional[random.Random] = None,
 ) -> Card:
     """Get a specific card from an available deck"""
     with db_session:
         available_deck = get_available_deck(id_available_deck)
         if len(available_deck.cards.filter(idtype=idtype_card)) > 0:
-            return available_deck.cards.filter(idtype=idtype_card).random(1)[0]
+            return _choose_card(
+                available_deck.cards.filter(idtype=idtype_card), rng
+            )
         raise ValueError(
             f"Available deck with id {id_available_deck} doesn't have a card with idtype {idtype_card}"
         )
 
 
 def get_specific_card_from_disposable_deck(
-    id_disposable_deck: int, idtype_card: int
+    id_disposable_deck: int,
+    idtype_card: int,
+    rng: Optional[random.Random] = None,
 ) -> Card:
     """Get a specific card from a disposable deck"""
     with db_session:
         disposable_deck = get_disposable_deck(id_disposable_deck)
         if len(disposable_deck.cards.filter(idtype=idtype_card)) > 0:
-            return disposable_deck.cards.filter(idtype=idtype_card).random(1)[
-                0
-            ]
+            return _choose_card(
+                disposable_deck.cards.filter(idtype=idtype_card), rng
+            )
         raise ValueError(
             f"Disposable deck with id {id_disposable_deck} doesn't have a card with idtype {idtype_card}"
         )
@@ -137,7 +226,9 @@ def get_specific_card_from_disposable_deck(
 # Move cards
 
 
-def move_disposable_to_available_deck(id: int) -> None:
+def move_disposable_to_available_deck(
+    id: int, rng: Optional[random.Random] = None
+) -> None:
     """
     Move all cards from disposable deck to available deck
     Pre: SZ(disposable_deck) > 0 and SZ(available_deck) = 0
@@ -150,7 +241,7 @@ def move_disposable_to_available_deck(id: int) -> None:
             disposable_cards = list(disposable_deck.cards)
             for card in disposable_cards:
                 unrelate_card_with_disposable_deck(card.id, id)
-                relate_card_with_available_deck(card.id, id)
+                relate_card_with_available_deck(card.id, id, rng)
         else:
             raise ValueError(
                 f"Disposable deck with id {id} is empty or available deck with id {id} is not empty"
@@ -1,7 +1,8 @@
 """Change of position effect."""
 import core.effects as effect_aplication
+from core.engine.store import open_game
+from core.engine.store import open_player_game
 from core.player import get_alive_neighbors
-from models.game import Player
 
 
 def change_of_position_effect(
@@ -10,8 +11,9 @@ def change_of_position_effect(
     """Change of position effect."""
 
     # The defense player must to be alive
-    if Player[defense_player_id].alive is False:
-        raise ValueError("The player with id {defense_player_id} is dead.")
+    with open_game(id_game) as game:
+        if game.get_player(defense_player_id).alive is False:
+            raise ValueError("The player with id {defense_player_id} is dead.")
 
     # The defense player must to be neighbor of the attack player
     attack_neighbors = get_alive_neighbors(
@@ -41,8 +43,9 @@ def you_better_run_effect(
     """Change of position effect."""
 
     # The defense player must to be alive
-    if Player[defense_player_id].alive is False:
-        raise ValueError("The player with id {defense_player_id} is dead.")
+    with open_game(id_game) as game:
+        if game.get_player(defense_player_id).alive is False:
+            raise ValueError("The player with id {defense_player_id} is dead.")
 
     # With modifications in the game
     # Swap positions
@@ -62,8 +65,9 @@ def you_better_run_effect(
 def im_fine_here_effect(defense_player_id: int):
     """I'm fine here effect."""
 
-    if Player[defense_player_id].alive is False:
-        raise ValueError("The player with id {defense_player_id} is dead.")
+    with open_player_game(defense_player_id) as game:
+        if game.get_player(defense_player_id).alive is False:
+            raise ValueError("The player with id {defense_player_id} is dead.")
 
     # Without modifications in the game and without effects to show in the frontend
 
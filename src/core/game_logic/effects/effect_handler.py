@@ -22,12 +22,10 @@ from core.game_logic.effects.watch_your_back_effect import (
     watch_your_back_effect,
 )
 from core.game_logic.effects.whisky_effect import whisky_effect
-from pony.orm import db_session
 
 # Import effect functions
 
 
-@db_session
 def do_effect_attack(
     id_game: int,
     attack_player_id: int,
@@ -179,7 +177,6 @@ def do_effect_attack(
             )
 
 
-@db_session
 def do_effect_defense(
     id_game: int,
     attack_player_id: int,
@@ -1,19 +1,19 @@
 """Flamethrower effect."""
 import core.effects as effect_aplication
+from core.engine.store import open_game
+from core.engine.store import open_player_game
 from core.player import get_alive_neighbors
-from models.game import Player
-from pony.orm import db_session
 
 
-@db_session
 def flamethrower_effect(
     id_game: int, attack_player_id: int, defense_player_id: int
 ):
     """Flamethrower effect."""
 
     # The defense player must to be alive
-    if Player[defense_player_id].alive is False:
-        raise ValueError("The player with id {defense_player_id} is dead.")
+    with open_game(id_game) as game:
+        if game.get_player(defense_player_id).alive is False:
+            raise ValueError("The player with id {defense_player_id} is dead.")
 
     # The defense player must to be neighbor of the attack player
     attack_neighbors = get_alive_neighbors(
@@ -33,12 +33,12 @@ def flamethrower_effect(
     return effect
 
 
-@db_session
 def no_barbecues_effect(defense_player_id: int):
     """No barbecues effect."""
 
-    if Player[defense_player_id].alive is False:
-        raise ValueError("The player with id {defense_player_id} is dead.")
+    with open_player_game(defense_player_id) as game:
+        if game.get_player(defense_player_id).alive is False:
+            raise ValueError("The player with id {defense_player_id} is dead.")
 
     # Without modifications in the game and without effects to show in the frontend
 
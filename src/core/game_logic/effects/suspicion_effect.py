@@ -1,7 +1,7 @@
 """Suspicion effect."""
 import core.effects as effect_aplication
+from core.engine.store import open_game
 from core.player import get_alive_neighbors
-from models.game import Player
 
 
 def suspicion_effect(
@@ -10,8 +10,9 @@ def suspicion_effect(
     """Suspicion effect."""
 
     # The defense player must to be alive
-    if Player[defense_player_id].alive is False:
-        raise ValueError("The player with id {defense_player_id} is dead.")
+    with open_game(id_game) as game:
+        if game.get_player(defense_player_id).alive is False:
+            raise ValueError("The player with id {defense_player_id} is dead.")
 
     # The defense player must to be neighbor of the attack player
     attack_neighbors = get_alive_neighbors(
@@ -1,9 +1,7 @@
 """Watch your back effect."""
 import core.effects as effect_aplication
-from pony.orm import db_session
 
 
-@db_session
 def watch_your_back_effect(id_game: int):
     """Watch your back effect."""
 
@@ -1,13 +1,14 @@
 """Whisky effect."""
 import core.effects as effect_aplication
-from models.game import Player
+from core.engine.store import open_game
 
 
 def whisky_effect(id_game: int, attack_player_id: int):
     """Whisky effect."""
     # The attack player must to be alive
-    if Player[attack_player_id].alive is False:
-        raise ValueError("The player with id {attack_player_id} is dead.")
+    with open_game(id_game) as game:
+        if game.get_player(attack_player_id).alive is False:
+            raise ValueError("The player with id {attack_player_id} is dead.")
 
     # Without modifications in the game
 
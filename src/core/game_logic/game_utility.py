@@ -1,4 +1,7 @@
 """Functions used to all the game operation (internal logic)."""
+import random
+from typing import Optional
+
 from core.game_logic.card import get_card
 from core.game_logic.card import relate_card_with_available_deck
 from core.game_logic.card import relate_card_with_disposable_deck
@@ -15,9 +18,9 @@ from core.game_logic.deck import delete_available_deck
 from core.game_logic.deck import delete_deck
 from core.game_logic.deck import delete_disposable_deck
 from core.game_logic.deck import get_deck
-from core.game_logic.deck import get_random_card_from_available_deck
 from core.game_logic.deck import get_specific_card_from_available_deck
 from core.game_logic.deck import get_specific_card_from_disposable_deck
+from core.game_logic.deck import get_top_card_from_available_deck
 from core.game_logic.deck import move_disposable_to_available_deck
 from models.game import Deck
 from models.game import Game
@@ -29,13 +32,17 @@ from pony.orm import db_session
 # Initialization of decks (start of the game)
 
 
-def initialize_decks(id_game: int, quantity_players: int) -> Deck:
+def initialize_decks(
+    id_game: int,
+    quantity_players: int,
+    rng: Optional[random.Random] = None,
+) -> Deck:
     """Initialize the decks of the game."""
     create_deck(id_game)
     create_available_deck(id_game)
     create_disposable_deck(id_game)
 
-    init_available_deck(id_game, quantity_players)
+    init_available_deck(id_game, quantity_players, rng)
 
     return get_deck(id_game)
 
@@ -43,7 +50,9 @@ def initialize_decks(id_game: int, quantity_players: int) -> Deck:
 # Initialization of player's hand (start of the game)
 
 
-def get_initial_player_hand(id_game: int, id_player: int) -> None:
+def get_initial_player_hand(
+    id_game: int, id_player: int, rng: Optional[random.Random] = None
+) -> None:
     """Initialize the player's hand."""
     with db_session:
         if not Player.exists(id=id_player):
@@ -72,7 +81,7 @@ def get_initial_player_hand(id_game: int, id_player: int) -> None:
 
     # Restore the cards that are of type 2 (PANIC)
     for card in cards_to_restore:
-        relate_card_with_available_deck(card, id_game)
+        relate_card_with_available_deck(card, id_game, rng)
 
 
 # Delete decks (end of the game)
@@ -101,7 +110,9 @@ def get_defense_cards(idtype_card: int) -> list[int]:
 # DRAW phase
 
 
-def draw(id_game: int, id_player: int) -> int:
+def draw(
+    id_game: int, id_player: int, rng: Optional[random.Random] = None
+) -> int:
     """Draw a card from the available deck."""
     with db_session:
         if not Player.exists(id=id_player):
@@ -114,15 +125,17 @@ def draw(id_game: int, id_player: int) -> int:
             )
 
     if len(get_deck(id_game).available_deck.cards) == 0:
-        move_disposable_to_available_deck(id_game)
+        move_disposable_to_available_deck(id_game, rng)
 
-    card = get_random_card_from_available_deck(id_game)
+    card = get_top_card_from_available_deck(id_game, rng=rng)
     unrelate_card_with_available_deck(card.id, id_game)
     relate_card_with_player(card.id, id_player)
     return card.id
 
 
-def draw_no_panic(id_game: int, id_player: int) -> int:
+def draw_no_panic(
+    id_game: int, id_player: int, rng: Optional[random.Random] = None
+) -> int:
     """Draw a card from the available deck. The card isn't of panic type."""
     with db_session:
         if not Player.exists(id=id_player):
@@ -130,26 +143,28 @@ def draw_no_panic(id_game: int, id_player: int) -> int:
         if not Game.exists(id=id_game):
             raise ValueError(f"Game with id {id_game} doesn't exist")
 
-        if len(get_deck(id_game).available_deck.cards) == 0:
-            move_disposable_to_available_deck(id_game)
-
-        card = get_random_card_from_available_deck(id_game)
-        while card.type == "PANIC":
-            unrelate_card_with_available_deck(card.id, id_game)
-            relate_card_with_disposable_deck(card.id, id_game)
-
-            if len(get_deck(id_game).available_deck.cards) == 0:
-                move_disposable_to_available_deck(id_game)
-
-            card = get_random_card_from_available_deck(id_game)
+        available_deck = get_deck(id_game).available_deck
+        no_panic = available_deck.cards.select(lambda c: c.type != "PANIC")
+        if not no_panic.exists():
+            # Only panic cards left: discard them and reshuffle
+            for card in list(available_deck.cards):
+                unrelate_card_with_available_deck(card.id, id_game)
+                relate_card_with_disposable_deck(card.id, id_game)
+            move_disposable_to_available_deck(id_game, rng)
 
+        card = get_top_card_from_available_deck(id_game, panic=False, rng=rng)
         unrelate_card_with_available_deck(card.id, id_game)
         relate_card_with_player(card.id, id_player)
 
         return card.id
 
 
-def draw_specific(id_game: int, id_player: int, idtype_card: int) -> int:
+def draw_specific(
+    id_game: int,
+    id_player: int,
+    idtype_card: int,
+    rng: Optional[random.Random] = None,
+) -> int:
     """Draw a specific card from the available or disposable deck."""
     with db_session:
         if not Player.exists(id=id_player):
@@ -167,7 +182,7 @@ def draw_specific(id_game: int, id_player: int, idtype_card: int) -> int:
 
     for index in range(2):
         try:
-            card = get_functions[index](id_game, idtype_card)
+            card = get_functions[index](id_game, idtype_card, rng)
         except ValueError:
             card = None
 
@@ -194,7 +209,12 @@ def draw_specific(id_game: int, id_player: int, idtype_card: int) -> int:
 # DISCARD phase
 
 
-def discard(id_game: int, idtype_card: int, id_player: int) -> int:
+def discard(
+    id_game: int,
+    idtype_card: int,
+    id_player: int,
+    rng: Optional[random.Random] = None,
+) -> int:
     """Discard a card from player hand."""
     with db_session:
         if not Game.exists(id=id_game):
@@ -214,7 +234,13 @@ def discard(id_game: int, idtype_card: int, id_player: int) -> int:
                 f"Player with id {id_player} has no card with idtype {idtype_card} in hand"
             )
 
-        card = Player[id_player].hand.select(idtype=idtype_card).random(1)[0]
+        rng = rng if rng is not None else random.Random()
+        card = rng.choice(
+            sorted(
+                Player[id_player].hand.select(idtype=idtype_card),
+                key=lambda card: card.id,
+            )
+        )
 
     unrelate_card_with_player(card.id, id_player)
     relate_card_with_disposable_deck(card.id, id_game)
@@ -0,0 +1,102 @@
+"""Card rules compiled as bitmasks of idtypes (bit i: idtype i).
+
+Generated once from the columns of card_names and from card_defense, so
+the legality checks are bit operations without database access.
+"""
+from types import MappingProxyType
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Mapping
+from typing import Tuple
+
+from core.game_logic.card_creation import card_defense
+from core.game_logic.card_creation import card_names
+
+# Fictional card used for the exchanges (only in card_defense). It's
+# played on a neighbor.
+EXCHANGE = 32
+
+
+def has_bit(mask: int, idtype: int) -> bool:
+    """Check if the bit of an idtype is set (never for negative ones)."""
+    return idtype >= 0 and bool(mask >> idtype & 1)
+
+
+def bitmask(idtypes: Iterable[int]) -> int:
+    """Mask with the bits of some idtypes."""
+    mask = 0
+    for idtype in idtypes:
+        mask |= 1 << idtype
+    return mask
+
+
+def idtypes_in(mask: int) -> List[int]:
+    """Idtypes of the bits of a mask, in order."""
+    return [
+        idtype for idtype in range(mask.bit_length()) if mask >> idtype & 1
+    ]
+
+
+def column_masks(column: int) -> Mapping[str, int]:
+    """Value of a column of card_names -> mask of the idtypes with it."""
+    masks: Dict[str, int] = {}
+    for idtype, card in enumerate(card_names):
+        masks[card[column]] = masks.get(card[column], 0) | 1 << idtype
+    return MappingProxyType(masks)
+
+
+# Category -> mask of its idtypes
+CATEGORY = column_masks(1)
+
+# Target (None, SELF, NEIGHBOR, ADJACENT, ANYONE) -> mask of its idtypes
+TARGET = column_masks(2)
+
+# Idtype -> mask of the idtypes that defend it
+DEFENDED_BY: Tuple[int, ...] = tuple(
+    bitmask(defenses) for defenses in card_defense
+)
+
+DEFENSIBLE = bitmask(
+    idtype for idtype, defenses in enumerate(DEFENDED_BY) if defenses
+)
+PRIVATE_REVEAL = column_masks(3)["PRIVATE"]
+NEIGHBOR_TARGET = TARGET["NEIGHBOR"] | 1 << EXCHANGE
+UNPLAYABLE = CATEGORY["INFECTION"]
+
+
+def is_category(idtype: int, category: str) -> bool:
+    return has_bit(CATEGORY.get(category, 0), idtype)
+
+
+def is_defense(idtype: int) -> bool:
+    return is_category(idtype, "DEFENSE")
+
+
+def can_defend(idtype_attack: int, idtype_defense: int) -> bool:
+    """Check if a card defends from another (or from an exchange)."""
+    if not 0 <= idtype_attack < len(DEFENDED_BY):
+        return False
+    return has_bit(DEFENDED_BY[idtype_attack], idtype_defense)
+
+
+def is_defensible(idtype: int) -> bool:
+    return has_bit(DEFENSIBLE, idtype)
+
+
+def is_private_reveal(idtype: int) -> bool:
+    return has_bit(PRIVATE_REVEAL, idtype)
+
+
+def is_target(idtype: int, target: str) -> bool:
+    return has_bit(TARGET.get(target, 0), idtype)
+
+
+def requires_neighbor(idtype: int) -> bool:
+    """Check if a card is played on a neighbor without a locked door in
+    between (exchanges included)."""
+    return has_bit(NEIGHBOR_TARGET, idtype)
+
+
+def is_playable(idtype: int) -> bool:
+    return not has_bit(UNPLAYABLE, idtype)
@@ -2,6 +2,7 @@ import hashlib
 from typing import Optional
 
 import core.game as game
+from core.engine.store import game_store
 from models.game import Game
 from models.game import Player
 from models.room import Room
@@ -104,7 +105,7 @@ def leave_room(room_id: int, user_id: int):
 
 
 @db_session
-def start_game(room_id: int, host_id: int):
+def start_game(room_id: int, host_id: int, card_instances: bool = False):
     if not Room.exists(id=room_id):
         raise ValueError("Room not found")
     if not User.exists(id=host_id):
@@ -121,7 +122,7 @@ def start_game(room_id: int, host_id: int):
     if len(user.room.users) < user.room.min_users:
         raise PermissionError("Not enough users to start the game")
     room = Room.get(id=room_id)
-    game.init_game(room_id)
+    game.init_game(room_id, card_instances)
     room.in_game = True
     commit()
 
@@ -150,6 +151,7 @@ def delete_room(room_id: int, host_id: int):
 
 @db_session
 def delete_game(game_id: int):
+    game_store.release(game_id)
     room = Room.get(id=game_id)
     room.in_game = False
     for user in room.users:
@@ -0,0 +1,461 @@
+"""Headless games: complete games between agents, only in memory.
+
+A simulated game is played through the same handlers as the websocket
+events (handle_not_target, handle_defense, handle_discard,
+handle_exchange_defense, handle_cannot_exchange and check_winners of
+core.game), on a GameState opened with open_state, without FastAPI,
+websockets or the database. The events are applied in place, like
+open_game does, undoing what a rejected one changed, or on copies like
+game_event does.
+
+The agents only choose among the cards and targets the client would
+offer; whether a play is legal and what it does is up to the handlers.
+"""
+import random
+from collections import Counter
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from core.engine.deck import ShuffledDeck
+from core.engine.state import GameState
+from core.engine.state import panic_checker
+from core.engine.state import PlayerState
+from core.engine.state import stream_seed
+from core.engine.store import open_state
+from core.game import check_winners
+from core.game import handle_cannot_exchange
+from core.game import handle_defense
+from core.game import handle_discard
+from core.game import handle_exchange_defense
+from core.game import handle_not_target
+from core.game_logic.card_creation import first_card_id
+from core.game_logic.card_creation import get_card_info
+from core.game_logic.card_creation import get_deck_template
+from core.game_logic.rules import can_defend
+from core.game_logic.rules import EXCHANGE
+from core.game_logic.rules import is_defense
+from core.game_logic.rules import is_defensible
+from core.game_logic.rules import is_playable
+from core.game_logic.rules import is_target
+from core.game_logic.rules import requires_neighbor
+
+# Turns after which a game without winners is stopped
+MAX_TURNS = 1000
+
+# Cards of an initial hand
+HAND_SIZE = 4
+
+# Errors of a play that the rules reject
+RULE_ERRORS = (ValueError, AssertionError)
+
+# Fields of the game a handler may set before rejecting an event
+UNDO_FIELDS = (
+    "status",
+    "current_phase",
+    "current_position",
+    "round_left_direction",
+    "winners",
+)
+
+
+class GameResult(NamedTuple):
+    """Outcome of a simulated game."""
+
+    seed: int
+    quantity_players: int
+    winners: str  # Humans, The Thing, None (stopped after MAX_TURNS)
+    turns: int
+    alive: Dict[str, int]  # Alive players by role at the end
+    played: Dict[int, int]  # Idtype -> times it was played
+    rejected: int  # Plays and exchanges the rules rejected
+
+
+# ===================== AGENTS =====================
+
+
+class Agent:
+    """Decisions of a player, at random.
+
+    Subclass it to script a strategy: every method gets the game and the
+    legal options and returns one of them.
+    """
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+
+    def play(
+        self,
+        game: GameState,
+        id_player: int,
+        options: Sequence[Tuple[int, int]],
+    ) -> Optional[Tuple[int, int]]:
+        """(card, target) to play, or None to discard instead."""
+        if not options or self.rng.random() < 0.25:
+            return None
+        return self.rng.choice(options)
+
+    def discard(
+        self, game: GameState, id_player: int, cards: Sequence[int]
+    ) -> int:
+        """Card to discard."""
+        return self.rng.choice(cards)
+
+    def defend(
+        self,
+        game: GameState,
+        id_player: int,
+        idtype_attack: int,
+        defenses: Sequence[int],
+    ) -> Optional[int]:
+        """Card to defend from a card (or an exchange), or None."""
+        if not defenses or self.rng.random() < 0.5:
+            return None
+        return self.rng.choice(defenses)
+
+    def exchange(
+        self, game: GameState, id_player: int, cards: Sequence[int]
+    ) -> List[int]:
+        """Cards to offer in an exchange, the preferred first."""
+        cards = list(cards)
+        self.rng.shuffle(cards)
+        return cards
+
+
+# ===================== SETUP =====================
+
+
+def new_game_state(
+    quantity_players: int, seed: int, id_game: int = 0
+) -> GameState:
+    """Deal a new game like init_game does, in memory.
+
+    The first player in random order gets The Thing, every player gets
+    HAND_SIZE cards without panic or Infected ones, round positions are
+    random and the player of the first turn draws one more card. Every
+    random decision of the game comes from the seed.
+    """
+    rng = random.Random(stream_seed(seed, 0))
+    cards = {
+        id: (get_card_info(id).idtype, get_card_info(id).category)
+        for id in get_deck_template(quantity_players).cards
+    }
+    positions = list(range(1, quantity_players + 1))
+    rng.shuffle(positions)
+    players = {
+        id: PlayerState(id=id, name=f"Player{id}", round_position=position)
+        for id, position in zip(range(1, quantity_players + 1), positions)
+    }
+    deck = ShuffledDeck.shuffled(cards, panic_checker(cards), rng)
+    game = GameState(
+        id=id_game,
+        players=players,
+        cards=cards,
+        available_deck=deck,
+        seed=seed,
+        rng=rng,
+    )
+
+    order = list(players.values())
+    rng.shuffle(order)
+    the_thing = first_card_id[1]
+    if the_thing in cards:
+        deck.remove(the_thing)
+        order[0].hand.append(the_thing)
+        order[0].role = "The Thing"
+    for player in order:
+        put_back = []
+        while len(player.hand) < HAND_SIZE:
+            card = game.draw_no_panic(player.id)
+            if game.get_idtype(card) == 2:
+                player.hand.remove(card)
+                put_back.append(card)
+        for card in put_back:
+            deck.insert(card)
+
+    first = game.get_player_in_position(game.current_position)
+    assert first is not None
+    game.current_phase = "Draw"
+    game.draw(first.id)
+    return game
+
+
+# ===================== TURNS =====================
+
+
+class Simulation:
+    """A game being played between agents (one per player).
+
+    A turn is the sequence of events the client of the player would send:
+    play a card (that the target may defend) or discard one, then exchange
+    a card with the next player (or tell it can't). The player of the next
+    turn draws when the exchange ends, as the server does.
+    """
+
+    def __init__(
+        self,
+        game: GameState,
+        agents: Dict[int, Agent],
+        max_turns: int = MAX_TURNS,
+        copies: bool = False,
+    ):
+        self.game = game
+        self.agents = agents
+        self.max_turns = max_turns
+        self.copies = copies
+        self.turns = 0
+        self.played: Counter = Counter()
+        self.rejected = 0
+
+    def run(self) -> None:
+        """Play turns until there are winners or MAX_TURNS is reached."""
+        while self.game.status != "Finished" and self.turns < self.max_turns:
+            self.turn()
+
+    def event(self, handler: Callable[..., Any], *args, **kwargs) -> Any:
+        """Apply a handler of core.game as a single event.
+
+        The handlers check an event before moving any card, so by default
+        it's applied in place, like open_game does, and a rejected event
+        only has to undo the UNDO_FIELDS. With copies, it runs on a copy
+        kept only if it finishes without errors (see game_event), to check
+        the results are the same.
+        """
+        if not self.copies:
+            saved = [getattr(self.game, field) for field in UNDO_FIELDS]
+            try:
+                return self.apply(handler, *args, **kwargs)
+            except RULE_ERRORS:
+                for field, value in zip(UNDO_FIELDS, saved):
+                    setattr(self.game, field, value)
+                raise
+        state = self.game.copy()
+        with open_state(state):
+            result = handler(*args, **kwargs)
+        self.game = state
+        return result
+
+    def apply(self, handler: Callable[..., Any], *args, **kwargs) -> Any:
+        """Apply a handler in place."""
+        with open_state(self.game):
+            return handler(*args, **kwargs)
+
+    def current_player(self) -> PlayerState:
+        player = self.game.get_player_in_position(self.game.current_position)
+        if player is None:
+            raise ValueError("Nobody sits in the current position")
+        return player
+
+    def turn(self) -> None:
+        id_player = self.current_player().id
+        self.turns += 1
+
+        choice = self.agents[id_player].play(
+            self.game, id_player, self.play_options(id_player)
+        )
+        if choice is None or not self.play(id_player, *choice):
+            self.discard(id_player)
+
+        self.apply(check_winners, self.game.id)
+        if self.game.status == "Finished":
+            return
+
+        self.exchange(id_player)
+        self.apply(check_winners, self.game.id)
+
+    def play_options(self, id_player: int) -> List[Tuple[int, int]]:
+        """Every (card, target) a player may try to play.
+
+        A panic card in the hand was just drawn and has to be played.
+        """
+        game = self.game
+        hand = game.get_player(id_player).hand
+        cards = [card for card in hand if game.get_card_type(card) == "PANIC"]
+        if not cards:
+            cards = list(hand)
+        # Computed once for every card of the hand
+        adjacent = sorted(set(game.alive_neighbors(id_player)))
+        neighbors = [
+            id
+            for id in adjacent
+            if not game.door_locked_between(id_player, id)
+        ]
+        anyone = [
+            id
+            for id, player in game.players.items()
+            if player.alive and id != id_player
+        ]
+        options: List[Tuple[int, int]] = []
+        for card in cards:
+            idtype = game.get_idtype(card)
+            if not is_playable(idtype) or is_defense(idtype):
+                continue
+            if requires_neighbor(idtype):
+                targets = neighbors
+            elif is_target(idtype, "ADJACENT"):
+                targets = adjacent
+            elif is_target(idtype, "ANYONE"):
+                targets = anyone
+            else:
+                targets = [id_player]
+            options.extend((card, target) for target in targets)
+        return options
+
+    def play(self, id_player: int, card: int, id_target: int) -> bool:
+        """Play a card (events play and defense). False if the rules reject
+        it."""
+        game = self.game
+        idtype = game.get_idtype(card)
+        defense = None
+        try:
+            if id_target == id_player:
+                self.event(handle_not_target, game.id, card, id_player)
+            else:
+                if is_defensible(idtype):
+                    defense = self.defense(id_target, idtype)
+                self.event(
+                    handle_defense,
+                    game_id=game.id,
+                    card_type_id=defense if defense is not None else 0,
+                    attacker_id=id_player,
+                    last_card_played_id=card,
+                    defense_player_id=id_target,
+                )
+        except RULE_ERRORS:
+            self.rejected += 1
+            return False
+
+        self.played[idtype] += 1
+        if defense is not None:
+            self.played[game.get_idtype(defense)] += 1
+        return True
+
+    def defense(self, id_player: int, idtype_attack: int) -> Optional[int]:
+        """Card chosen by a player to defend from a card, if any."""
+        game = self.game
+        defenses = [
+            card
+            for card in game.get_player(id_player).hand
+            if can_defend(idtype_attack, game.get_idtype(card))
+        ]
+        return self.agents[id_player].defend(
+            game, id_player, idtype_attack, defenses
+        )
+
+    def discard(self, id_player: int) -> None:
+        """Discard a card (event discard, that takes its idtype)."""
+        game = self.game
+        cards = [
+            card
+            for card in game.get_player(id_player).hand
+            if game.get_idtype(card) != 1
+        ]
+        card = self.agents[id_player].discard(game, id_player, cards)
+        self.apply(handle_discard, game.id, game.get_idtype(card), id_player)
+
+    def exchange(self, id_player: int) -> None:
+        """Exchange a card with the next player (event exchange_defense),
+        or pass the turn if it isn't possible (event cannot_exchange)."""
+        game = self.game
+        target = game.get_player_in_position(
+            game.next_position(game.get_player(id_player).round_position)
+        )
+        if (
+            target is None
+            or target.id == id_player
+            or game.door_locked_between(id_player, target.id)
+        ):
+            self.apply(handle_cannot_exchange, game.id)
+            return
+
+        offers = self.agents[id_player].exchange(
+            game, id_player, list(game.get_player(id_player).hand)
+        )
+        defense = self.defense(target.id, EXCHANGE)
+        answers = self.agents[target.id].exchange(
+            game, target.id, list(target.hand)
+        )
+        if (
+            defense is not None
+            and offers
+            and self.exchange_event(
+                id_player, target.id, offers[0], defense, True
+            )
+        ):
+            self.played[game.get_idtype(defense)] += 1
+            return
+        for offer in offers:
+            for answer in answers:
+                if self.exchange_event(
+                    id_player, target.id, offer, answer, False
+                ):
+                    self.played[EXCHANGE] += 1
+                    return
+        self.apply(handle_cannot_exchange, game.id)
+
+    def exchange_event(
+        self,
+        id_player: int,
+        id_target: int,
+        offer: int,
+        answer: int,
+        is_defense: bool,
+    ) -> bool:
+        """Answer an exchange with a card or a defense. False if the rules
+        reject it."""
+        try:
+            self.event(
+                handle_exchange_defense,
+                game_id=self.game.id,
+                current_player_id=id_target,
+                exchange_requester=id_player,
+                last_chosen_card=offer,
+                chosen_card=answer,
+                is_defense=is_defense,
+            )
+        except RULE_ERRORS:
+            self.rejected += 1
+            return False
+        return True
+
+    def result(self, seed: int) -> GameResult:
+        game = self.game
+        return GameResult(
+            seed=seed,
+            quantity_players=len(game.players),
+            winners=game.winners,
+            turns=self.turns,
+            alive={
+                role: quantity
+                for role, quantity in game.census.alive.items()
+                if quantity
+            },
+            played=dict(self.played),
+            rejected=self.rejected,
+        )
+
+
+def play_game(
+    quantity_players: int,
+    seed: int,
+    agent: type = Agent,
+    max_turns: int = MAX_TURNS,
+    copies: bool = False,
+) -> GameResult:
+    """Play a whole game between agents of a class.
+
+    The same seed plays the same game, with or without copies (see
+    Simulation.event).
+    """
+    game = new_game_state(quantity_players, seed)
+    # The decisions of the players don't take numbers from the game
+    rng = random.Random(f"agents:{seed}")
+    agents = {id: agent(rng) for id in game.players}
+    simulation = Simulation(game, agents, max_turns, copies)
+    simulation.run()
+    return simulation.result(seed)
@@ -0,0 +1,170 @@
+"""Per-recipient views of a game: their own hand plus the public info."""
+import threading
+from collections import OrderedDict
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from core.engine.state import GameState
+from schemas.game import GameInfo
+
+# Views kept by the cache (a few versions of every hosted game)
+VIEW_CACHE_SIZE = 1024
+
+
+class ViewCache:
+    """Least recently used views, by (game, version, viewer).
+
+    A version is never reused, so a cached view never gets stale. States
+    without version (not hosted) aren't cached.
+    """
+
+    def __init__(self, size: int = VIEW_CACHE_SIZE):
+        self.size = size
+        self.views: OrderedDict[Tuple[int, int, int], Any] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, game: GameState, viewer: int) -> Any:
+        """Get the game_info message of a viewer, building it if needed."""
+        if not game.version:
+            return game_info_view(game, viewer)
+
+        key = (game.id, game.version, viewer)
+        with self.lock:
+            if key in self.views:
+                self.hits += 1
+                self.views.move_to_end(key)
+                return self.views[key]
+            self.misses += 1
+
+        view = game_info_view(game, viewer)
+        with self.lock:
+            self.views[key] = view
+            while len(self.views) > self.size:
+                self.views.popitem(last=False)
+        return view
+
+    def clear(self) -> None:
+        with self.lock:
+            self.views.clear()
+
+
+def game_info_view(game: GameState, viewer: int) -> Dict[str, Any]:
+    """Build the game_info message seen by a player."""
+    return {
+        "type": "game_info",
+        "version": game.version,
+        "game": GameInfo.for_player(game, viewer),
+    }
+
+
+view_cache = ViewCache()
+
+
+# ===================== DELTAS =====================
+
+
+def _changed_players(
+    old: List[Dict[str, Any]], new: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    before = {player["id"]: player for player in old}
+    changes = []
+    for player in new:
+        previous = before.get(player["id"], {})
+        changed = {
+            key: value
+            for key, value in player.items()
+            if key != "hand" and previous.get(key) != value
+        }
+        if changed:
+            changes.append({"id": player["id"], **changed})
+    return changes
+
+
+def _hand_changes(
+    old: List[Dict[str, Any]], new: List[Dict[str, Any]], viewer: int
+) -> Dict[str, List]:
+    def own_hand(players):
+        for player in players:
+            if player["id"] == viewer:
+                return player["hand"]
+        return []
+
+    before = {card["id"] for card in own_hand(old)}
+    after = own_hand(new)
+    after_ids = {card["id"] for card in after}
+    return {
+        "added": [card for card in after if card["id"] not in before],
+        "removed": sorted(before - after_ids),
+    }
+
+
+def game_delta(old: Dict[str, Any], new: Dict[str, Any], viewer: int):
+    """What changed between two game_info views of a player."""
+    game = {
+        key: value
+        for key, value in new["game"].items()
+        if key != "players" and old["game"].get(key) != value
+    }
+    return {
+        "type": "game_delta",
+        "from": old["version"],
+        "version": new["version"],
+        "game": game,
+        "players": _changed_players(
+            old["game"]["players"], new["game"]["players"]
+        ),
+        "hand": _hand_changes(
+            old["game"]["players"], new["game"]["players"], viewer
+        ),
+    }
+
+
+class ViewTracker:
+    """Last view sent to every player, so they only get what changed.
+
+    A player without a view sent (just connected, or after a failed event)
+    gets the full game_info. A client that misses a delta ("from" isn't
+    its version) asks for a game_status to get the full one again.
+    """
+
+    def __init__(self, cache: ViewCache = view_cache):
+        self.cache = cache
+        self.sent: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def update(self, game: GameState, viewer: int) -> Dict[str, Any]:
+        """The message that takes a player to the current view."""
+        view = self.cache.get(game, viewer)
+        with self.lock:
+            previous = self.sent.get((game.id, viewer))
+            self.sent[(game.id, viewer)] = view
+        if previous is None or not game.version:
+            return view
+        return game_delta(previous, view, viewer)
+
+    def snapshot(self, game: GameState, viewer: int) -> Dict[str, Any]:
+        """The full view of a player, from which the next delta starts."""
+        view = self.cache.get(game, viewer)
+        with self.lock:
+            self.sent[(game.id, viewer)] = view
+        return view
+
+    def reset(self, id_game: int, viewer: Optional[int] = None) -> None:
+        """Send the full view next time (to a player or to everybody)."""
+        with self.lock:
+            for key in list(self.sent):
+                if key[0] == id_game and viewer in (None, key[1]):
+                    del self.sent[key]
+
+
+view_tracker = ViewTracker()
+
+
+def game_updates(game: GameState) -> Dict[int, Any]:
+    """The update (delta or full game_info) of every player of the game."""
+    return {id: view_tracker.update(game, id) for id in sorted(game.players)}
@@ -1,26 +1,47 @@
 """Main module to run the application."""
+import asyncio
+import os
 from contextlib import asynccontextmanager
+from contextlib import suppress
 
 import uvicorn
+from core.engine.store import game_store
+from core.executor import game_executor
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
 from models import db
+from models.migrations import migrate
 from routes import room
 from routes import socket
 from routes import user
 
 
+DATABASE = os.path.join(os.path.dirname(__file__), "database.sqlite")
+
+
 # https://fastapi.tiangolo.com/advanced/events/
 @asynccontextmanager
 async def lifespan(application: FastAPI):
     """Context manager to start and stop the application."""
+    flusher = None
     try:
-        db.bind(provider="sqlite", filename="database.sqlite", create_db=True)
+        # Columns added since the database was created
+        migrate(DATABASE)
+        db.bind(provider="sqlite", filename=DATABASE, create_db=True)
         db.generate_mapping(create_tables=True)
+        # Write the games hosted in memory to the database in batches
+        flusher = asyncio.create_task(game_store.flush_forever())
         yield
     finally:
-        pass
+        if flusher is not None:
+            flusher.cancel()
+            # Wait for the save in progress, if any
+            with suppress(asyncio.CancelledError):
+                await flusher
+            # Let the running game commands finish before the last flush
+            game_executor.shutdown(wait=True)
+            game_store.flush()
 
 
 # FastAPI instance
@@ -1,3 +1,4 @@
+from pony.orm import composite_index
 from pony.orm import IntArray
 from pony.orm import Optional
 from pony.orm import PrimaryKey
@@ -18,6 +19,7 @@ class Player(db.Entity):
     quarantine = Required(int, default=0)
     game = Set("Game")
     hand = Set("Card")
+    card_instances = Set("GameCard")
 
 
 class Game(db.Entity):
@@ -31,7 +33,14 @@ class Game(db.Entity):
     winners = Optional(str, default="None")  # Human, The Thing, Infected
     players = Set("Player")
     deck = Optional("Deck")
-    locked_doors = Required(IntArray, default=[])
+    # Seed of every random decision and random streams used (GameState.rng)
+    seed = Required(int, default=0, size=64)
+    rng_step = Required(int, default=0, size=64)
+    # Bitset of the locked doors (see core.engine.doors.Doors)
+    locked_doors = Required(int, default=0, size=64)
+    # Cards kept in GameCard rows instead of the shared decks and hands
+    card_instances = Required(bool, default=False)
+    cards = Set("GameCard", cascade_delete=True)
 
 
 class Card(db.Entity):
@@ -47,6 +56,19 @@ class Card(db.Entity):
     available_deck = Set("AvailableDeck", reverse="cards")
     disposable_deck = Set("DisposableDeck", reverse="cards")
     players = Set("Player")
+    games = Set("GameCard", cascade_delete=True)
+
+
+class GameCard(db.Entity):
+    """Card of a game and where it is (per-game card instance)."""
+
+    game = Required("Game")
+    card = Required("Card")
+    location = Required(str)  # available, disposable, hand
+    owner = Optional("Player")  # Player holding it when in hand
+    order = Required(int, default=0, unsigned=True)  # Position in its pile
+    PrimaryKey(game, card)
+    composite_index(game, location)
 
 
 class AvailableDeck(db.Entity):
@@ -55,6 +77,9 @@ class AvailableDeck(db.Entity):
     id = PrimaryKey(int)
     deck = Optional("Deck")
     cards = Set("Card", reverse="available_deck")
+    # Card ids in draw order (drawn from the end), panic cards apart
+    order = Required(IntArray, default=[])
+    panic_order = Required(IntArray, default=[])
 
 
 class DisposableDeck(db.Entity):
@@ -0,0 +1,91 @@
+"""Changes of the schema of an existing database, in order.
+
+Pony only creates the tables that are missing, so the columns added or
+changed in existing tables are migrated here, before mapping the
+entities. The schema version of a database is kept in its user_version.
+"""
+import json
+import sqlite3
+from typing import Callable
+from typing import List
+
+
+def _columns(connection: sqlite3.Connection, table: str) -> List[str]:
+    """Columns of a table (none if it doesn't exist)."""
+    return [
+        row[1] for row in connection.execute(f'PRAGMA table_info("{table}")')
+    ]
+
+
+def _add_column(
+    connection: sqlite3.Connection, table: str, column: str, definition: str
+) -> None:
+    if column not in _columns(connection, table):
+        connection.execute(
+            f'ALTER TABLE "{table}" ADD COLUMN "{column}" {definition}'
+        )
+
+
+def _engine_columns(connection: sqlite3.Connection) -> None:
+    """Draw order of the decks, seed and random stream of the games,
+    locked doors as a bitset and card instances."""
+    if _columns(connection, "AvailableDeck"):
+        # The cards missing from the (empty) orders are shuffled in when
+        # the game is loaded or drawn from
+        _add_column(
+            connection, "AvailableDeck", "order", "INT[] NOT NULL DEFAULT '[]'"
+        )
+        _add_column(
+            connection,
+            "AvailableDeck",
+            "panic_order",
+            "INT[] NOT NULL DEFAULT '[]'",
+        )
+
+    if _columns(connection, "Game"):
+        _add_column(connection, "Game", "seed", "BIGINT NOT NULL DEFAULT 0")
+        _add_column(
+            connection, "Game", "rng_step", "BIGINT NOT NULL DEFAULT 0"
+        )
+        _add_column(
+            connection,
+            "Game",
+            "card_instances",
+            "BOOLEAN NOT NULL DEFAULT 0",
+        )
+        # Locked doors: from a list of 0/1 to a bitset
+        rows = connection.execute(
+            'SELECT "id", "locked_doors" FROM "Game" '
+            "WHERE typeof(\"locked_doors\") = 'text'"
+        ).fetchall()
+        for id, doors in rows:
+            mask = sum(
+                1 << door
+                for door, locked in enumerate(json.loads(doors))
+                if locked
+            )
+            connection.execute(
+                'UPDATE "Game" SET "locked_doors" = ? WHERE "id" = ?',
+                (mask, id),
+            )
+
+
+# Migration i takes a database from version i to version i + 1
+MIGRATIONS: List[Callable[[sqlite3.Connection], None]] = [_engine_columns]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(filename: str) -> int:
+    """Bring the schema of a SQLite database up to date, in a single
+    transaction. Return the version it had."""
+    connection = sqlite3.connect(filename)
+    try:
+        with connection:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            for migration in MIGRATIONS[version:]:
+                migration(connection)
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    finally:
+        connection.close()
+    return version
@@ -1,51 +1,133 @@
-from time import sleep
+import asyncio
+from functools import partial
+from typing import List
+from typing import Optional
 
 import core.room as rooms
+from core.actors import room_actors
 from core.connections import ConnectionManager
-from core.game import get_card_idtype
-from core.game import handle_cannot_exchange
-from core.game import handle_defense
-from core.game import handle_discard
-from core.game import handle_exchange
-from core.game import handle_exchange_defense
-from core.game import handle_not_target
-from core.game import handle_play
-from core.game import try_defense
+from core.connections import SlowConsumerPolicy
+from core.engine.store import game_store
+from core.events import game_info
+from core.events import GAME_ACTIONS
+from core.events import game_status
+from core.events import handle_game_event
+from core.events import Outgoing
+from core.executor import run_blocking
 from core.room import delete_game
+from core.views import view_tracker
 from fastapi import APIRouter
 from fastapi import WebSocket
 from fastapi import WebSocketDisconnect
-from models.game import Player
-from pony.orm import db_session
 from pydantic import ValidationError
 from schemas.room import RoomEventValidator
 from schemas.socket import ChatMessage
 from schemas.socket import ErrorMessage
 from schemas.socket import GameEventTypes
-from schemas.socket import GameMessage
 from schemas.socket import RoomEventTypes
 from schemas.socket import RoomMessage
 
-PRIVATE_CARDTYPES = [4, 6, 14, 27, 31]
+# Seconds between the start of a game and its first game_info
+START_DELAY = 1
 
-connection_manager = ConnectionManager()
+# What to do with a client that doesn't keep up with its messages
+SLOW_CONSUMER_POLICY = SlowConsumerPolicy.drop_stale
+
+connection_manager = ConnectionManager(SLOW_CONSUMER_POLICY)
 ws = APIRouter(tags=["websocket"])
 
+# Keep a reference to the scheduled sends until they finish
+background_tasks = set()
+
+
+async def send_messages(room_id: int, messages: List[Outgoing]):
+    await connection_manager.send_many(
+        room_id, [(message.user_id, message.message) for message in messages]
+    )
+
+
+async def send_game_info_later(room_id: int, delay: float):
+    await asyncio.sleep(delay)
+    # In the queue of the room, as the views it sends are based on the
+    # ones the events send
+    await room_actors.submit(room_id, partial(apply_game_info, room_id))
+
+
+def start_game(room_id: int, user_id: int):
+    rooms.start_game(room_id, user_id, card_instances=True)
+    game_store.host(room_id)
+    return RoomMessage.create("start", room_id)
+
+
+# Commands run by the actor of the room (one at a time, in order)
+
+
+async def apply_start(room_id: int, user_id: int):
+    start_message = await run_blocking(start_game, room_id, user_id)
+    await connection_manager.broadcast(room_id, start_message)
+
+    # Give the clients time to load the game without blocking anybody
+    task = asyncio.create_task(send_game_info_later(room_id, START_DELAY))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+
+async def apply_game_info(room_id: int):
+    messages = await run_blocking(game_info, room_id)
+    await send_messages(room_id, messages)
+
+
+async def apply_game_event(room_id: int, user_id: int, data: dict):
+    await run_blocking(game_store.host, room_id)
+    messages = await run_blocking(handle_game_event, room_id, user_id, data)
+    await send_messages(room_id, messages)
+
+
+async def apply_resync(room_id: int, user_id: int):
+    messages = await run_blocking(game_status, room_id, user_id)
+    await send_messages(room_id, messages)
+
+
+async def apply_finished(room_id: int):
+    await run_blocking(delete_game, room_id)
+    view_tracker.reset(room_id)
+    connection_manager.forget_room(room_id)
+
 
 @ws.websocket("/ws/{room_id}/{user_id}")
-async def websocket_endpoint(websocket: WebSocket, room_id: int, user_id: int):
-    # On new or join connect and get info
-    await connection_manager.connect(websocket, room_id, user_id)
+async def websocket_endpoint(
+    websocket: WebSocket,
+    room_id: int,
+    user_id: int,
+    last_seq: Optional[int] = None,
+    batch: bool = False,
+):
+    # On new or join connect and get info. A client that reconnects sends
+    # the last seq it got and receives only the messages it missed. With
+    # batch, the messages of an event come in one frame (a JSON array)
+    if not await connection_manager.connect(
+        websocket, room_id, user_id, last_seq, batch
+    ):
+        # Start over from the full game_info
+        view_tracker.reset(room_id, user_id)
+        if last_seq is not None and game_store.is_hosted(room_id):
+            await room_actors.submit(
+                room_id, partial(apply_resync, room_id, user_id)
+            )
     try:
-        room_info = RoomMessage.create("info", room_id)
+        room_info = await run_blocking(RoomMessage.create, "info", room_id)
         await connection_manager.send_to(websocket, room_info)
         while True:
             try:
                 data = await websocket.receive_json()
                 if data["type"] == "message":
                     try:
-                        ChatMessage.validate(user_id, room_id)
-                        message = ChatMessage.create(data["message"], user_id)
+                        await run_blocking(
+                            ChatMessage.validate, user_id, room_id
+                        )
+                        message = await run_blocking(
+                            ChatMessage.create, data["message"], user_id
+                        )
                         await connection_manager.broadcast(room_id, message)
                     except ValidationError as error:
                         await connection_manager.send_to(
@@ -61,27 +143,21 @@ async def websocket_endpoint(websocket: WebSocket, room_id: int, user_id: int):
                     match data["type"]:
                         case "start":
                             try:
-                                validated_data = RoomEventValidator.validate(
-                                    data["type"], room_id, user_id
+                                validated_data = await run_blocking(
+                                    RoomEventValidator.validate,
+                                    data["type"],
+                                    room_id,
+                                    user_id,
                                 )
 
-                                with db_session:
-                                    rooms.start_game(
+                                await room_actors.submit(
+                                    validated_data.room_id,
+                                    partial(
+                                        apply_start,
                                         validated_data.room_id,
                                         validated_data.user_id,
-                                    )
-
-                                await connection_manager.broadcast(
-                                    validated_data.room_id,
-                                    RoomMessage.create(
-                                        data["type"], validated_data.room_id
                                     ),
                                 )
-                                sleep(1)
-                                await connection_manager.broadcast(
-                                    room_id,
-                                    GameMessage.create("game_info", room_id),
-                                )
                             except ValidationError as error:
                                 await connection_manager.send_to(
                                     websocket,
@@ -89,30 +165,36 @@ async def websocket_endpoint(websocket: WebSocket, room_id: int, user_id: int):
                                 )
                         case "leave":
                             try:
-                                validated_data = RoomEventValidator.validate(
-                                    data["type"], room_id, user_id
+                                validated_data = await run_blocking(
+                                    RoomEventValidator.validate,
+                                    data["type"],
+                                    room_id,
+                                    user_id,
                                 )
-                                with db_session:
-                                    if rooms.leave_room(
+                                if await run_blocking(
+                                    rooms.leave_room,
+                                    validated_data.room_id,
+                                    validated_data.user_id,
+                                ):
+                                    await connection_manager.disconnect(
+                                        websocket,
                                         validated_data.room_id,
                                         validated_data.user_id,
-                                    ):
-                                        await connection_manager.disconnect(
-                                            websocket,
-                                            validated_data.room_id,
-                                            validated_data.user_id,
-                                        )
-                                        await connection_manager.broadcast(
+                                    )
+                                    await connection_manager.broadcast(
+                                        validated_data.room_id,
+                                        await run_blocking(
+                                            RoomMessage.create,
+                                            data["type"],
                                             validated_data.room_id,
-                                            RoomMessage.create(
-                                                data["type"],
-                                                validated_data.room_id,
-                                            ),
-                                        )
-                                    else:
-                                        await connection_manager.disconnect_all(
-                                            validated_data.room_id
-                                        )
+                                        ),
+                                    )
+                                else:
+                                    # The room was deleted
+                                    await connection_manager.disconnect_all(
+                                        validated_data.room_id
+                                    )
+                                    room_actors.stop(validated_data.room_id)
 
                             except ValidationError as error:
                                 await connection_manager.send_to(
@@ -127,187 +209,24 @@ async def websocket_endpoint(websocket: WebSocket, room_id: int, user_id: int):
                                 ),
                             )
                 elif GameEventTypes.has_type(data["type"]):
-                    player = Player.get(id=user_id)
                     try:
                         match data["type"]:
-                            case "play":
-                                response = handle_play(
+                            case _ if data["type"] in GAME_ACTIONS:
+                                await room_actors.submit(
                                     room_id,
-                                    data["played_card"],
-                                    data["card_target"],
-                                )
-                                await connection_manager.broadcast(
-                                    room_id, response
-                                )
-
-                                if data["card_target"] == user_id:
-                                    response, effect = handle_not_target(
+                                    partial(
+                                        apply_game_event,
                                         room_id,
-                                        data["played_card"],
                                         user_id,
-                                    )
-
-                                    if effect is not None:
-                                        await connection_manager.broadcast(
-                                            room_id, effect
-                                        )
-
-                                    await connection_manager.broadcast(
-                                        room_id,
-                                        GameMessage.create(
-                                            "game_info", room_id
-                                        ),
-                                    )
-                                else:
-                                    defense_response = try_defense(
-                                        room_id,
-                                        data["played_card"],
-                                        data["card_target"],
-                                    )
-                                    await connection_manager.broadcast(
-                                        room_id, defense_response
-                                    )
-
-                            case "defense":
-                                response, effect = handle_defense(
-                                    game_id=room_id,
-                                    card_type_id=data["played_defense"],
-                                    attacker_id=data["target_player"],
-                                    last_card_played_id=data[
-                                        "last_played_card"
-                                    ],
-                                    defense_player_id=user_id,
-                                )
-
-                                await connection_manager.broadcast(
-                                    room_id, response
-                                )
-                                private_attack = (
-                                    get_card_idtype(data["last_played_card"])
-                                    in PRIVATE_CARDTYPES
-                                )
-                                private_defense = (
-                                    get_card_idtype(data["played_defense"])
-                                    in PRIVATE_CARDTYPES
-                                )
-                                no_defense = data["played_defense"] == 0
-                                if effect is not None:
-                                    if private_attack and no_defense:
-                                        await connection_manager.send_to_user_id(
-                                            data["target_player"], effect
-                                        )
-                                    elif private_defense:
-                                        await connection_manager.send_to_user_id(
-                                            user_id, effect
-                                        )
-                                    else:
-                                        await connection_manager.broadcast(
-                                            room_id, effect
-                                        )
-
-                                await connection_manager.broadcast(
-                                    room_id,
-                                    GameMessage.create("game_info", room_id),
-                                )
-
-                            case "exchange":
-                                exchange_res = handle_exchange(
-                                    user_id,
-                                    data["chosen_card"],
-                                    data["target_player"],
-                                )
-
-                                await connection_manager.broadcast(
-                                    room_id, exchange_res
-                                )
-
-                            case "cannot_exchange":
-                                (
-                                    draw_response,
-                                    next_player_id,
-                                ) = handle_cannot_exchange(room_id)
-
-                                await connection_manager.send_to_user_id(
-                                    next_player_id, draw_response
-                                )
-
-                                await connection_manager.broadcast(
-                                    room_id,
-                                    GameMessage.create("game_info", room_id),
-                                )
-
-                            case "exchange_defense":
-                                (
-                                    draw_response,
-                                    next_player_id,
-                                    effect,
-                                ) = handle_exchange_defense(
-                                    game_id=room_id,
-                                    current_player_id=user_id,
-                                    exchange_requester=data[
-                                        "exchange_requester_id"
-                                    ],
-                                    last_chosen_card=data["last_chose"],
-                                    chosen_card=data["chosen_card"],
-                                    is_defense=data["is_defense"],
-                                )
-
-                                private_defense = (
-                                    get_card_idtype(data["chosen_card"])
-                                    in PRIVATE_CARDTYPES
-                                )
-                                if effect is not None:
-                                    if private_defense and data["is_defense"]:
-                                        await connection_manager.send_to_user_id(
-                                            user_id, effect
-                                        )
-                                    else:
-                                        await connection_manager.broadcast(
-                                            room_id, effect
-                                        )
-
-                                await connection_manager.send_to_user_id(
-                                    next_player_id, draw_response
-                                )
-
-                                res = {"type": "exchange_end"}
-                                await connection_manager.broadcast(
-                                    room_id, res
-                                )
-
-                                await connection_manager.broadcast(
-                                    room_id,
-                                    GameMessage.create("game_info", room_id),
-                                )
-
-                            case "discard":
-                                handle_discard(
-                                    room_id, data["played_card"], user_id
-                                )
-
-                                res = {
-                                    "type": "discard",
-                                    "played_card": data["played_card"],
-                                }
-
-                                await connection_manager.broadcast(
-                                    room_id,
-                                    res,
-                                )
-
-                                await connection_manager.broadcast(
-                                    room_id,
-                                    GameMessage.create("game_info", room_id),
+                                        data,
+                                    ),
                                 )
 
                             case "finished":
-                                delete_game(room_id)
-
-                            case "game_status":
-                                await connection_manager.broadcast(
-                                    room_id,
-                                    GameMessage.create("game_info", room_id),
+                                await room_actors.submit(
+                                    room_id, partial(apply_finished, room_id)
                                 )
+                                room_actors.stop(room_id)
 
                             case _:
                                 await connection_manager.send_to(
@@ -316,28 +235,8 @@ async def websocket_endpoint(websocket: WebSocket, room_id: int, user_id: int):
                                         "DEBUGGING: Invalid game event"
                                     ),
                                 )
-                        if player.quarantine > 0:
-                            card_dict = {
-                                "play": data.get("played_card", None),
-                                "discard": data.get("played_card", None),
-                                "defense": data.get("played_defense", None),
-                                "exchange": data.get("chosen_card", None),
-                                "exchange_defense": data.get(
-                                    "chosen_card", None
-                                ),
-                                "cannot_exchange": None,
-                            }
-                            if card_dict[data["type"]] != 0:
-                                await connection_manager.broadcast(
-                                    room_id,
-                                    GameMessage.create(
-                                        "quarantine",
-                                        room_id,
-                                        user_id,
-                                        card_dict[data["type"]],
-                                    ),
-                                )
-                    except ValidationError as error:
+                    except ValueError as error:
+                        # Also the events the rules reject (rolled back)
                         await connection_manager.send_to(
                             websocket,
                             ErrorMessage.create(str(error)),
@@ -1,3 +1,5 @@
+from core.engine.state import GameState
+from core.game_logic.card_creation import get_card_info
 from models.game import Card
 from pydantic import BaseModel
 
@@ -13,6 +15,21 @@ class CardOut(BaseModel):
             idtype=card.idtype,
         )
 
+    @classmethod
+    def from_id(cls, card_id: int):
+        # Del catálogo, sin leer la base de datos
+        return cls(
+            id=card_id,
+            idtype=get_card_info(card_id).idtype,
+        )
+
+    @classmethod
+    def from_state(cls, game: GameState, card_id: int):
+        return cls(
+            id=card_id,
+            idtype=game.get_idtype(card_id),
+        )
+
     @classmethod
     def to_json(cls, card: Card):
         # Return a JSON-serializable representation of the Player object954
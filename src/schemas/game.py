@@ -1,7 +1,7 @@
 from typing import List
 from typing import Optional
 
-from models.game import Game
+from core.engine.state import GameState
 from pydantic import BaseModel
 from pydantic import ConfigDict
 from schemas.player import PlayerOut
@@ -20,13 +20,26 @@ class PlayersInfo(BaseModel):
     model_config = ConfigDict(title="Users", from_attributes=True)
 
     @classmethod
-    def get_players_info(cls, game: Game):
-        players = list(game.players)
+    def get_players_info(cls, game: GameState):
+        players = list(game.players.values())
         players.sort(key=lambda player: player.id)
         # Crear una instancia de PlayerOut jsonificado
-        players = [PlayerOut.to_json(player) for player in players]
+        players = [
+            PlayerOut.to_json(PlayerOut.from_state(game, player))
+            for player in players
+        ]
         return players
 
+    @classmethod
+    def get_players_view(cls, game: GameState, viewer: int):
+        # Sólo la mano del que mira, del resto la cantidad de cartas
+        players = list(game.players.values())
+        players.sort(key=lambda player: player.id)
+        return [
+            PlayerOut.to_view(game, player, player.id == viewer)
+            for player in players
+        ]
+
 
 class GameInfo(BaseModel):
     model_config = ConfigDict(title="Room", from_attributes=True)
@@ -37,7 +50,7 @@ class GameInfo(BaseModel):
     turn_order: bool
 
     @classmethod
-    def from_db(cls, game: Game):
+    def from_state(cls, game: GameState):
         return {
             "players": PlayersInfo.get_players_info(game),
             "turn_phase": game.current_phase,
@@ -45,5 +58,17 @@ class GameInfo(BaseModel):
             "turn_order": game.round_left_direction,
             "status": game.status,
             "winners": game.winners,
-            "locked_doors": game.locked_doors,
+            "locked_doors": list(game.locked_doors),
+        }
+
+    @classmethod
+    def for_player(cls, game: GameState, viewer: int):
+        return {
+            "players": PlayersInfo.get_players_view(game, viewer),
+            "turn_phase": game.current_phase,
+            "current_turn": game.current_position,
+            "turn_order": game.round_left_direction,
+            "status": game.status,
+            "winners": game.winners,
+            "locked_doors": list(game.locked_doors),
         }
@@ -1,3 +1,5 @@
+from core.engine.state import GameState
+from core.engine.state import PlayerState
 from models.game import Player
 from pydantic import BaseModel
 from schemas.card import CardOut
@@ -22,15 +24,32 @@ class PlayerOut(BaseModel):
             alive=player.alive,  # Agregar el campo 'alive'
             role=player.role,  # Agregar el campo 'role'
             hand=[
-                CardOut.from_card(card) for card in player.hand
+                CardOut.from_card(card)
+                for card in sorted(player.hand, key=lambda card: card.id)
             ],  # Agregar el campo 'hand'
             quarantine=(player.quarantine > 0),
         )
 
     @classmethod
-    def to_json(cls, player: Player):
+    def from_state(cls, game: GameState, player: PlayerState):
+        # Crear una instancia de PlayerOut basada en el estado en memoria
+        return cls(
+            name=player.name,
+            id=player.id,
+            round_position=player.round_position,
+            alive=player.alive,
+            role=player.role,
+            hand=[
+                CardOut.from_state(game, card) for card in sorted(player.hand)
+            ],
+            quarantine=(player.quarantine > 0),
+        )
+
+    @classmethod
+    def to_json(cls, player):
         # Return a JSON-serializable representation of the Player object
-        player = cls.from_player(player)
+        if not isinstance(player, cls):
+            player = cls.from_player(player)
         return {
             "id": player.id,
             "name": player.name,
@@ -40,3 +59,25 @@ class PlayerOut(BaseModel):
             "hand": [card.to_json(card) for card in player.hand],
             "quarantine": player.quarantine,
         }
+
+    @classmethod
+    def to_view(cls, game: GameState, player: PlayerState, own: bool):
+        # Public info of a player, with the role and the hand only if it's
+        # the viewer
+        view = {
+            "id": player.id,
+            "name": player.name,
+            "round_position": player.round_position,
+            "alive": player.alive,
+            "hand": [
+                {"id": card, "idtype": game.get_idtype(card)}
+                for card in sorted(player.hand)
+            ]
+            if own
+            else [],
+            "hand_size": len(player.hand),
+            "quarantine": player.quarantine > 0,
+        }
+        if own:
+            view["role"] = player.role
+        return view
@@ -1,10 +1,10 @@
 from enum import Enum
 from typing import Optional
 
+from core.engine.state import GameState
+from core.engine.store import open_game
 from core.game_logic.game_utility import get_defense_cards
-from models.game import Card
-from models.game import Game
-from models.game import Player
+from core.views import view_cache
 from models.room import Room
 from models.room import User
 from pydantic import BaseModel
@@ -147,25 +147,49 @@ class GameMessage(BaseModel):
         target_id: Optional[int] = None,
         defense_card_id: Optional[int] = None,
     ):
-        game = Game.get(id=room_id)
+        with open_game(room_id) as game:
+            return cls.from_state(
+                game,
+                type,
+                quarantined=quarantined,
+                card_id=card_id,
+                player_id=player_id,
+                target_id=target_id,
+                defense_card_id=defense_card_id,
+            )
+
+    @classmethod
+    def from_state(
+        cls,
+        game: GameState,
+        type: GameEventTypes,
+        quarantined: Optional[int] = None,
+        card_id: Optional[int] = None,
+        player_id: Optional[int] = None,
+        target_id: Optional[int] = None,
+        defense_card_id: Optional[int] = None,
+    ):
         match type:
+            case "game_info" if player_id is not None:
+                # Only the hand of the player
+                return view_cache.get(game, player_id)
             case "game_info":
                 return {
                     "type": type,
-                    "game": GameInfo.from_db(game),
+                    "game": GameInfo.from_state(game),
                 }
             case "quarantine":
                 assert quarantined is not None
                 assert card_id is not None
-                card = CardOut.from_card(Card.get(id=card_id))
+                card = CardOut.from_state(game, card_id)
                 all_players_except_quarantined = [
                     player.id
-                    for player in game.players
+                    for player in game.players.values()
                     if player.id != quarantined
                 ]
                 return {
                     "type": "show_card",
-                    "player_name": User.get(id=quarantined).username,
+                    "player_name": game.get_player(quarantined).name,
                     "cards": [
                         card.model_dump(by_alias=True, exclude_unset=True)
                     ],
@@ -173,13 +197,13 @@ class GameMessage(BaseModel):
                 }
             case "show_hand":
                 assert player_id is not None
-                player = PlayerOut.from_player(
-                    Player.get(id=player_id)
+                player = PlayerOut.from_state(
+                    game, game.get_player(player_id)
                 ).model_dump(by_alias=True, exclude_unset=True)
-                all_players = [player.id for player in game.players]
+                all_players = [player.id for player in game.players.values()]
                 if target_id is not None:
-                    player = PlayerOut.from_player(
-                        Player.get(id=target_id)
+                    player = PlayerOut.from_state(
+                        game, game.get_player(target_id)
                     ).model_dump(by_alias=True, exclude_unset=True)
                 return {
                     "type": "show_card",
@@ -190,14 +214,14 @@ class GameMessage(BaseModel):
             case "show_card":
                 assert player_id is not None
                 assert card_id is not None
-                player = PlayerOut.from_player(
-                    Player.get(id=player_id)
+                player = PlayerOut.from_state(
+                    game, game.get_player(player_id)
                 ).model_dump(by_alias=True, exclude_unset=True)
-                card = CardOut.from_card(Card.get(id=card_id))
-                all_players = [player.id for player in game.players]
+                card = CardOut.from_state(game, card_id)
+                all_players = [player.id for player in game.players.values()]
                 if target_id is not None:
-                    player = PlayerOut.from_player(
-                        Player.get(id=target_id)
+                    player = PlayerOut.from_state(
+                        game, game.get_player(target_id)
                     ).model_dump(by_alias=True, exclude_unset=True)
                 return {
                     "type": type,
@@ -210,10 +234,8 @@ class GameMessage(BaseModel):
             case "play":
                 assert target_id is not None
                 assert card_id is not None
-                player = PlayerOut.from_player(
-                    Player.get(id=target_id)
-                ).model_dump(by_alias=True, exclude_unset=True)
-                card = CardOut.from_card(Card.get(id=card_id))
+                game.get_player(target_id)
+                card = CardOut.from_state(game, card_id)
                 return {
                     "type": type,
                     "played_card": card.model_dump(
@@ -224,10 +246,8 @@ class GameMessage(BaseModel):
             case "try_defense":
                 assert target_id is not None
                 assert card_id is not None
-                player = PlayerOut.from_player(
-                    Player.get(id=target_id)
-                ).model_dump(by_alias=True, exclude_unset=True)
-                card = CardOut.from_card(Card.get(id=card_id))
+                game.get_player(target_id)
+                card = CardOut.from_state(game, card_id)
                 return {
                     "type": type,
                     "target_player": target_id,
@@ -239,14 +259,12 @@ class GameMessage(BaseModel):
             case "defense":
                 assert target_id is not None
                 assert card_id is not None
-                target_id = PlayerOut.from_player(
-                    Player.get(id=target_id)
+                target_id = PlayerOut.from_state(
+                    game, game.get_player(target_id)
                 ).model_dump(by_alias=True, exclude_unset=True)
-                card = CardOut.from_card(Card.get(id=card_id))
+                card = CardOut.from_state(game, card_id)
                 if defense_card_id != 0:
-                    defense_card = CardOut.from_card(
-                        Card.get(id=defense_card_id)
-                    )
+                    defense_card = CardOut.from_state(game, defense_card_id)
                 else:
                     defense_card = 0
                 return {
@@ -260,30 +278,28 @@ class GameMessage(BaseModel):
             case "draw":
                 assert player_id is not None
                 assert card_id is not None
-                player = PlayerOut.from_player(
-                    Player.get(id=player_id)
-                ).model_dump(by_alias=True, exclude_unset=True)
-                card = CardOut.from_card(Card.get(id=card_id))
+                game.get_player(player_id)
+                card = CardOut.from_state(game, card_id)
                 return {
                     "type": type,
                     "new_card": card.model_dump(
                         by_alias=True, exclude_unset=True
                     ),
-                    "card_type": card.type,
+                    "card_type": game.get_card_type(card_id),
                 }
             case "exchange_defense":
                 assert target_id is not None
                 assert card_id is not None
                 assert player_id is not None
                 assert defense_card_id is not None
-                target = PlayerOut.from_player(
-                    Player.get(id=target_id)
+                target = PlayerOut.from_state(
+                    game, game.get_player(target_id)
                 ).model_dump(by_alias=True, exclude_unset=True)
-                card = CardOut.from_card(Card.get(id=card_id))
-                player = PlayerOut.from_player(
-                    Player.get(id=player_id)
+                card = CardOut.from_state(game, card_id)
+                player = PlayerOut.from_state(
+                    game, game.get_player(player_id)
                 ).model_dump(by_alias=True, exclude_unset=True)
-                defense_card = CardOut.from_card(Card.get(id=defense_card_id))
+                defense_card = CardOut.from_state(game, defense_card_id)
                 return {
                     "type": type,
                     "defended_by": get_defense_cards(32),
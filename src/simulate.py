@@ -0,0 +1,101 @@
+"""Run simulated games in parallel and write their statistics.
+
+    python3 src/simulate.py --games 10000 --players 4-12 --csv stats.csv
+"""
+import argparse
+import sys
+import time
+from contextlib import nullcontext
+from typing import ContextManager
+from typing import IO
+from typing import Optional
+
+from core.balance import aggregate
+from core.balance import game_seeds
+from core.balance import run_games
+from core.balance import write_csv
+from core.game_logic.card_creation import MAX_PLAYERS
+from core.game_logic.card_creation import MIN_PLAYERS
+from core.simulation import MAX_TURNS
+
+
+def player_range(text: str):
+    """Quantities of players: "6" or "4-12"."""
+    first, _, last = text.partition("-")
+    quantities = range(int(first), int(last or first) + 1)
+    if not quantities or not (
+        MIN_PLAYERS <= quantities[0] and quantities[-1] <= MAX_PLAYERS
+    ):
+        raise argparse.ArgumentTypeError(
+            f"Players must be between {MIN_PLAYERS} and {MAX_PLAYERS}"
+        )
+    return quantities
+
+
+def output(
+    path: Optional[str], default: Optional[IO[str]] = None
+) -> ContextManager[Optional[IO[str]]]:
+    """File to write to (closed at the end), or the default if no path."""
+    if path is None:
+        return nullcontext(default)
+    return open(path, "w", newline="")
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--games",
+        type=int,
+        default=1000,
+        help="games for each quantity of players",
+    )
+    parser.add_argument(
+        "--players",
+        type=player_range,
+        default=range(MIN_PLAYERS, MAX_PLAYERS + 1),
+        help=f"quantity of players, or a range (default "
+        f"{MIN_PLAYERS}-{MAX_PLAYERS})",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="base seed")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="processes (default: one per core)",
+    )
+    parser.add_argument("--max-turns", type=int, default=MAX_TURNS)
+    parser.add_argument(
+        "--csv",
+        default=None,
+        help="summary by quantity of players (default: stdout)",
+    )
+    parser.add_argument(
+        "--ndjson",
+        default=None,
+        help="result of every game, one per line",
+    )
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+    tasks = game_seeds(args.players, args.games, args.seed)
+    games = len(args.players) * args.games
+
+    start = time.perf_counter()
+    with output(args.ndjson) as ndjson:
+        stats = aggregate(
+            run_games(tasks, args.workers, args.max_turns), ndjson
+        )
+    elapsed = time.perf_counter() - start
+
+    with output(args.csv, sys.stdout) as file:
+        write_csv(stats, file)
+    print(
+        f"{games} games in {elapsed:.1f}s ({games / elapsed:.0f} games/s)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
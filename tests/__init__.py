@@ -11,12 +11,27 @@ from core.user import *  # noqa : F401
 from core.room import *  # noqa : F401
 from core.game import *  # noqa : F401
 from core.effects import *  # noqa : F401
+from core.actors import *  # noqa : F401
+from core.connections import *  # noqa : F401
+from core.events import *  # noqa : F401
+from core.executor import *  # noqa : F401
+from core.views import *  # noqa : F401
+from core.balance import *  # noqa : F401
+from core.simulation import *  # noqa : F401
 from core.player import *  # noqa : F401
+from core.engine.state import *  # noqa : F401
+from core.engine.census import *  # noqa : F401
+from core.engine.deck import *  # noqa : F401
+from core.engine.doors import *  # noqa : F401
+from core.engine.hand import *  # noqa : F401
+from core.engine.ring import *  # noqa : F401
+from core.engine.store import *  # noqa : F401
 from core.game_logic.deck import *  # noqa : F401
 from core.game_logic.card import *  # noqa : F401
 from core.game_logic.game_utility import *  # noqa : F401
 from core.game_logic.game_effects import *  # noqa : F401
 from core.game_logic.card_creation import *  # noqa : F401
+from core.game_logic.rules import *  # noqa : F401
 from core.game_logic.effects.analysis_effect import *  # noqa : F401
 from core.game_logic.effects.change_of_position_effect import *  # noqa : F401
 from core.game_logic.effects.effect_handler import *  # noqa : F401
@@ -32,8 +47,11 @@ from models.game import Game  # noqa : F401
 from models.game import Player  # noqa : F401
 from models.game import Deck  # noqa : F401
 from models.game import Card  # noqa : F401
+from models.game import GameCard  # noqa : F401
 from models.game import AvailableDeck  # noqa : F401
 from models.game import DisposableDeck  # noqa : F401
+from models.migrations import migrate  # noqa : F401
+from models.migrations import SCHEMA_VERSION  # noqa : F401
 from schemas.validators import SocketValidators  # noqa : F401
 from schemas.validators import EndpointValidators  # noqa : F401
 from pony.orm import db_session  # noqa : F401
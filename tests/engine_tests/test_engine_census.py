@@ -0,0 +1,57 @@
+"""Test the counters of alive players by role."""
+from . import GameState
+from . import PlayerState
+
+
+def new_game_state() -> GameState:
+    """Create a game with The Thing and 3 humans."""
+    players = {
+        i: PlayerState(id=i, name=f"Player{i}", round_position=i)
+        for i in range(1, 5)
+    }
+    players[1].role = "The Thing"
+    return GameState(id=1, players=players)
+
+
+class TestCensus:
+    """Test the counters follow the players of the game."""
+
+    def test_build(self):
+        """Test the counters of a new game."""
+        game = new_game_state()
+
+        assert game.count_alive() == 4
+        assert game.count_alive("Human") == 3
+        assert game.count_alive("The Thing") == 1
+        assert game.count_alive("Infected") == 0
+
+    def test_changes(self):
+        """Test infections and deaths update the counters."""
+        game = new_game_state()
+        game.get_player(2).role = "Infected"
+        game.get_player(3).alive = False
+
+        assert game.count_alive() == 3
+        assert game.count_alive("Human") == 1
+        assert game.count_alive("Infected") == 1
+
+        # Changes of a dead player aren't counted
+        game.get_player(3).role = "Infected"
+        assert game.count_alive("Infected") == 1
+        game.get_player(3).alive = True
+        assert game.count_alive("Infected") == 2
+
+        # Setting the same value twice
+        game.get_player(1).alive = False
+        game.get_player(1).alive = False
+        assert game.count_alive("The Thing") == 0
+        assert game.count_alive() == 3
+
+    def test_copy(self):
+        """Test a copy of the game has its own counters."""
+        game = new_game_state()
+        copy = game.copy()
+        copy.get_player(2).alive = False
+
+        assert copy.count_alive("Human") == 2
+        assert game.count_alive("Human") == 3
@@ -0,0 +1,71 @@
+"""Test shuffled available deck."""
+import pytest
+
+from . import ShuffledDeck
+
+
+class TestShuffledDeck:
+    """Test operations of the shuffled deck."""
+
+    def test_draw(self):
+        """Test draw function takes the cards from the end."""
+        deck = ShuffledDeck([1, 2, 3])
+
+        assert deck.draw() == 3
+        assert deck.draw() == 2
+        assert deck.to_list() == [1]
+
+    def test_draw_empty_deck(self):
+        """Test draw function with an empty deck."""
+        with pytest.raises(ValueError):
+            ShuffledDeck().draw()
+
+    def test_draw_no_panic(self):
+        """Test draw_no_panic function skips the panic pile."""
+        deck = ShuffledDeck([1, 5, 2, 6], is_panic=lambda card: card > 4)
+
+        assert deck.count_no_panic() == 2
+        assert deck.draw_no_panic() == 2
+        assert deck.draw_no_panic() == 1
+        with pytest.raises(ValueError):
+            deck.draw_no_panic()
+        assert sorted(deck) == [5, 6]
+
+    def test_draw_takes_both_piles(self):
+        """Test draw function takes cards from both piles."""
+        deck = ShuffledDeck(range(10), is_panic=lambda card: card % 2 == 0)
+
+        cards = [deck.draw() for _ in range(10)]
+
+        assert sorted(cards) == list(range(10))
+        assert [card for card in cards if card % 2 == 0] == [8, 6, 4, 2, 0]
+        assert [card for card in cards if card % 2 == 1] == [9, 7, 5, 3, 1]
+
+    def test_insert_and_remove(self):
+        """Test insert and remove functions."""
+        deck = ShuffledDeck([1, 2, 3])
+
+        deck.insert(4)
+        deck.remove(2)
+
+        assert sorted(deck) == [1, 3, 4]
+        assert 2 not in deck
+        with pytest.raises(ValueError):
+            deck.remove(2)
+
+    def test_refill(self):
+        """Test refill function."""
+        deck = ShuffledDeck()
+
+        deck.refill([1, 2, 3, 4])
+
+        assert sorted(deck) == [1, 2, 3, 4]
+
+    def test_from_order(self):
+        """Test from_order keeps the stored order of the deck's cards."""
+        deck = ShuffledDeck.from_order(
+            [5, 1, 9, 3, 1, 8], [1, 3, 5, 7, 8], is_panic=lambda card: card > 6
+        )
+
+        assert deck.regular == [5, 1, 3]
+        assert sorted(deck.panic) == [7, 8]
@@ -0,0 +1,85 @@
+"""Test the locked doors bitset."""
+from . import Doors
+from . import GameState
+from . import PlayerState
+
+
+class TestDoors:
+    """Test Doors class."""
+
+    def test_list_behavior(self):
+        """Test the doors behave like the former list of 0/1."""
+        doors = Doors.from_list([0, 1, 0, 1])
+
+        assert doors.mask == 0b1010
+        assert doors == [0, 1, 0, 1]
+        assert list(doors) == [0, 1, 0, 1]
+        assert len(doors) == 4
+        assert doors[1] == 1 and doors[2] == 0
+
+        doors[2] = 1
+        doors[1] = 0
+        assert doors == [0, 0, 1, 1]
+
+    def test_ranges(self):
+        """Test lock_range and unlock_range functions."""
+        doors = Doors(6)
+
+        doors.lock_range(1, 4)
+        assert doors == [0, 1, 1, 1, 0, 0]
+        doors.unlock_range(2, 3)
+        assert doors == [0, 1, 0, 1, 0, 0]
+        # Wrapping after the last door
+        doors.lock_range(5, 1)
+        assert doors == [1, 1, 0, 1, 0, 1]
+
+    def test_locked_between(self):
+        """Test locked_between function."""
+        doors = Doors(4)
+        doors.lock(0)  # Between positions 4 and 1
+        doors.lock(2)  # Between positions 2 and 3
+
+        assert not doors.locked_between(1, 2)
+        assert doors.locked_between(2, 3)
+        assert doors.locked_between(4, 1)
+        assert doors.locked_between(3, 2)
+        assert not doors.locked_between(3, 4)
+
+    def test_copy(self):
+        """Test copy function returns independent doors."""
+        doors = Doors(4, 0b1)
+        copy = doors.copy()
+        copy.lock(3)
+
+        assert doors.mask == 0b1
+        assert copy.mask == 0b1001
+
+
+class TestGameStateDoors:
+    """Test the doors between the players of a game."""
+
+    def test_door_locked_between(self):
+        """Test door_locked_between function."""
+        players = {
+            i: PlayerState(id=i, name=f"Player{i}", round_position=i)
+            for i in range(1, 6)
+        }
+        game = GameState(id=1, players=players, locked_doors=[0, 0, 1, 0, 0])
+
+        assert len(game.locked_doors) == 5
+        assert game.door_locked_between(2, 3)
+        assert game.door_locked_between(3, 2)
+        assert not game.door_locked_between(3, 4)
+        # Not neighbors
+        assert not game.door_locked_between(1, 3)
+
+        # Neighbors across a dead player
+        game.get_player(3).alive = False
+        assert game.door_locked_between(2, 4)
+
+        # Two alive players: both sides must be locked
+        game.get_player(1).alive = False
+        game.get_player(5).alive = False
+        assert not game.door_locked_between(2, 4)
+        game.locked_doors.lock(0)
+        assert game.door_locked_between(2, 4)
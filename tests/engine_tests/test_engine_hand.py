@@ -0,0 +1,76 @@
+"""Test hands indexed by idtype."""
+import pytest
+
+from . import Hand
+
+# Card id -> idtype
+IDTYPES = {1: 3, 2: 3, 3: 13, 4: 2, 5: 2}
+
+
+def new_hand(cards=(1, 3, 4)) -> Hand:
+    return Hand(cards, IDTYPES.get)
+
+
+class TestHand:
+    """Test operations of the hand."""
+
+    def test_index(self):
+        """Test the index follows the cards added and removed."""
+        hand = new_hand()
+        hand.append(2)
+        hand.extend([5])
+
+        assert hand == [1, 3, 4, 2, 5]
+        assert hand.of_idtype(3) == [1, 2]
+        assert hand.count_idtype(2) == 2
+        assert hand.has_idtype(13)
+
+        hand.remove(3)
+        hand.remove(1)
+
+        assert hand == [4, 2, 5]
+        assert not hand.has_idtype(13)
+        assert hand.count_idtype(13) == 0
+        assert hand.of_idtype(3) == [2]
+        assert hand.by_idtype == {2: [4, 5], 3: [2]}
+
+    def test_remove_missing_card(self):
+        """Test remove a card that isn't in the hand."""
+        hand = new_hand()
+        with pytest.raises(ValueError):
+            hand.remove(2)
+        assert hand == [1, 3, 4]
+
+    def test_copy(self):
+        """Test a copy of the hand is independent of the original."""
+        hand = new_hand()
+        copy = hand.copy()
+        copy.remove(4)
+        copy.append(5)
+
+        assert hand == [1, 3, 4]
+        assert hand.of_idtype(2) == [4]
+        assert copy == [1, 3, 5]
+        assert copy.of_idtype(2) == [5]
+
+    def test_classify(self):
+        """Test a hand made without idtypes is indexed by those of its
+        game, only once."""
+        hand = Hand([1, 3, 4])
+        assert hand.by_idtype == {0: [1, 3, 4]}
+
+        hand.classify(IDTYPES.get)
+        assert hand.by_idtype == {3: [1], 13: [3], 2: [4]}
+        hand.classify(lambda card: 0)
+        assert hand.of_idtype(3) == [1]
+
+    def test_sequence(self):
+        """Test the hand works as a sequence of card ids."""
+        hand = new_hand()
+
+        assert len(hand) == 3
+        assert list(hand) == [1, 3, 4]
+        assert hand[-1] == 4
+        assert 3 in hand
+        assert 2 not in hand
+        assert hand == new_hand()
@@ -0,0 +1,87 @@
+"""Test the ring of alive seats."""
+import pytest
+
+from . import GameState
+from . import PlayerState
+
+
+def new_game_state(quantity: int = 5) -> GameState:
+    """Create a game where player i sits in position i."""
+    players = {
+        i: PlayerState(id=i, name=f"Player{i}", round_position=i)
+        for i in range(1, quantity + 1)
+    }
+    return GameState(id=1, players=players, cards={})
+
+
+class TestSeatRing:
+    """Test turns and neighbors of the game state."""
+
+    def test_next_position(self):
+        """Test next_position follows the round direction."""
+        game = new_game_state()
+
+        assert game.next_position(1) == 2
+        assert game.next_position(5) == 1
+        game.round_left_direction = True
+        assert game.next_position(1) == 5
+        assert game.next_position(3) == 2
+
+    def test_death_skips_seat(self):
+        """Test a dead player is skipped by turns and neighbors."""
+        game = new_game_state()
+        game.get_player(2).alive = False
+
+        assert game.next_position(1) == 3
+        assert game.alive_neighbors(3) == [1, 4]
+        # From the seat of the dead player
+        assert game.next_position(2) == 3
+        assert game.alive_neighbors(2) == [1, 3]
+
+        game.get_player(2).alive = True
+        assert game.next_position(1) == 2
+        assert game.alive_neighbors(3) == [2, 4]
+
+    def test_position_swap(self):
+        """Test a swap of positions moves the players in the ring."""
+        game = new_game_state()
+        target = game.get_player(4)
+        user = game.get_player(2)
+        target.round_position, user.round_position = (
+            user.round_position,
+            target.round_position,
+        )
+
+        assert game.get_player_in_position(2) is target
+        assert game.get_player_in_position(4) is user
+        assert game.alive_neighbors(4) == [1, 3]
+        assert game.alive_neighbors(2) == [3, 5]
+
+        # Swap with a dead player
+        game.get_player(5).alive = False
+        user.round_position, game.get_player(5).round_position = 5, 4
+        assert game.next_position(3) == 5
+        assert game.next_position(5) == 1
+
+    def test_last_players(self):
+        """Test the neighbors with two or one alive players."""
+        game = new_game_state(3)
+        game.get_player(3).alive = False
+
+        assert game.alive_neighbors(1) == [2, 2]
+        game.get_player(2).alive = False
+        assert game.alive_neighbors(1) == []
+        assert game.next_position(1) == 1
+
+        game.get_player(1).alive = False
+        with pytest.raises(ValueError):
+            game.next_position(1)
+
+    def test_copy(self):
+        """Test a copy of the game has its own ring."""
+        game = new_game_state()
+        copy = game.copy()
+        copy.get_player(2).alive = False
+
+        assert copy.next_position(1) == 3
+        assert game.next_position(1) == 2
@@ -0,0 +1,261 @@
+"""Test in-memory game state."""
+import pytest
+
+from . import GameState
+from . import PlayerState
+
+# Card id -> (idtype, type) of a small fictional deck
+CARDS = {
+    0: (1, "INFECTION"),
+    1: (2, "INFECTION"),
+    2: (3, "ACTION"),
+    3: (3, "ACTION"),
+    4: (13, "DEFENSE"),
+    5: (20, "PANIC"),
+    6: (21, "PANIC"),
+    7: (8, "ACTION"),
+}
+
+
+def new_game_state(
+    available_deck=None, disposable_deck=None, current_phase="Draw"
+) -> GameState:
+    """Create a game with 4 players and empty hands."""
+    players = {
+        i: PlayerState(id=i, name=f"Player{i}", round_position=i)
+        for i in range(1, 5)
+    }
+    return GameState(
+        id=1,
+        players=players,
+        cards=CARDS,
+        available_deck=list(CARDS)
+        if available_deck is None
+        else available_deck,
+        disposable_deck=[] if disposable_deck is None else disposable_deck,
+        current_phase=current_phase,
+        locked_doors=[0, 0, 0, 0],
+    )
+
+
+class TestGameStatePlayers:
+    """Test players of the game state."""
+
+    def test_get_player(self):
+        """Test get_player function."""
+        game = new_game_state()
+
+        assert game.exists_player(1)
+        assert game.get_player(1).name == "Player1"
+        assert not game.exists_player(5)
+        with pytest.raises(ValueError):
+            game.get_player(5)
+
+    def test_get_player_in_position(self):
+        """Test get_player_in_position function."""
+        game = new_game_state()
+        game.players[1].round_position = 3
+        game.players[3].round_position = 1
+
+        assert game.get_player_in_position(1).id == 3
+        assert game.get_player_in_position(3).id == 1
+        assert game.get_player_in_position(5) is None
+
+
+class TestGameStateDeck:
+    """Test deck operations of the game state."""
+
+    def test_draw(self):
+        """Test draw function."""
+        game = new_game_state()
+
+        card = game.draw(1)
+
+        assert game.get_player(1).hand == [card]
+        assert card not in game.available_deck
+        assert len(game.available_deck) == len(CARDS) - 1
+
+    def test_draw_follows_deck_order(self):
+        """Test draw function takes the cards from the top of the deck."""
+        game = new_game_state(available_deck=[4, 7, 2])
+
+        assert game.draw(1) == 2
+        assert game.draw(1) == 7
+        assert game.draw(1) == 4
+
+    def test_draw_not_in_draw_phase(self):
+        """Test draw function outside the draw phase."""
+        game = new_game_state(current_phase="Discard")
+
+        with pytest.raises(ValueError):
+            game.draw(1)
+
+    def test_draw_refills_available_deck(self):
+        """Test draw function with an empty available deck."""
+        game = new_game_state(available_deck=[], disposable_deck=[2, 3])
+
+        card = game.draw(1)
+
+        assert card in [2, 3]
+        assert game.disposable_deck == []
+        assert len(game.available_deck) == 1
+
+    def test_draw_empty_decks(self):
+        """Test draw function with both decks empty."""
+        game = new_game_state(available_deck=[])
+
+        with pytest.raises(ValueError):
+            game.draw(1)
+
+    def test_draw_no_panic(self):
+        """Test draw_no_panic function."""
+        game = new_game_state(available_deck=[7, 5, 2, 6])
+
+        card = game.draw_no_panic(1)
+
+        assert card == 2
+        assert game.get_player(1).hand == [2]
+        # The panic cards are skipped without discarding them
+        assert sorted(game.available_deck) == [5, 6, 7]
+        assert game.disposable_deck == []
+
+    def test_draw_no_panic_only_panic_left(self):
+        """Test draw_no_panic function when only panic cards are left."""
+        game = new_game_state(available_deck=[5, 6], disposable_deck=[3])
+
+        card = game.draw_no_panic(1)
+
+        assert card == 3
+        assert sorted(game.available_deck) == [5, 6]
+        assert game.disposable_deck == []
+
+    def test_discard(self):
+        """Test discard function."""
+        game = new_game_state(available_deck=[4, 7])
+        game.draw(1)
+        game.draw(1)
+        game.current_phase = "Discard"
+
+        card = game.discard(1, 8)
+
+        assert card == 7
+        assert game.get_player(1).hand == [4]
+        assert game.disposable_deck == [7]
+
+    def test_discard_invalid(self):
+        """Test discard function with invalid options."""
+        game = new_game_state(available_deck=[4])
+
+        # Not in discard phase
+        with pytest.raises(ValueError):
+            game.discard(1, 13)
+
+        game.current_phase = "Discard"
+
+        # Empty hand
+        with pytest.raises(ValueError):
+            game.discard(1, 13)
+
+        game.get_player(1).hand.append(game.available_deck.draw())
+
+        # Without that idtype in hand
+        with pytest.raises(ValueError):
+            game.discard(1, 3)
+
+    def test_give_card(self):
+        """Test give_card function."""
+        game = new_game_state()
+        game.get_player(1).hand.append(2)
+
+        game.give_card(2, 1, 2)
+
+        assert game.get_player(1).hand == []
+        assert game.get_player(2).hand == [2]
+        with pytest.raises(ValueError):
+            game.give_card(2, 1, 2)
+
+    def test_count_in_hand(self):
+        """Test count_in_hand and get_cards_in_hand functions."""
+        game = new_game_state()
+        game.get_player(1).hand.extend([2, 3, 4])
+
+        assert game.count_in_hand(1, 3) == 2
+        assert game.get_cards_in_hand(1, 3) == [2, 3]
+        assert game.count_in_hand(1, 13) == 1
+        assert game.count_in_hand(1, 1) == 0
+
+    def test_holders(self):
+        """Test the inverted index follows the cards of every hand."""
+        game = new_game_state()
+        game.get_player(1).hand.extend([2, 4])
+        game.get_player(3).hand.append(3)
+
+        assert game.holders_of(3) == [1, 3]
+        assert game.holders_of(13) == [1]
+
+        game.give_card(2, 1, 2)
+        assert game.holders_of(3) == [2, 3]
+
+        copy = game.copy()
+        copy.give_card(3, 3, 4)
+        assert copy.holders_of(3) == [2, 4]
+        assert game.holders_of(3) == [2, 3]
+
+        game.current_phase = "Discard"
+        game.discard(1, 13)
+        assert game.holders_of(13) == []
+
+    def test_replace_all(self):
+        """Test replace_all function only replaces the cards of an idtype
+        held by alive players."""
+        game = new_game_state(available_deck=[0, 1, 7, 5])
+        game.get_player(1).hand.extend([2, 3])
+        game.get_player(3).hand.append(4)
+        game.get_player(4).hand.append(6)
+        game.get_player(4).alive = False
+
+        replaced = game.replace_all(3)
+
+        assert list(replaced) == [1]
+        assert [card for card, _ in replaced[1]] == [2, 3]
+        assert sorted(game.get_player(1).hand) == [1, 7]
+        assert game.disposable_deck == [2, 3]
+        assert game.holders_of(3) == []
+        assert game.get_player(3).hand == [4]
+
+        # Dead players keep their cards
+        assert game.replace_all(21) == {}
+        assert game.get_player(4).hand == [6]
+
+    def test_random_streams(self):
+        """Test the random decisions of a game only depend on its seed."""
+        game = new_game_state()
+        game.seed = 7
+        game.reseed()
+        other = GameState(id=1, seed=7, rng_step=1)
+
+        assert game.rng.random() == other.rng.random()
+        copy = game.copy()
+        assert copy.rng is not game.rng
+        assert copy.available_deck.rng is copy.rng
+        assert copy.rng.random() == game.rng.random()
+
+        game.reseed()
+        other.reseed()
+        assert game.rng_step == 2
+        assert game.rng.random() == other.rng.random()
+
+    def test_copy(self):
+        """Test copy function returns an independent state."""
+        game = new_game_state()
+        game.draw(1)
+
+        copy = game.copy()
+        copy.draw(1)
+        copy.get_player(2).alive = False
+        copy.locked_doors[0] = 1
+
+        assert len(game.get_player(1).hand) == 1
+        assert len(copy.get_player(1).hand) == 2
+        assert game.get_player(2).alive
+        assert game.locked_doors == [0, 0, 0, 0]
@@ -0,0 +1,306 @@
+"""Test loading, saving and hosting of game states."""
+import asyncio
+import time
+
+import core.engine.store as store
+import pytest
+
+from . import clean_db
+from . import commit
+from . import db_session
+from . import Deck
+from . import delete_decks
+from . import draw_specific
+from . import Game
+from . import GameCard
+from . import game_event
+from . import game_store
+from . import get_player_game_id
+from . import initialize_decks
+from . import load_game_state
+from . import open_game
+from . import open_player_game
+from . import Player
+from . import save_game_state
+from . import use_card_instances
+
+
+class TestGameStore:
+    """Test the persistence of the in-memory game state."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup class."""
+        clean_db()
+
+    @classmethod
+    def teardown_class(cls):
+        """Teardown class."""
+        clean_db()
+
+    @db_session
+    def setup_method(self):
+        """Setup method."""
+        initialize_decks(id_game=1, quantity_players=4)
+        Game(id=1, current_phase="Draw", deck=Deck[1])
+        for i in range(1, 5):
+            Player(
+                id=i,
+                name=f"Player{i}",
+                round_position=i,
+                game=Game[1],
+                alive=True,
+            )
+        draw_specific(id_game=1, id_player=1, idtype_card=3)
+        commit()
+
+    @db_session
+    def teardown_method(self):
+        """Teardown method."""
+        game_store.release(1)
+        for card in list(Player[1].hand):
+            Player[1].hand.remove(card)
+        delete_decks(id_game=1)
+        Game[1].delete()
+        for i in range(1, 5):
+            Player[i].delete()
+        commit()
+
+    @db_session
+    def get_hand(self, id_player: int):
+        """Get the ids of the cards in a player's hand from the database."""
+        return sorted(card.id for card in Player[id_player].hand)
+
+    def test_load_game_state(self):
+        """Test load_game_state function."""
+        game = load_game_state(1)
+
+        assert game.id == 1
+        assert sorted(game.players) == [1, 2, 3, 4]
+        assert game.get_player(1).hand == self.get_hand(1)
+        assert game.count_in_hand(1, 3) == 1
+        assert len(game.available_deck) == len(game.cards) - 1
+        assert game.disposable_deck == []
+        assert game.locked_doors == [0, 0, 0, 0]
+
+    def test_load_game_state_game_doesnt_exist(self):
+        """Test load_game_state function with a game that doesn't exist."""
+        with pytest.raises(ValueError):
+            load_game_state(2)
+
+    @db_session
+    def test_save_game_state(self):
+        """Test save_game_state function."""
+        game = load_game_state(1)
+        card = game.draw(2)
+        game.get_player(3).alive = False
+        game.round_left_direction = True
+        game.locked_doors[1] = 1
+
+        save_game_state(game)
+
+        assert card in self.get_hand(2)
+        assert not Player[3].alive
+        assert Game[1].round_left_direction
+        assert Game[1].locked_doors == 0b10
+        assert len(Deck[1].available_deck.cards) == len(game.available_deck)
+
+    @db_session
+    def test_deck_order_is_persisted(self):
+        """Test the order of the available deck survives a save and load."""
+        game = load_game_state(1)
+        available = Deck[1].available_deck
+        assert game.available_deck.regular == list(available.order)
+        assert game.available_deck.panic == list(available.panic_order)
+        game.draw(2)
+
+        save_game_state(game)
+
+        assert load_game_state(1).available_deck.to_list() == (
+            game.available_deck.to_list()
+        )
+
+    @db_session
+    def test_use_card_instances(self):
+        """Test moving the cards of a game to its own card instances."""
+        before = load_game_state(1)
+
+        use_card_instances(1)
+
+        assert Game[1].card_instances
+        assert self.get_hand(1) == []
+        assert Deck[1].available_deck.cards.is_empty()
+        assert GameCard.select(lambda c: c.game == Game[1]).count() == len(
+            before.cards
+        )
+        after = load_game_state(1)
+        assert after.get_player(1).hand == before.get_player(1).hand
+        assert after.available_deck.to_list() == (
+            before.available_deck.to_list()
+        )
+
+    @db_session
+    def test_save_card_instances(self):
+        """Test a moved card is written to its card instance."""
+        use_card_instances(1)
+        game = load_game_state(1)
+        card = game.draw(2)
+        game.current_phase = "Discard"
+        game.discard(1, 3)
+
+        save_game_state(game)
+
+        instance = GameCard[Game[1], card]
+        assert instance.location == "hand"
+        assert instance.owner.id == 2
+        assert (
+            GameCard.select(
+                lambda c: c.game == Game[1] and c.location == "disposable"
+            ).count()
+            == 1
+        )
+        assert load_game_state(1).get_player(2).hand == [card]
+
+    def test_open_game_saves_changes(self):
+        """Test open_game saves the state when it isn't hosted."""
+        with open_game(1) as game:
+            card = game.draw(2)
+            # Nested calls share the same state
+            with open_game(1) as nested_game:
+                assert nested_game is game
+            with open_player_game(2) as nested_game:
+                assert nested_game is game
+
+        assert card in self.get_hand(2)
+
+    def test_open_game_discards_changes_on_error(self):
+        """Test open_game doesn't save the state if an error happens."""
+        with pytest.raises(ValueError):
+            with open_game(1) as game:
+                game.draw(2)
+                game.get_player(5)
+
+        assert self.get_hand(2) == []
+
+    def test_hosted_game_is_written_behind(self):
+        """Test a hosted game is only written when the store flushes."""
+        hosted_game = game_store.host(1)
+
+        with open_game(1) as game:
+            assert game is hosted_game
+            card = game.draw(2)
+
+        # The database is written in batches, not on every change
+        assert self.get_hand(2) == []
+        assert game_store.flush() == 1
+        assert self.get_hand(2) == [card]
+        assert game_store.flush() == 0
+
+    def test_failed_flush_is_retried(self, monkeypatch):
+        """Test the games of a flush that fails are flushed again."""
+        game_store.host(1)
+        with game_event(1) as game:
+            card = game.draw(2)
+
+        def failing_save(states):
+            raise RuntimeError("database is locked")
+
+        monkeypatch.setattr(store, "save_game_states", failing_save)
+        with pytest.raises(RuntimeError):
+            game_store.flush()
+        assert self.get_hand(2) == []
+
+        monkeypatch.undo()
+        assert game_store.flush() == 1
+        assert self.get_hand(2) == [card]
+
+    def test_flush_forever_survives_errors(self, monkeypatch):
+        """Test the background flush keeps running after a failed save and
+        finishes the save in progress when it's cancelled."""
+        game_store.host(1)
+        saves = []
+        finished = []
+
+        def flaky_save(states):
+            # Runs in another thread, that doesn't see the test database
+            saves.append([state.id for state in states])
+            if len(saves) == 1:
+                raise RuntimeError("database is locked")
+            time.sleep(0.05)
+            finished.append(True)
+
+        monkeypatch.setattr(store, "save_game_states", flaky_save)
+
+        async def main():
+            flusher = asyncio.create_task(game_store.flush_forever(0.01))
+            with game_event(1) as game:
+                game.draw(2)
+            while len(saves) < 2:
+                await asyncio.sleep(0.01)
+            flusher.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await flusher
+
+        asyncio.run(main())
+        assert saves == [[1], [1]]
+        assert finished == [True]
+        assert game_store.flush() == 0
+
+    def test_game_event_keeps_changes_on_success(self):
+        """Test a hosted game takes the changes of a finished event."""
+        hosted_game = game_store.host(1)
+
+        with game_event(1) as game:
+            assert game is not hosted_game
+            card = game.draw(2)
+            with open_game(1) as nested_game:
+                assert nested_game is game
+
+        assert game_store.get(1).get_player(2).hand == [card]
+        assert game_store.get(1).version > hosted_game.version > 0
+        assert game_store.flush() == 1
+        assert self.get_hand(2) == [card]
+
+    def test_game_event_discards_changes_on_error(self):
+        """Test a failed event leaves the hosted game untouched."""
+        game_store.host(1)
+
+        with pytest.raises(ValueError):
+            with game_event(1) as game:
+                game.current_phase = "Discard"
+                game.draw(2)
+
+        assert game_store.get(1).current_phase == "Draw"
+        assert game_store.get(1).get_player(2).hand == []
+        assert game_store.flush() == 0
+
+    def test_game_event_random_stream(self):
+        """Test an event draws from the same random stream whether the game
+        is hosted or not."""
+        with db_session:
+            Game[1].seed = 42
+
+        game_store.host(1)
+        with game_event(1) as game:
+            assert game.rng_step == 1
+            hosted_draws = [game.rng.random() for _ in range(3)]
+        game_store.release(1)
+
+        with game_event(1) as game:
+            assert game.rng_step == 1
+            draws = [game.rng.random() for _ in range(3)]
+
+        assert draws == hosted_draws
+        with db_session:
+            assert Game[1].seed == 42
+            assert Game[1].rng_step == 1
+        with game_event(1) as game:
+            assert game.rng.random() != draws[0]
+
+    def test_get_player_game_id(self):
+        """Test get_player_game_id function."""
+        assert get_player_game_id(1) == 1
+        game_store.host(1)
+        assert get_player_game_id(1) == 1
+        with pytest.raises(ValueError):
+            get_player_game_id(5)
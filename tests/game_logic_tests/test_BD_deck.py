@@ -21,6 +21,7 @@ from . import get_available_deck
 from . import get_deck
 from . import get_disposable_deck
 from . import get_random_card_from_available_deck
+from . import get_top_card_from_available_deck
 from . import move_disposable_to_available_deck
 
 # ===================== BASIC DECK FUNCTIONS =====================
@@ -253,6 +254,76 @@ class TestDeckCard:
             get_random_card_from_available_deck(1)
         self.end_db()
 
+    # Get top card from available deck
+
+    @db_session
+    def test_get_top_card_from_available_deck(self):
+        """Test get_top_card_from_available_deck function."""
+        self.init_db()
+        for i in range(1, 11):
+            AvailableDeck[1].cards.add(Card[i])
+        AvailableDeck[1].order = [3, 1, 2, 4, 5, 6, 7, 8, 9, 10]
+        commit()
+
+        card = get_top_card_from_available_deck(1)
+
+        assert card.id == 10
+        self.end_db()
+
+    @db_session
+    def test_get_top_card_from_available_deck_with_stale_order(self):
+        """Test get_top_card_from_available_deck function when the order has cards out of the deck."""
+        self.init_db()
+        for i in range(1, 6):
+            AvailableDeck[1].cards.add(Card[i])
+        AvailableDeck[1].order = [1, 2, 3, 9, 10]
+        commit()
+
+        card = get_top_card_from_available_deck(1)
+
+        assert card.id == 3
+        assert list(AvailableDeck[1].order) == [1, 2, 3]
+        self.end_db()
+
+    @db_session
+    def test_get_top_card_from_available_deck_without_order(self):
+        """Test get_top_card_from_available_deck function when the deck has no order."""
+        self.init_db()
+        for i in range(1, 11):
+            AvailableDeck[1].cards.add(Card[i])
+        commit()
+
+        card = get_top_card_from_available_deck(1)
+
+        assert card.id in range(1, 11)
+        assert sorted(AvailableDeck[1].order) == list(range(1, 11))
+        assert list(AvailableDeck[1].panic_order) == []
+        self.end_db()
+
+    @db_session
+    def test_get_top_card_from_available_deck_without_panic(self):
+        """Test get_top_card_from_available_deck function skipping the panic cards."""
+        self.init_db()
+        for i in range(1, 11):
+            Card[i].type = "PANIC" if i > 5 else "ACTION"
+            AvailableDeck[1].cards.add(Card[i])
+        AvailableDeck[1].order = [1, 2, 3, 4, 5]
+        AvailableDeck[1].panic_order = [6, 7, 8, 9, 10]
+        commit()
+
+        for _ in range(5):
+            assert get_top_card_from_available_deck(1).id in [5, 10]
+        assert get_top_card_from_available_deck(1, panic=False).id == 5
+        self.end_db()
+
+    @db_session
+    def test_get_top_card_from_available_deck_that_is_empty(self):
+        """Test get_top_card_from_available_deck function with an empty deck."""
+        self.init_db()
+        with pytest.raises(ValueError):
+            get_top_card_from_available_deck(1)
+        self.end_db()
+
     # Move cards
 
     @db_session
@@ -3,11 +3,18 @@ import pytest
 
 from . import AvailableDeck
 from . import Card
+from . import card_catalog
+from . import card_defense
 from . import card_names
 from . import clean_db
 from . import create_all_cards
 from . import db_session
+from . import deck_templates
+from . import get_card_info
+from . import get_deck_template
 from . import init_available_deck
+from . import MAX_PLAYERS
+from . import MIN_PLAYERS
 from . import quantity_cards
 
 # ===================== INITIAL CARD FUNCTIONS =====================
@@ -195,3 +202,77 @@ class TestCardCreation:
         for x in list(Card.select()):
             x.delete()
         AvailableDeck[1].delete()
+
+    @db_session
+    def test_init_available_deck_sets_draw_order(self):
+        """Test initialize an available deck shuffles its draw order."""
+        AvailableDeck(id=1)
+        init_available_deck(1, 12)
+
+        available_deck = AvailableDeck[1]
+        regular = {x.id for x in available_deck.cards if x.type != "PANIC"}
+        panic = {x.id for x in available_deck.cards if x.type == "PANIC"}
+        assert sorted(available_deck.order) == sorted(regular)
+        assert sorted(available_deck.panic_order) == sorted(panic)
+
+        for x in list(Card.select()):
+            x.delete()
+        AvailableDeck[1].delete()
+
+    # Deck templates
+
+    def test_deck_templates(self):
+        """Test the precomputed initial decks match quantity_cards."""
+        assert sorted(deck_templates) == list(
+            range(MIN_PLAYERS, MAX_PLAYERS + 1)
+        )
+        for cnt_players, template in deck_templates.items():
+            for i, quantity in enumerate(template.quantity_by_idtype):
+                assert quantity == sum(quantity_cards[i][: cnt_players + 1])
+            assert len(template.cards) == sum(template.quantity_by_idtype)
+            assert len(set(template.cards)) == len(template.cards)
+            assert sum(template.quantity_by_category.values()) == len(
+                template.cards
+            )
+        assert len(deck_templates[MAX_PLAYERS].cards) == 109
+
+    @db_session
+    def test_init_available_deck_uses_template(self):
+        """Test initialize an available deck with the cards of its template."""
+        AvailableDeck(id=1)
+        init_available_deck(1, 7)
+
+        template = get_deck_template(7)
+        assert sorted(x.id for x in AvailableDeck[1].cards) == sorted(
+            template.cards
+        )
+        for i, quantity in enumerate(template.quantity_by_idtype):
+            assert AvailableDeck[1].cards.select(idtype=i).count() == quantity
+
+        for x in list(Card.select()):
+            x.delete()
+        AvailableDeck[1].delete()
+
+    # Card catalog
+
+    @db_session
+    def test_card_catalog_matches_database(self):
+        """Test the catalog has the same cards create_all_cards creates."""
+        create_all_cards()
+
+        assert len(card_catalog) == Card.select().count()
+        for card in Card.select():
+            info = get_card_info(card.id)
+            assert info.idtype == card.idtype
+            assert info.name == card.name
+            assert info.category == card.type
+            assert list(info.defenses) == card_defense[card.idtype]
+
+        for x in list(Card.select()):
+            x.delete()
+
+    def test_get_card_info_unknown_card(self):
+        """Test get the info of a card that isn't in the catalog."""
+        with pytest.raises(ValueError):
+            get_card_info(109)
+        assert get_card_info(0).name == card_names[1][0]
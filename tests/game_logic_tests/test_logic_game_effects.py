@@ -191,6 +191,23 @@ class TestPlayInvalidOptions:
                 idtype_defense_card=0,
             )
 
+    # Locked door between the players
+    def test_locked_door_between_players(self):
+        """Test a card played on a neighbor behind a locked door."""
+        with db_session:
+            Game[1].locked_doors = 0b10  # Between positions 1 and 2
+
+        with pytest.raises(ValueError):
+            play(
+                id_game=1,
+                attack_player_id=1,
+                defense_player_id=2,
+                idtype_attack_card=3,
+                idtype_defense_card=0,
+            )
+        with db_session:
+            assert Player[2].alive
+
 
 class TestGetDefense:
     """Test Get Defense Function."""
@@ -0,0 +1,65 @@
+"""Test the compiled card rules."""
+from . import can_defend
+from . import card_defense
+from . import card_names
+from . import CATEGORY
+from . import DEFENDED_BY
+from . import EXCHANGE
+from . import idtypes_in
+from . import is_category
+from . import is_defense
+from . import is_defensible
+from . import is_playable
+from . import is_private_reveal
+from . import is_target
+from . import requires_neighbor
+
+
+class TestRules:
+    """Test the rules match card_names and card_defense."""
+
+    def test_categories(self):
+        """Test every idtype is only in the mask of its category."""
+        for idtype, (_, category, _, _) in enumerate(card_names):
+            for name in CATEGORY:
+                assert is_category(idtype, name) == (name == category)
+        assert idtypes_in(CATEGORY["DEFENSE"]) == [13, 14, 15, 16, 17]
+        assert is_defense(13)
+        assert not is_defense(3)
+        assert not is_defense(EXCHANGE)
+
+    def test_defenses(self):
+        """Test can_defend gives the same answers as card_defense."""
+        for attack, defenses in enumerate(card_defense):
+            assert idtypes_in(DEFENDED_BY[attack]) == defenses
+            assert is_defensible(attack) == bool(defenses)
+            for defense in range(len(card_defense)):
+                assert can_defend(attack, defense) == (defense in defenses)
+        assert can_defend(EXCHANGE, 14)
+        assert not can_defend(33, 14)
+        assert not can_defend(3, -1)
+
+    def test_card_flags(self):
+        """Test the private reveal, neighbor target and playable cards."""
+        assert [i for i in range(33) if is_private_reveal(i)] == [
+            4,
+            6,
+            14,
+            27,
+            31,
+        ]
+        assert [i for i in range(33) if requires_neighbor(i)] == [
+            3,
+            4,
+            6,
+            9,
+            18,
+            19,
+            EXCHANGE,
+        ]
+        assert [i for i in range(33) if is_target(i, "ADJACENT")] == [5]
+        assert [i for i in range(33) if is_target(i, "ANYONE")] == [12, 22]
+        assert not is_target(13, "SELF")
+        assert not is_playable(1)
+        assert not is_playable(2)
+        assert is_playable(3)
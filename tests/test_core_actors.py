@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+from . import RoomActors
+
+
+def command(log: list, name: str, delay: float):
+    async def run():
+        log.append(("start", name))
+        await asyncio.sleep(delay)
+        log.append(("end", name))
+        return name
+
+    return run
+
+
+class TestRoomActors:
+    def test_commands_of_a_room_run_in_order(self):
+        log = []
+
+        async def main():
+            actors = RoomActors()
+            return await asyncio.gather(
+                actors.submit(1, command(log, "a", 0.03)),
+                actors.submit(1, command(log, "b", 0.01)),
+                actors.submit(1, command(log, "c", 0)),
+            )
+
+        assert asyncio.run(main()) == ["a", "b", "c"]
+        assert log == [
+            ("start", "a"),
+            ("end", "a"),
+            ("start", "b"),
+            ("end", "b"),
+            ("start", "c"),
+            ("end", "c"),
+        ]
+
+    def test_rooms_run_in_parallel(self):
+        log = []
+
+        async def main():
+            actors = RoomActors()
+            await asyncio.gather(
+                actors.submit(1, command(log, "a", 0.02)),
+                actors.submit(2, command(log, "b", 0.01)),
+            )
+
+        asyncio.run(main())
+
+        assert log[:2] == [("start", "a"), ("start", "b")]
+
+    def test_queue_depth(self):
+        async def main():
+            actors = RoomActors()
+            tasks = [
+                asyncio.create_task(actors.submit(1, command([], i, 0.02)))
+                for i in range(3)
+            ]
+            # The first command is running and the others are waiting
+            await asyncio.sleep(0.005)
+            depth = actors.queue_depths()[1]
+            await asyncio.gather(*tasks)
+            return depth, actors.queue_depths().get(1, 0)
+
+        assert asyncio.run(main()) == (2, 0)
+
+    def test_errors_reach_the_sender(self):
+        async def fail():
+            raise ValueError("Invalid card")
+
+        async def main():
+            actors = RoomActors()
+            with pytest.raises(ValueError):
+                await actors.submit(1, fail)
+            # The actor keeps working after a failed command
+            return await actors.submit(1, command([], "a", 0))
+
+        assert asyncio.run(main()) == "a"
+
+    def test_stop(self):
+        async def main():
+            actors = RoomActors()
+            running = asyncio.create_task(
+                actors.submit(1, command([], "a", 1))
+            )
+            waiting = asyncio.create_task(
+                actors.submit(1, command([], "b", 0))
+            )
+            await asyncio.sleep(0.01)
+            actors.stop(1)
+            for task in [running, waiting]:
+                with pytest.raises(ValueError):
+                    await task
+            return actors.queue_depths()
+
+        assert asyncio.run(main()) == {}
+
+    def test_idle_actors_are_removed(self):
+        async def main():
+            actors = RoomActors()
+            await actors.submit(1, command([], "a", 0))
+            # Nothing left to run: no actor nor worker waiting
+            idle = dict(actors.actors)
+            # A new command starts over
+            result = await actors.submit(1, command([], "b", 0))
+            return idle, result, actors.actors
+
+        assert asyncio.run(main()) == ({}, "b", {})
+
+    def test_deleted_room_actor_is_gone(self):
+        async def main():
+            actors = RoomActors()
+            running = asyncio.create_task(
+                actors.submit(1, command([], "a", 1))
+            )
+            await asyncio.sleep(0.01)
+            actor = actors.get(1)
+            # The room is deleted while a command runs
+            actors.stop(1)
+            with pytest.raises(ValueError):
+                await running
+            await asyncio.sleep(0)
+            return actors.actors, actor.worker.done()
+
+        assert asyncio.run(main()) == ({}, True)
@@ -0,0 +1,91 @@
+"""Test the Monte Carlo runs of simulated games."""
+import io
+import json
+
+from . import aggregate
+from . import game_seed
+from . import game_seeds
+from . import run_games
+from . import write_csv
+
+
+def seed_of(result):
+    return result.seed
+
+
+class TestBalance:
+    """Test the runner and the aggregation of the results."""
+
+    def test_game_seeds(self):
+        """Test every game gets its own seed, the same in every run."""
+        tasks = list(game_seeds(range(4, 7), 3, seed=5))
+
+        assert [quantity for quantity, _ in tasks] == [4] * 3 + [5] * 3 + [
+            6
+        ] * 3
+        assert len({seed for _, seed in tasks}) == 9
+        assert tasks == list(game_seeds(range(4, 7), 3, seed=5))
+        assert tasks != list(game_seeds(range(4, 7), 3, seed=6))
+
+    def test_game_seeds_are_lazy(self):
+        """Test the tasks of a huge run are generated as they are needed."""
+        tasks = game_seeds(range(4, 13), 10**12, seed=0)
+
+        assert next(tasks) == (4, game_seed(0, 0))
+        assert next(tasks) == (4, game_seed(0, 1))
+
+    def test_game_seeds_of_big_runs_dont_overlap(self):
+        """Test runs with consecutive base seeds share no game, even past a
+        million games."""
+        first = {game_seed(0, index) for index in range(1_000_000, 1_001_000)}
+        second = {game_seed(1, index) for index in range(1000)}
+
+        assert not first & second
+
+    def test_run_games_deterministic(self):
+        """Test a run gives the same results with any quantity of
+        workers."""
+        tasks = list(game_seeds([4, 9], 3, seed=1))
+
+        alone = list(run_games(tasks, workers=1, max_turns=50))
+        pool = list(run_games(iter(tasks), workers=2, max_turns=50))
+
+        # The pool yields them as they finish
+        assert sorted(pool, key=seed_of) == sorted(alone, key=seed_of)
+        assert [r.quantity_players for r in alone] == [4, 4, 4, 9, 9, 9]
+
+    def test_aggregate(self):
+        """Test the CSV summary and the NDJSON lines."""
+        tasks = game_seeds([4, 5], 4, seed=0)
+        ndjson = io.StringIO()
+
+        stats = aggregate(run_games(tasks, workers=1), ndjson)
+        lines = ndjson.getvalue().splitlines()
+
+        assert sorted(stats) == [4, 5]
+        assert stats[4].games == 4
+        assert len(lines) == 8
+        assert json.loads(lines[0])["quantity_players"] == 4
+
+        file = io.StringIO()
+        write_csv(stats, file)
+        header, *rows = file.getvalue().splitlines()
+        assert header.startswith("players,games,stalled,Humans,The Thing,")
+        assert "Exchange" in header
+        assert [row.split(",")[:2] for row in rows] == [
+            ["4", "4"],
+            ["5", "4"],
+        ]
+
+    def test_stalled_games_out_of_rates(self):
+        """Test the games stopped after max_turns are only counted as
+        stalled."""
+        tasks = game_seeds([6], 8, seed=0)
+
+        stats = aggregate(run_games(tasks, workers=1, max_turns=3))[6]
+        row = stats.row(6)
+
+        assert stats.stalled > 0
+        assert stats.games + stats.stalled == 8
+        assert row["Humans"] + row["The Thing"] == stats.games
+        assert "None" not in row
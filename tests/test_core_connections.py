@@ -0,0 +1,311 @@
+import asyncio
+import json
+
+import core.connections as connections
+
+from . import ConnectionManager
+from . import ReplayBuffer
+from . import SlowConsumerPolicy
+from . import view_tracker
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float = 0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.sent = []
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("Socket closed")
+        self.sent.append(text)
+
+    async def send_json(self, data):
+        await self.send_text(json.dumps(data))
+
+    async def close(self):
+        self.closed = True
+
+
+def connect_all(manager: ConnectionManager, sockets: list):
+    async def main():
+        for user_id, websocket in enumerate(sockets, start=1):
+            await manager.connect(websocket, 1, user_id)
+
+    return main()
+
+
+async def settle(manager: ConnectionManager):
+    await manager.drain(1)
+    await asyncio.gather(*manager.closing)
+
+
+class TestBroadcast:
+    def test_broadcast_encodes_once(self, monkeypatch):
+        manager = ConnectionManager()
+        sockets = [FakeWebSocket() for _ in range(12)]
+        calls = []
+        encode = connections.encode
+
+        def counting_encode(message):
+            calls.append(message)
+            return encode(message)
+
+        monkeypatch.setattr(connections, "encode", counting_encode)
+
+        async def main():
+            await connect_all(manager, sockets)
+            await manager.broadcast(1, {"type": "game_info"})
+            await settle(manager)
+
+        asyncio.run(main())
+
+        assert len(calls) == 1
+        for websocket in sockets:
+            assert json.loads(websocket.sent[0]) == {
+                "type": "game_info",
+                "seq": 1,
+            }
+
+    def test_slow_socket_does_not_delay_the_room(self, monkeypatch):
+        monkeypatch.setattr(connections, "SEND_TIMEOUT", 0.05)
+        manager = ConnectionManager()
+        slow = FakeWebSocket(delay=1)
+        sockets = [FakeWebSocket(), slow, FakeWebSocket()]
+
+        async def main():
+            await connect_all(manager, sockets)
+            start = asyncio.get_running_loop().time()
+            await manager.broadcast(1, {"type": "play"})
+            await manager.outboxes[sockets[0]].drain()
+            await manager.outboxes[sockets[2]].drain()
+            elapsed = asyncio.get_running_loop().time() - start
+            await settle(manager)
+            return elapsed
+
+        assert asyncio.run(main()) < 0.5
+        assert len(sockets[0].sent) == len(sockets[2].sent) == 1
+        # The slow socket is dropped from the room
+        assert slow.closed
+        assert slow not in manager.active_connections[1]
+        assert 2 not in manager.user_sockets
+
+    def test_failed_socket_is_dropped(self):
+        manager = ConnectionManager()
+        broken = FakeWebSocket(fail=True)
+
+        async def main():
+            await connect_all(manager, [FakeWebSocket(), broken])
+            await manager.send_to_user_id(2, {"type": "draw"})
+            await settle(manager)
+            await manager.broadcast(1, {"type": "play"})
+            await settle(manager)
+
+        asyncio.run(main())
+
+        assert broken.closed
+        assert manager.active_connections[1] != []
+        assert broken not in manager.active_connections[1]
+
+
+def send_burst(manager: ConnectionManager, websocket: FakeWebSocket):
+    async def main():
+        await manager.connect(websocket, 1, 1)
+        # Queued without yielding, so the writer can't take any of them
+        await manager.broadcast(1, {"type": "game_info", "version": 1})
+        await manager.broadcast(1, {"type": "play"})
+        await manager.broadcast(1, {"type": "game_info", "version": 2})
+        await settle(manager)
+
+    asyncio.run(main())
+    return [json.loads(text) for text in websocket.sent]
+
+
+class TestSlowConsumerPolicy:
+    def test_drop_stale_keeps_the_newest_snapshot(self):
+        manager = ConnectionManager(SlowConsumerPolicy.drop_stale, 2)
+        websocket = FakeWebSocket()
+
+        assert send_burst(manager, websocket) == [
+            {"type": "play", "seq": 2},
+            {"type": "game_info", "version": 2, "seq": 3},
+        ]
+        assert not websocket.closed
+        assert manager.user_sockets[1] is websocket
+
+    def test_drop_stale_drops_deltas_and_resets_the_view(self):
+        manager = ConnectionManager(SlowConsumerPolicy.drop_stale, 2)
+        websocket = FakeWebSocket()
+        view_tracker.sent[(1, 1)] = {"version": 1}
+        view_tracker.sent[(1, 2)] = {"version": 1}
+
+        async def main():
+            await manager.connect(websocket, 1, 1)
+            await manager.broadcast(1, {"type": "game_delta", "version": 2})
+            await manager.broadcast(1, {"type": "play"})
+            await manager.broadcast(1, {"type": "game_delta", "version": 3})
+            await settle(manager)
+
+        asyncio.run(main())
+
+        # Without its base the last delta is useless too
+        assert [json.loads(text) for text in websocket.sent] == [
+            {"type": "play", "seq": 2}
+        ]
+        assert not websocket.closed
+        # The next update of the player is the full game_info
+        assert (1, 1) not in view_tracker.sent
+        assert (1, 2) in view_tracker.sent
+        view_tracker.reset(1)
+
+    def test_drop_stale_without_snapshots_disconnects(self):
+        manager = ConnectionManager(SlowConsumerPolicy.drop_stale, 1)
+        websocket = FakeWebSocket()
+
+        async def main():
+            await manager.connect(websocket, 1, 1)
+            await manager.broadcast(1, {"type": "play"})
+            await manager.broadcast(1, {"type": "discard"})
+            await settle(manager)
+
+        asyncio.run(main())
+
+        assert websocket.closed
+        assert websocket not in manager.outboxes
+
+    def test_disconnect_policy(self):
+        manager = ConnectionManager(SlowConsumerPolicy.disconnect, 2)
+        websocket = FakeWebSocket()
+
+        assert send_burst(manager, websocket) == []
+        assert websocket.closed
+        assert 1 not in manager.user_sockets
+        assert manager.active_connections[1] == []
+
+
+class TestReplay:
+    def test_reconnect_gets_only_what_it_missed(self):
+        manager = ConnectionManager()
+        first = FakeWebSocket()
+        second = FakeWebSocket()
+        other = FakeWebSocket()
+
+        async def main():
+            await connect_all(manager, [first, other])
+            await manager.broadcast(1, {"type": "play"})
+            await settle(manager)
+            await manager.disconnect(first, 1, 1)
+
+            # Sent while the user is away
+            await manager.send_to_user_id(1, {"type": "draw"}, room_id=1)
+            await manager.send_to_user_id(2, {"type": "draw"})
+            await manager.broadcast(1, {"type": "discard"})
+
+            last_seq = json.loads(first.sent[-1])["seq"]
+            replayed = await manager.connect(second, 1, 1, last_seq)
+            await settle(manager)
+            return replayed
+
+        assert asyncio.run(main())
+        assert [json.loads(text) for text in second.sent] == [
+            {"type": "draw", "seq": 2},
+            {"type": "discard", "seq": 4},
+        ]
+
+    def test_old_socket_disconnects_after_reconnect(self):
+        manager = ConnectionManager()
+        old = FakeWebSocket()
+        new = FakeWebSocket()
+
+        async def main():
+            await manager.connect(old, 1, 1)
+            await manager.connect(new, 1, 1, last_seq=0)
+            # The old socket notices it was dropped after the reconnection
+            await manager.disconnect(old, 1, 1)
+            await manager.send_many(1, [(1, {"type": "draw"})])
+            await settle(manager)
+
+        asyncio.run(main())
+        assert manager.user_sockets[1] is new
+        assert manager.user_rooms[1] == 1
+        assert [json.loads(text)["type"] for text in new.sent] == ["draw"]
+        assert old.sent == []
+
+    def test_reconnect_too_late(self):
+        manager = ConnectionManager()
+        websocket = FakeWebSocket()
+        manager.replays[1] = ReplayBuffer(size=2)
+
+        async def main():
+            for _ in range(3):
+                await manager.send_to_user_id(1, {"type": "draw"}, room_id=1)
+            return await manager.connect(websocket, 1, 1, 0)
+
+        assert not asyncio.run(main())
+        assert websocket.sent == []
+
+    def test_since(self):
+        replay = ReplayBuffer(size=3)
+        for user_id in (1, None, 2, 1):
+            replay.add(user_id, {"type": "draw"})
+
+        missed = replay.since(1, 1)
+        assert [json.loads(text)["seq"] for _, text in missed] == [2, 4]
+        assert replay.since(0, 1) is None
+        assert replay.since(4, 1) == []
+        # From another server (or before a restart)
+        assert replay.since(9, 1) is None
+
+
+class TestBatch:
+    def test_messages_of_an_event_in_one_frame(self):
+        manager = ConnectionManager()
+        batched = FakeWebSocket()
+        plain = FakeWebSocket()
+
+        async def main():
+            await manager.connect(batched, 1, 1, batch=True)
+            await manager.connect(plain, 1, 2)
+            await manager.send_many(
+                1,
+                [
+                    (None, {"type": "defense"}),
+                    (1, {"type": "draw"}),
+                    (None, {"type": "exchange_end"}),
+                    (2, {"type": "game_info"}),
+                ],
+            )
+            await settle(manager)
+
+        asyncio.run(main())
+
+        assert [json.loads(text) for text in batched.sent] == [
+            [
+                {"type": "defense", "seq": 1},
+                {"type": "draw", "seq": 2},
+                {"type": "exchange_end", "seq": 3},
+            ]
+        ]
+        assert [json.loads(text) for text in plain.sent] == [
+            {"type": "defense", "seq": 1},
+            {"type": "exchange_end", "seq": 3},
+            {"type": "game_info", "seq": 4},
+        ]
+
+    def test_single_message_is_not_wrapped(self):
+        manager = ConnectionManager()
+        batched = FakeWebSocket()
+
+        async def main():
+            await manager.connect(batched, 1, 1, batch=True)
+            await manager.send_many(1, [(1, {"type": "draw"})])
+            await settle(manager)
+
+        asyncio.run(main())
+
+        assert json.loads(batched.sent[0]) == {"type": "draw", "seq": 1}
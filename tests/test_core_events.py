@@ -0,0 +1,134 @@
+import pytest
+from pony.orm import db_session
+
+from . import clean_db
+from . import create_room
+from . import create_user
+from . import delete_room
+from . import delete_user
+from . import game_store
+from . import handle_game_event
+from . import join_room
+from . import Room
+from . import start_game
+
+
+class TestGameEvents:
+    @pytest.fixture(autouse=True)
+    @db_session
+    def resources(self):
+        host = create_user("test_host")
+        id_list = [host.id]
+        room_id = create_room("test_room", host.id)
+
+        for i in range(3):
+            user = create_user(str("user" + str(i)))
+            id_list.append(user.id)
+            join_room(room_id, user.id)
+
+        room = Room.get(id=room_id)
+        start_game(room_id, host.id)
+        game_store.host(room_id)
+        yield host, room
+        game_store.release(room_id)
+        room.in_game = False
+        delete_room(room_id, host.id)
+        for user_id in id_list:
+            delete_user(user_id)
+
+    @classmethod
+    def setup_class(cls):
+        clean_db()
+
+    @classmethod
+    def teardown_class(cls):
+        clean_db()
+
+    def test_game_status(self, resources):
+        host, room = resources
+        messages = handle_game_event(room.id, host.id, {"type": "game_status"})
+
+        # Only to whoever asked, with only their own hand
+        game = game_store.get(room.id)
+        assert len(messages) == 1
+        assert messages[0].user_id == host.id
+        assert messages[0].message["type"] == "game_info"
+        assert messages[0].message["version"] == game.version
+        for player in messages[0].message["game"]["players"]:
+            hand = game.get_player(player["id"]).hand
+            assert player["hand_size"] == len(hand)
+            if player["id"] == host.id:
+                assert len(player["hand"]) == len(hand)
+            else:
+                assert player["hand"] == []
+
+    def test_updates_are_deltas(self, resources):
+        host, room = resources
+        handle_game_event(room.id, host.id, {"type": "game_status"})
+        version = game_store.get(room.id).version
+
+        messages = handle_game_event(
+            room.id, host.id, {"type": "cannot_exchange"}
+        )
+
+        updates = {
+            message.user_id: message.message
+            for message in messages
+            if message.message["type"] in ("game_info", "game_delta")
+        }
+        # The host got a full game_info before, the rest didn't
+        assert updates[host.id]["type"] == "game_delta"
+        assert updates[host.id]["from"] == version
+        assert updates[host.id]["version"] == game_store.get(room.id).version
+        assert "current_turn" in updates[host.id]["game"]
+        assert [
+            update["type"] for id, update in updates.items() if id != host.id
+        ] == ["game_info"] * 3
+
+    def test_cannot_exchange(self, resources):
+        host, room = resources
+        game = game_store.get(room.id)
+        position = game.current_position
+
+        messages = handle_game_event(
+            room.id, host.id, {"type": "cannot_exchange"}
+        )
+
+        game = game_store.get(room.id)
+        next_player = game.get_player_in_position(game.current_position)
+        assert game.current_position == position % 4 + 1
+        assert messages[0].user_id == next_player.id
+        assert messages[0].message["type"] == "draw"
+        assert len(next_player.hand) == 5
+
+    def test_failed_event_is_not_applied(self, resources):
+        host, room = resources
+        game = game_store.get(room.id)
+
+        with pytest.raises(KeyError):
+            handle_game_event(room.id, host.id, {"type": "exchange_defense"})
+
+        assert game_store.get(room.id) is game
+
+    def test_rejected_play_is_not_applied(self, resources):
+        host, room = resources
+        game = game_store.get(room.id)
+        phase = game.current_phase
+        # The attacker isn't a player of the game
+        other = max(game.players) + 1000
+        card = list(game.get_player(host.id).hand)[0]
+
+        with pytest.raises(ValueError):
+            handle_game_event(
+                room.id,
+                host.id,
+                {
+                    "type": "defense",
+                    "played_defense": 0,
+                    "target_player": other,
+                    "last_played_card": card,
+                },
+            )
+
+        assert game_store.get(room.id) is game
+        assert game.current_phase == phase
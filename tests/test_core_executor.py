@@ -0,0 +1,37 @@
+import asyncio
+import threading
+
+from . import run_blocking
+
+
+def get_thread_name(suffix: str = ""):
+    return threading.current_thread().name + suffix
+
+
+class TestRunBlocking:
+    def test_run_blocking_outside_event_loop(self):
+        async def main():
+            return await run_blocking(get_thread_name, suffix="!")
+
+        thread_name = asyncio.run(main())
+
+        assert thread_name.startswith("game")
+        assert thread_name.endswith("!")
+
+    def test_run_blocking_does_not_block_the_loop(self):
+        async def main():
+            ticks = []
+
+            async def tick():
+                for _ in range(5):
+                    ticks.append(1)
+                    await asyncio.sleep(0.01)
+
+            ticker = asyncio.create_task(tick())
+            await run_blocking(threading.Event().wait, 0.2)
+            # The loop kept running while the blocking call waited
+            ticks_while_blocked = len(ticks)
+            await ticker
+            return ticks_while_blocked
+
+        assert asyncio.run(main()) == 5
@@ -0,0 +1,163 @@
+"""Test the headless games."""
+import random
+
+import pytest
+
+from . import Agent
+from . import first_card_id
+from . import get_deck_template
+from . import HAND_SIZE
+from . import new_game_state
+from . import open_game
+from . import open_state
+from . import play_game
+from . import Simulation
+
+
+def all_cards(game):
+    """Every card of a game, wherever it is."""
+    cards = list(game.available_deck) + list(game.disposable_deck)
+    for player in game.players.values():
+        cards.extend(player.hand)
+    return sorted(cards)
+
+
+class Discarder(Agent):
+    """Never plays a card nor defends."""
+
+    def play(self, game, id_player, options):
+        return None
+
+    def defend(self, game, id_player, idtype_attack, defenses):
+        return None
+
+
+class TestNewGameState:
+    """Test new_game_state function."""
+
+    @pytest.mark.parametrize("quantity_players", [4, 7, 12])
+    def test_deal(self, quantity_players):
+        """Test the cards and roles of a new game."""
+        game = new_game_state(quantity_players, seed=1)
+
+        assert all_cards(game) == sorted(
+            get_deck_template(quantity_players).cards
+        )
+        assert game.count_alive("The Thing") == 1
+        assert game.count_alive("Human") == quantity_players - 1
+        assert sorted(p.round_position for p in game.players.values()) == (
+            list(range(1, quantity_players + 1))
+        )
+        first = game.get_player_in_position(game.current_position)
+        # The player of the first turn already drew
+        assert len(first.hand) == HAND_SIZE + 1
+        for player in game.players.values():
+            dealt = list(player.hand)[:HAND_SIZE]
+            assert len(dealt) == HAND_SIZE
+            assert all(game.get_idtype(c) != 2 for c in dealt)
+            assert all(game.get_card_type(c) != "PANIC" for c in dealt)
+        the_thing = [p for p in game.players.values() if p.role != "Human"]
+        assert the_thing[0].hand.count_idtype(1) == 1
+
+
+class TestSimulation:
+    """Test complete simulated games."""
+
+    @pytest.mark.parametrize("quantity_players", [4, 8, 12])
+    def test_play_game(self, quantity_players):
+        """Test games finish keeping every card of the deck."""
+        for seed in range(5):
+            game = new_game_state(quantity_players, seed)
+            rng = random.Random(seed)
+            agents = {id: Agent(rng) for id in game.players}
+            simulation = Simulation(game, agents)
+            simulation.run()
+            result = simulation.result(seed)
+            game = simulation.game
+
+            assert result.winners in ["Humans", "The Thing", "None"]
+            assert (result.winners == "None") == (game.status != "Finished")
+            assert result.turns <= simulation.max_turns
+            assert result.quantity_players == quantity_players
+            assert all_cards(game) == sorted(
+                get_deck_template(quantity_players).cards
+            )
+            for player in game.players.values():
+                assert player.hand.count_idtype(1) == (
+                    1 if player.role == "The Thing" else 0
+                )
+
+    def test_rejected_play_is_not_applied(self):
+        """Test a play the handlers reject leaves the game untouched."""
+        game = new_game_state(4, seed=2)
+        simulation = Simulation(game, {id: Agent(None) for id in game.players})
+        player = game.get_player_in_position(game.current_position)
+        card = list(player.hand)[0]
+
+        # Nobody has id 99
+        assert not simulation.play(player.id, card, 99)
+        assert simulation.game is game
+        assert simulation.rejected == 1
+        assert game.current_phase == "Draw"
+        assert card in player.hand
+
+    def test_in_place_same_as_copies(self):
+        """Test applying the events in place plays the same games as
+        applying them on copies."""
+        for seed in range(5):
+            assert play_game(6, seed) == play_game(6, seed, copies=True)
+
+    def test_play_options_follow_the_rules(self):
+        """Test the targets offered for a card are the ones of its rules."""
+        game = new_game_state(4, seed=0)
+        simulation = Simulation(game, {id: Agent(None) for id in game.players})
+        player = simulation.current_player()
+        for card in list(player.hand):
+            player.hand.remove(card)
+        # Flamethrower, Axe, Whisky, You better run
+        cards = [first_card_id[idtype] for idtype in (3, 5, 8, 12)]
+        for card in cards:
+            player.hand.append(card)
+        game.locked_doors.lock(player.round_position % 4)
+        neighbors = sorted(game.alive_neighbors(player.id))
+        open_neighbors = [
+            id
+            for id in neighbors
+            if not game.door_locked_between(player.id, id)
+        ]
+        others = sorted(id for id in game.players if id != player.id)
+        assert len(open_neighbors) == 1
+
+        options = simulation.play_options(player.id)
+
+        flamethrower, axe, whisky, run = cards
+        assert [t for c, t in options if c == flamethrower] == open_neighbors
+        assert [t for c, t in options if c == axe] == neighbors
+        assert [t for c, t in options if c == whisky] == [player.id]
+        assert sorted(t for c, t in options if c == run) == others
+
+    def test_turn_limit(self):
+        """Test a game is stopped after max_turns."""
+        result = play_game(6, seed=3, agent=Discarder, max_turns=10)
+
+        assert result.turns <= 10
+        assert result.played.get(3, 0) == 0
+        if result.turns < 10:
+            # Only an infection by exchange can end it
+            assert result.winners == "The Thing"
+
+    def test_same_seed_same_game(self):
+        """Test a seed always plays the same game."""
+        assert play_game(7, seed=11) == play_game(7, seed=11)
+        assert play_game(7, seed=11) != play_game(7, seed=12)
+
+    def test_open_state(self):
+        """Test the game functions use the opened state."""
+        game = new_game_state(4, seed=0, id_game=99)
+
+        with open_state(game):
+            with open_game(99) as opened:
+                assert opened is game
+            with pytest.raises(ValueError):
+                with open_state(game):
+                    pass
@@ -0,0 +1,126 @@
+from . import GameState
+from . import PlayerState
+from . import ViewCache
+from . import ViewTracker
+
+CARDS = {
+    0: (1, "INFECTION"),
+    1: (2, "INFECTION"),
+    2: (3, "ACTION"),
+    3: (13, "DEFENSE"),
+}
+
+
+def new_game_state(version: int = 0) -> GameState:
+    players = {
+        1: PlayerState(id=1, name="Player1", round_position=1, hand=[1, 0]),
+        2: PlayerState(id=2, name="Player2", round_position=2, hand=[2, 3]),
+    }
+    return GameState(
+        id=1,
+        players=players,
+        cards=CARDS,
+        available_deck=[],
+        locked_doors=[0, 0],
+        version=version,
+    )
+
+
+class TestGameViews:
+    def test_only_own_hand(self):
+        view = ViewCache().get(new_game_state(), 1)
+
+        assert view["type"] == "game_info"
+        own, other = view["game"]["players"]
+        assert own["hand"] == [
+            {"id": 0, "idtype": 1},
+            {"id": 1, "idtype": 2},
+        ]
+        assert own["hand_size"] == 2
+        assert other["hand"] == []
+        assert other["hand_size"] == 2
+        assert other["round_position"] == 2
+
+    def test_only_own_role(self):
+        game = new_game_state()
+        game.players[2].role = "The Thing"
+
+        own, other = ViewCache().get(game, 1)["game"]["players"]
+        assert own["role"] == "Human"
+        assert "role" not in other
+        other, own = ViewCache().get(game, 2)["game"]["players"]
+        assert own["role"] == "The Thing"
+        assert "role" not in other
+
+    def test_cached_by_version_and_viewer(self):
+        cache = ViewCache()
+        game = new_game_state(version=7)
+
+        view = cache.get(game, 1)
+        assert cache.get(game, 1) is view
+        assert cache.get(game, 2) is not view
+        assert (cache.hits, cache.misses) == (1, 2)
+
+        changed = game.copy()
+        changed.version = 8
+        changed.players[1].hand.remove(0)
+        assert cache.get(changed, 1)["game"]["players"][0]["hand_size"] == 1
+
+    def test_not_versioned_is_not_cached(self):
+        cache = ViewCache()
+        game = new_game_state()
+
+        assert cache.get(game, 1) is not cache.get(game, 1)
+        assert len(cache.views) == 0
+
+    def test_cache_is_bounded(self):
+        cache = ViewCache(size=2)
+        for version in range(1, 4):
+            cache.get(new_game_state(version), 1)
+
+        assert list(cache.views) == [(1, 2, 1), (1, 3, 1)]
+
+
+class TestGameDeltas:
+    def test_first_update_is_full(self):
+        tracker = ViewTracker(ViewCache())
+        update = tracker.update(new_game_state(version=1), 1)
+
+        assert update["type"] == "game_info"
+        assert update["version"] == 1
+
+    def test_delta_between_versions(self):
+        tracker = ViewTracker(ViewCache())
+        game = new_game_state(version=1)
+        tracker.update(game, 1)
+
+        changed = game.copy()
+        changed.version = 4
+        changed.current_phase = "Play"
+        changed.players[1].hand.remove(0)
+        changed.players[2].hand.append(0)
+
+        assert tracker.update(changed, 1) == {
+            "type": "game_delta",
+            "from": 1,
+            "version": 4,
+            "game": {"turn_phase": "Play"},
+            "players": [
+                {"id": 1, "hand_size": 1},
+                {"id": 2, "hand_size": 3},
+            ],
+            "hand": {"added": [], "removed": [0]},
+        }
+
+    def test_reset_sends_full_again(self):
+        tracker = ViewTracker(ViewCache())
+        game = new_game_state(version=1)
+        tracker.update(game, 1)
+        tracker.update(game, 2)
+
+        tracker.reset(game.id, 1)
+        assert tracker.update(game, 1)["type"] == "game_info"
+        assert tracker.update(game, 2)["type"] == "game_delta"
+
+        tracker.reset(game.id)
+        assert tracker.sent == {}
@@ -1,3 +1,5 @@
+import sqlite3
+
 from pony.orm import commit
 from pony.orm import db_session
 
@@ -7,8 +9,10 @@ from . import clean_db
 from . import Deck
 from . import DisposableDeck
 from . import Game
+from . import migrate
 from . import Player
 from . import Room
+from . import SCHEMA_VERSION
 from . import User
 
 # Create the needed constants for the tests
@@ -322,3 +326,58 @@ class TestModels:
         # Delete the disposable_deck
         disposable_deck.delete()
         commit()
+
+
+# Tables of a database created before the in-memory engine
+OLD_SCHEMA = """
+CREATE TABLE "Game" (
+  "id" INTEGER NOT NULL PRIMARY KEY,
+  "round_left_direction" BOOLEAN NOT NULL,
+  "status" TEXT NOT NULL,
+  "current_phase" TEXT NOT NULL,
+  "current_position" INTEGER UNSIGNED,
+  "winners" TEXT NOT NULL,
+  "locked_doors" INT[] NOT NULL
+);
+CREATE TABLE "AvailableDeck" (
+  "id" INTEGER NOT NULL PRIMARY KEY,
+  "deck" INTEGER
+);
+INSERT INTO "Game" VALUES (1, 0, 'In progress', 'Draw', 1, 'None', '[0,1,1,0]');
+INSERT INTO "AvailableDeck" VALUES (1, NULL);
+"""
+
+
+class TestMigrations:
+    def test_migrate_old_database(self, tmp_path):
+        filename = str(tmp_path / "database.sqlite")
+        with sqlite3.connect(filename) as connection:
+            connection.executescript(OLD_SCHEMA)
+        connection.close()
+
+        assert migrate(filename) == 0
+        assert migrate(filename) == SCHEMA_VERSION
+
+        connection = sqlite3.connect(filename)
+        assert connection.execute(
+            'SELECT "locked_doors", "seed", "rng_step", "card_instances" '
+            'FROM "Game"'
+        ).fetchall() == [(0b0110, 0, 0, 0)]
+        assert connection.execute(
+            'SELECT "order", "panic_order" FROM "AvailableDeck"'
+        ).fetchall() == [("[]", "[]")]
+        connection.close()
+
+    def test_migrate_new_database(self, tmp_path):
+        filename = str(tmp_path / "database.sqlite")
+
+        assert migrate(filename) == 0
+        connection = sqlite3.connect(filename)
+        # The tables are left to Pony
+        assert (
+            connection.execute("SELECT * FROM sqlite_master").fetchall() == []
+        )
+        assert connection.execute("PRAGMA user_version").fetchone() == (
+            SCHEMA_VERSION,
+        )
+        connection.close()